@@ -0,0 +1,125 @@
+"""
+In-process copy of the annotations, refreshed incrementally: the reader the
+app used before the indexed queries. Kept as a baseline for the benchmarks.
+"""
+
+import logging
+import threading
+import traceback
+from typing import Dict, Optional, Tuple
+
+import pandas as pd
+
+from annotation_schema import ANNOTATION_COLUMNS
+from db_pool import ConnectionPool
+
+
+class AnnotationStore:
+    """
+    In-process copy of the call_annotation_table that is kept fresh incrementally.
+
+    The table is read once; afterwards rows saved by this process are applied
+    as they are written, and rows written by other processes are picked up by
+    polling past an annotation_id high-water mark. Only the latest row per
+    (call_id, username, role) is kept, so memory is bounded by the number of
+    chunk/user pairs rather than by the number of saves.
+    """
+
+    def __init__(self, pool: ConnectionPool):
+        self._pool = pool
+        self._lock = threading.Lock()
+        self._high_water = 0
+        self._rows: Dict[Tuple[str, str, str], Tuple] = {}
+        self._df: Optional[pd.DataFrame] = None
+        self.refresh()
+
+    def refresh(self) -> int:
+        """
+        Apply the rows added to the table since the last refresh.
+
+        Returns:
+            int: Number of new rows read from the database.
+        """
+        try:
+            with self._lock, self._pool.reader() as conn:
+                query = (
+                    f"SELECT annotation_id, {', '.join(ANNOTATION_COLUMNS)} "
+                    "FROM annotations_flat WHERE annotation_id > ? "
+                    "ORDER BY annotation_id"
+                )
+                new_rows = conn.execute(query, (self._high_water,)).fetchall()
+
+                for annotation_id, *row in new_rows:
+                    self._apply(tuple(row))
+                    self._high_water = annotation_id
+
+                return len(new_rows)
+
+        except Exception as e:
+            logging.error(f"An error occurred in 'AnnotationStore.refresh': {e}")
+            logging.error(traceback.format_exc())
+            raise
+
+    def append(self, row: Tuple) -> None:
+        """
+        Apply a row that was just written to the table by this process.
+
+        The same row is seen again by the next `refresh`, which is harmless
+        because rows are deduplicated on (call_id, username, role).
+
+        Args:
+            row (tuple): Values in the order of ANNOTATION_COLUMNS.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._apply(tuple(row))
+
+    def snapshot(self) -> pd.DataFrame:
+        """
+        Get the current annotations after polling for new rows.
+
+        The returned frame is shared between callers and must not be modified.
+
+        Returns:
+            pd.DataFrame: The latest annotation per (call_id, username, role).
+        """
+        self.refresh()
+        with self._lock:
+            if self._df is None:
+                self._df = pd.DataFrame(
+                    list(self._rows.values()), columns=ANNOTATION_COLUMNS
+                )
+            return self._df
+
+    def _apply(self, row: Tuple) -> None:
+        # callers hold the lock; rows can arrive out of order when a write
+        # lands in the table after a newer one was appended, so compare the
+        # (date, time) stamps instead of trusting arrival order
+        key = row[:3]
+        current = self._rows.get(key)
+        if current is None or current[3:5] <= row[3:5]:
+            self._rows[key] = row
+            self._df = None
+
+
+def open_annotation_store(pool: ConnectionPool) -> AnnotationStore:
+    """
+    Create an annotation store reading through the given connection pool.
+
+    Args:
+        pool (ConnectionPool): The database connection pool.
+
+    Returns:
+        AnnotationStore: The loaded annotation store.
+    """
+    try:
+        store = AnnotationStore(pool)
+        logging.info(f"Annotation store loaded with {len(store.snapshot())} rows.")
+        return store
+
+    except Exception as e:
+        logging.error("An error occurred while loading the annotation store.")
+        logging.error(traceback.format_exc())
+        raise
@@ -0,0 +1,212 @@
+"""
+The ways the app used to build the annotator and reviewer queues: the pandas
+joins of the call data with every annotation, then the static assignment of
+chunks to annotators in the work queue, before calls were leased and the
+review queue table was added. Kept as baselines for the benchmarks.
+"""
+
+import logging
+import sqlite3
+import traceback
+from typing import Optional
+
+import pandas as pd
+import streamlit as st
+
+from config import CHUNK_ID_COLNAME, CONN_ID_COLNAME
+from db_pool import ConnectionPool
+from tracing import cache_miss, traced
+from work_queue import ASSIGNMENT_TABLE
+
+
+@traced
+@st.cache_data
+@cache_miss
+def get_unannotated_ids(
+    call_data: pd.DataFrame,
+    annotated_df: pd.DataFrame,
+    user_call_mapping: pd.DataFrame,
+    username: str,
+) -> pd.DataFrame:
+    """
+    Get the unannotated IDs based on the call data, annotated dataframe, user-call mapping, and username.
+
+    Args:
+        call_data (pd.DataFrame): DataFrame containing call data.
+        annotated_df (pd.DataFrame): DataFrame containing annotated data.
+        user_call_mapping (pd.DataFrame): DataFrame containing user-call mapping.
+        username (str): Username of the annotator.
+
+    Returns:
+        pd.DataFrame: DataFrame containing the unannotated IDs.
+    """
+    try:
+        call_ids = (
+            pd.merge(call_data, user_call_mapping, on=CONN_ID_COLNAME, how="left")
+            .query("Annotator == @username")
+            .assign(
+                new_id=lambda x: x[CONN_ID_COLNAME]
+                + "_chunk_"
+                + x[CHUNK_ID_COLNAME].astype(str)
+            )
+            .sort_values(by=[CONN_ID_COLNAME, CHUNK_ID_COLNAME])
+            .reset_index(drop=True)
+        )
+
+        # Perform outer join
+        outer = call_ids.merge(
+            annotated_df,
+            left_on="new_id",
+            right_on="call_id",
+            how="outer",
+            indicator=True,
+        )
+
+        # Perform anti-join
+        anti_join = outer[(outer._merge == "left_only")].drop("_merge", axis=1)
+
+        return anti_join
+
+    except Exception as e:
+        logging.error("An error occurred while retrieving unannotated IDs.")
+        logging.error(traceback.format_exc())
+        raise
+
+
+
+@traced
+def get_call_ids_to_be_reviewed(
+    call_data: pd.DataFrame,
+    user_call_mapping: pd.DataFrame,
+    annot_data: pd.DataFrame,
+    rev_username: str,
+    role: str = "reviewer",
+) -> pd.DataFrame:
+    """
+    Retrieve the call IDs to be reviewed based on the given input data.
+
+    Args:
+        call_data (pd.DataFrame): Dataframe containing call information.
+        user_call_mapping (pd.DataFrame): Dataframe containing user-call mapping information.
+        annot_data (pd.DataFrame): Dataframe containing annotation data.
+        rev_username (str): Username of the reviewer.
+        role (str): Role of the signed-in user; an admin gets every call.
+
+    Returns:
+        pd.DataFrame: Dataframe containing the call IDs to be reviewed.
+
+    Raises:
+        Exception: If an error occurs while retrieving call IDs to be reviewed.
+    """
+
+    try:
+        only_annotator_data = annot_data.query("role == 'annotator'")
+
+        call_ids = (
+            pd.merge(call_data, user_call_mapping, on=CONN_ID_COLNAME, how="left")
+            .assign(
+                new_id=lambda x: x[CONN_ID_COLNAME]
+                + "_chunk_"
+                + x[CHUNK_ID_COLNAME].astype(str)
+            )
+            .merge(
+                only_annotator_data,
+                left_on=["new_id"],
+                right_on=["call_id"],
+                how="inner",
+            )
+            .sort_values(by=[CONN_ID_COLNAME, CHUNK_ID_COLNAME])
+            .reset_index(drop=True)
+        )
+
+        if role == "admin":
+            final_call_ids = call_ids.copy()
+        elif role == "reviewer":
+            final_call_ids = call_ids.query("Reviewer == @rev_username")
+
+        return final_call_ids
+
+    except Exception as e:
+        logging.error("An error occurred while retrieving call IDs to be reviewed.")
+        logging.error(traceback.format_exc())
+        raise e
+
+
+def get_pending_chunks(
+    conn: sqlite3.Connection, annotator: str, limit: Optional[int] = None
+) -> pd.DataFrame:
+    """
+    Get the next pending chunks assigned to an annotator.
+
+    A chunk is pending until any row for its call_id exists in the
+    annotations table. The anti-join is a NOT EXISTS probe on the
+    (call_id, ...) index of the annotations, so the cost depends on the size of the
+    annotator's own queue rather than on the whole corpus.
+
+    Args:
+        conn (sqlite3.Connection): Connection object to the database.
+        annotator (str): Name of the annotator.
+        limit (int, optional): Maximum number of chunks to return. Returns all
+            pending chunks when None.
+
+    Returns:
+        pd.DataFrame: DataFrame with new_id, ConnectionID and chunk_id columns,
+            sorted by ConnectionID and chunk_id.
+    """
+    try:
+        query = (
+            f"SELECT a.call_id AS new_id, a.connection_id AS {CONN_ID_COLNAME}, "
+            f"a.chunk_id AS {CHUNK_ID_COLNAME} "
+            f"FROM {ASSIGNMENT_TABLE} AS a "
+            "WHERE a.annotator = ? "
+            "AND NOT EXISTS ("
+            "SELECT 1 FROM annotations AS c WHERE c.call_id = a.call_id"
+            ") "
+            "ORDER BY a.connection_id, a.chunk_id "
+            "LIMIT ?"
+        )
+        params = (annotator, -1 if limit is None else limit)
+        return pd.read_sql_query(query, conn, params=params)
+
+    except Exception as e:
+        logging.error(f"An error occurred in 'get_pending_chunks': {e}")
+        logging.error(traceback.format_exc())
+        raise
+
+
+@traced
+def get_pending_call_ids(
+    pool: ConnectionPool,
+    call_data: pd.DataFrame,
+    username: str,
+    limit: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    Get the chunks an annotator still has to annotate, along with their call data.
+
+    Indexed replacement for `get_unannotated_ids`: the pending chunks are read
+    from the work queue and only those rows are joined with the call data.
+
+    Args:
+        pool (ConnectionPool): The database connection pool.
+        call_data (pd.DataFrame): DataFrame containing call data.
+        username (str): Username of the annotator.
+        limit (int, optional): Maximum number of chunks to return.
+
+    Returns:
+        pd.DataFrame: DataFrame containing the unannotated chunks.
+    """
+    try:
+        with pool.reader() as conn:
+            pending = get_pending_chunks(conn, annotator=username, limit=limit)
+
+        call_ids = pending.merge(
+            call_data, on=[CONN_ID_COLNAME, CHUNK_ID_COLNAME], how="inner"
+        ).reset_index(drop=True)
+
+        return call_ids
+
+    except Exception as e:
+        logging.error("An error occurred while retrieving pending call IDs.")
+        logging.error(traceback.format_exc())
+        raise
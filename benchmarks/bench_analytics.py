@@ -0,0 +1,51 @@
+"""
+Time the agreement metrics of `analytics.compute_agreement` on a synthetic
+database of reviewed annotations.
+
+Usage (from the benchmarks directory):
+    python bench_analytics.py --annotations 1000000
+"""
+
+import argparse
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+from synthetic import make_reviewed_annotations
+
+from analytics import compute_agreement, get_label_options
+from config import INTENTS_PATH
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--annotations", type=int, default=1_000_000)
+    parser.add_argument("--intents", default=INTENTS_PATH)
+    args = parser.parse_args()
+
+    intents = pd.read_parquet(args.intents)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(str(Path(tmp) / "annotations.db"))
+
+        start = time.perf_counter()
+        make_reviewed_annotations(conn, args.annotations, get_label_options(intents))
+        print(
+            f"generated {args.annotations:,} annotations in "
+            f"{time.perf_counter() - start:.1f}s"
+        )
+
+        start = time.perf_counter()
+        report = compute_agreement(conn, intents)
+        elapsed = time.perf_counter() - start
+        conn.close()
+
+    print(f"agreement metrics in {elapsed:.2f}s")
+    print(report["label_scores"].to_string(index=False))
+    print(report["cohen_kappa"].head().to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Time the streaming annotation export and measure its peak RSS, against
+materializing the whole table with pandas.
+
+The database and call data are generated once; every export runs in a fresh
+subprocess so each peak RSS is measured on its own.
+
+Usage (from the benchmarks directory):
+    python bench_export.py --annotations 5000000
+"""
+
+import argparse
+import resource
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from synthetic import make_call_data, make_reviewed_annotations
+
+from analytics import get_label_options
+from config import CHUNK_ID_COLNAME, CONN_ID_COLNAME, INTENTS_PATH, TEXT_COLNAME
+from data_store import ChunkDataStore
+from export import export_annotations
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def generate(tmp, n_annotations, text_len):
+    tmp = Path(tmp)
+    # one chunk per call, matching the call_ids of make_reviewed_annotations
+    data = make_call_data(n_annotations // 2, chunks_per_call=1)
+    data[TEXT_COLNAME] = (
+        "agent: chunk of " + data[CONN_ID_COLNAME] + " " + "x" * text_len
+    ).str.slice(0, text_len)
+    data.to_parquet(tmp / "data.parquet", index=False, row_group_size=256)
+
+    conn = sqlite3.connect(tmp / "annotations.db")
+    make_reviewed_annotations(
+        conn, n_annotations, get_label_options(pd.read_parquet(INTENTS_PATH))
+    )
+    conn.close()
+
+
+def export(tmp, fmt):
+    tmp = Path(tmp)
+    conn = sqlite3.connect(tmp / "annotations.db")
+    start = time.perf_counter()
+
+    if fmt == "pandas":
+        df = pd.read_sql_query("SELECT * FROM call_annotation_table", conn)
+        data = pd.read_parquet(tmp / "data.parquet")
+        data["call_id"] = (
+            data[CONN_ID_COLNAME] + "_chunk_" + data[CHUNK_ID_COLNAME].astype(str)
+        )
+        df = df.merge(data[["call_id", TEXT_COLNAME]], on="call_id", how="left")
+        df.to_parquet(tmp / "export_pandas.parquet", index=False)
+        n_rows = len(df)
+    else:
+        store = ChunkDataStore(str(tmp / "data.parquet"))
+        n_rows = export_annotations(conn, str(tmp / f"export.{fmt}"), fmt, store=store)
+
+    elapsed = time.perf_counter() - start
+    print(f"{n_rows} {elapsed:.1f} {peak_rss_mb():.0f}")
+
+
+def run_child(*args):
+    # on Linux the peak RSS of a process is inherited across fork + exec, so
+    # the parent must stay small
+    return subprocess.run(
+        [sys.executable, __file__, *map(str, args)],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--annotations", type=int, default=5_000_000)
+    parser.add_argument("--text-len", type=int, default=120)
+    parser.add_argument(
+        "--formats", nargs="+", default=["parquet", "csv", "jsonl", "pandas"]
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        run_child("--generate", tmp, args.annotations, args.text_len)
+        print(f"generated in {time.perf_counter() - start:.0f}s")
+
+        print(f"{'export':>8} {'rows':>10} {'time (s)':>9} {'peak RSS (MB)':>14}")
+        for fmt in args.formats:
+            try:
+                n_rows, elapsed, rss = run_child("--export", tmp, fmt).split()[-3:]
+            except subprocess.CalledProcessError as e:
+                # materializing 5M rows can exceed the memory of small machines
+                print(f"{fmt:>8} failed with exit code {e.returncode}")
+                continue
+            print(f"{fmt:>8} {n_rows:>10} {elapsed:>9} {rss:>14}")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--export"]:
+        export(sys.argv[2], sys.argv[3])
+    elif sys.argv[1:2] == ["--generate"]:
+        generate(sys.argv[2], int(sys.argv[3]), int(sys.argv[4]))
+    else:
+        main()
@@ -0,0 +1,105 @@
+"""
+Compare what the guidelines section costs on every rerun: the old inline
+iframe, which read and base64-encoded the PDF into the page each time,
+against the asset server URL behind the lazy expander.
+
+Drives a page holding only the guidelines section with Streamlit's AppTest
+(streamlit.testing, which needs Streamlit 1.28 or later) and reports the
+size of the markdown sent to the browser and the rerun time.
+
+Usage (from the benchmarks directory):
+    python bench_guidelines.py --pdf-mb 5 --reruns 30
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+import synthetic  # noqa: F401, puts src/ on the path
+
+PAGE = """
+import base64
+
+import streamlit as st
+
+from helper_functions import show_guidelines
+
+PDF = {pdf!r}
+
+
+def legacy_show_pdf(file_path):
+    with open(file_path, "rb") as f:
+        base64_pdf = base64.b64encode(f.read()).decode("utf-8")
+    pdf_display = f'<iframe src="data:application/pdf;base64,{{base64_pdf}}" width="100%" height="800" type="application/pdf"></iframe>'
+    st.markdown(pdf_display, unsafe_allow_html=True)
+
+
+if {legacy!r}:
+    with st.expander(label="Guidelines to use the dashboard"):
+        legacy_show_pdf(PDF)
+else:
+    show_guidelines(PDF)
+st.button("Next")
+"""
+
+
+def measure(root, pdf, legacy, opened, reruns):
+    from streamlit.testing.v1 import AppTest
+
+    page = root / f"page_{legacy}.py"
+    page.write_text(PAGE.format(pdf=str(pdf), legacy=legacy))
+    app = AppTest.from_file(str(page), default_timeout=120)
+    app.run()
+    if opened:
+        app.checkbox[0].check().run()
+
+    times = []
+    for _ in range(reruns):
+        start = time.perf_counter()
+        app.button[0].click().run()
+        times.append(time.perf_counter() - start)
+        assert not app.exception, app.exception
+
+    sent = sum(len(m.value) for m in app.markdown)
+    return np.array(times), sent
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pdf-mb", type=float, default=5)
+    parser.add_argument("--reruns", type=int, default=30)
+    args = parser.parse_args()
+
+    src = Path(__file__).resolve().parents[1] / "src"
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        pdf = root / "guidelines.pdf"
+        pdf.write_bytes(b"%PDF-1.4\n" + os.urandom(int(args.pdf_mb * 2**20)))
+
+        os.chdir(src)
+        print(f"guidelines PDF: {args.pdf_mb} MB")
+        print(f"{'section':>22} {'median ms':>10} {'p90 ms':>8} {'sent bytes':>12}")
+        for legacy, opened, label in [
+            (True, False, "inline base64"),
+            (False, False, "asset URL, closed"),
+            (False, True, "asset URL, opened"),
+        ]:
+            times, sent = measure(root, pdf, legacy, opened, args.reruns)
+            print(
+                f"{label:>22} {1000 * np.median(times):>10.1f} "
+                f"{1000 * np.percentile(times, 90):>8.1f} {sent:>12}"
+            )
+
+    # the app published the test PDF into its asset directory
+    from config import ASSET_DIR
+
+    for published in Path(ASSET_DIR).glob("guidelines.*.pdf"):
+        published.unlink()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Compare picking up a new call batch incrementally against reloading the
+whole call data, as the app had to after new inputs were dropped in.
+
+The incremental path is `ingest_batch` followed by `CallDataCatalog.refresh`
+in a running app; the reload path reads the combined data.parquet and
+mapping.parquet again and re-syncs every assignment.
+
+Usage (from the benchmarks directory):
+    python bench_ingest.py --base 1000000 --batch 10000
+"""
+
+import argparse
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from synthetic import make_call_data, make_mapping
+
+from config import CONN_ID_COLNAME
+from data_store import ChunkDataStore
+from db_pool import ConnectionPool
+from ingest import CallDataCatalog, ingest_batch
+from migrations import apply_migrations
+from work_queue import sync_assignments
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--base", type=int, default=1_000_000)
+    parser.add_argument("--batch", type=int, default=10_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        base = make_call_data(args.base)
+        batch = make_call_data(args.batch, seed=1)
+        batch[CONN_ID_COLNAME] = "b_" + batch[CONN_ID_COLNAME]
+
+        base.to_parquet(tmp / "data.parquet", index=False, row_group_size=256)
+        make_mapping(base).to_parquet(tmp / "mapping.parquet", index=False)
+        batch.to_parquet(tmp / "batch.parquet", index=False)
+        make_mapping(batch).to_parquet(tmp / "batch_mapping.parquet", index=False)
+
+        db = str(tmp / "bench.db")
+        conn = sqlite3.connect(db)
+        apply_migrations(conn)
+        sync_assignments(conn, base, make_mapping(base))
+
+        pool = ConnectionPool(db)
+        catalog = CallDataCatalog(
+            pool,
+            base=ChunkDataStore(str(tmp / "data.parquet")),
+            mapping_path=str(tmp / "mapping.parquet"),
+        )
+
+        added, ingest_s = timed(
+            lambda: ingest_batch(
+                conn,
+                str(tmp / "batch.parquet"),
+                str(tmp / "batch_mapping.parquet"),
+                ingest_dir=str(tmp / "batches"),
+                base=ChunkDataStore(str(tmp / "data.parquet")),
+            )
+        )
+        _, refresh_s = timed(catalog.refresh)
+        assert len(catalog.snapshot()[0]) == args.base + args.batch
+
+        # the old way: new combined inputs, read and synced from scratch
+        combined = pd.concat([base, batch], ignore_index=True)
+        combined.to_parquet(tmp / "all.parquet", index=False, row_group_size=256)
+        all_mapping = pd.concat([make_mapping(base), make_mapping(batch)])
+        all_mapping.to_parquet(tmp / "all_mapping.parquet", index=False)
+
+        def reload():
+            data = ChunkDataStore(str(tmp / "all.parquet")).read_queue_frame()
+            mapping = pd.read_parquet(tmp / "all_mapping.parquet")
+            sync_assignments(conn, data, mapping)
+
+        _, reload_s = timed(reload)
+        conn.close()
+
+    print(f"base chunks: {args.base}, batch chunks: {args.batch} ({added} added)")
+    print(f"{'ingest CLI (s)':>22} {ingest_s:10.2f}")
+    print(f"{'app refresh (s)':>22} {refresh_s:10.2f}")
+    print(f"{'full reload (s)':>22} {reload_s:10.2f}")
+
+
+if __name__ == "__main__":
+    main()
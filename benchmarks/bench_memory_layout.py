@@ -0,0 +1,107 @@
+"""
+Compare peak RSS of loading the call data with the original pandas path,
+the memory-mapped data.parquet and the normalized conversations/chunks layout.
+
+Each layout is measured in a fresh subprocess that loads the data, builds an
+annotator queue the way the app does and reads the texts of a few chunks.
+
+Usage (from the benchmarks directory):
+    python bench_memory_layout.py --chunks 100000
+"""
+
+import argparse
+import resource
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+from synthetic import make_call_data, make_mapping
+
+from config import CHUNK_ID_COLNAME, CONN_ID_COLNAME, FULL_TEXT_COLNAME
+from convert_inputs import convert_call_data
+from data_store import ChunkDataStore, NormalizedChunkStore
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def load(layout, tmp):
+    tmp = Path(tmp)
+    mapping = pd.read_parquet(tmp / "mapping.parquet")
+    username = mapping["Annotator"].iloc[0]
+
+    if layout == "pandas":
+        data = pd.read_parquet(tmp / "data.parquet")
+        queue = pd.merge(data, mapping, on=CONN_ID_COLNAME, how="left").query(
+            "Annotator == @username"
+        )
+        texts = queue[FULL_TEXT_COLNAME].head(100).tolist()
+    else:
+        if layout == "mmap":
+            store = ChunkDataStore(str(tmp / "data.parquet"))
+        else:
+            store = NormalizedChunkStore(
+                str(tmp / "chunks.parquet"), str(tmp / "conversations.parquet")
+            )
+        data = store.read_queue_frame()
+        queue = pd.merge(data, mapping, on=CONN_ID_COLNAME, how="left").query(
+            "Annotator == @username"
+        )
+        texts = [store.get_texts(i) for i in queue["row_idx"].head(100)]
+
+    assert len(texts) > 0
+    print(f"{peak_rss_mb():.0f}")
+
+
+def generate(tmp, n_chunks, chunks_per_call, text_len):
+    data = make_call_data(n_chunks, chunks_per_call, text_len)
+    data.sort_values([CONN_ID_COLNAME, CHUNK_ID_COLNAME]).to_parquet(
+        Path(tmp) / "data.parquet", index=False, row_group_size=256
+    )
+    make_mapping(data).to_parquet(Path(tmp) / "mapping.parquet", index=False)
+    convert_call_data(
+        str(Path(tmp) / "data.parquet"),
+        str(Path(tmp) / "chunks.parquet"),
+        str(Path(tmp) / "conversations.parquet"),
+    )
+
+
+def run_child(*args):
+    # every step runs in its own process: on Linux the peak RSS of a process
+    # is inherited across fork + exec, so the parent must stay small
+    return subprocess.run(
+        [sys.executable, __file__, *map(str, args)],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chunks", type=int, default=100_000)
+    parser.add_argument("--chunks-per-call", type=int, default=40)
+    parser.add_argument("--text-len", type=int, default=120)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        run_child("--generate", tmp, args.chunks, args.chunks_per_call, args.text_len)
+
+        print(f"{'layout':>12} {'peak RSS (MB)':>14}")
+        for layout in ["pandas", "mmap", "normalized"]:
+            out = run_child("--load", layout, tmp)
+            print(f"{layout:>12} {out.strip().splitlines()[-1]:>14}")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--load"]:
+        load(sys.argv[2], sys.argv[3])
+    elif sys.argv[1:2] == ["--generate"]:
+        generate(sys.argv[2], *map(int, sys.argv[3:6]))
+    else:
+        main()
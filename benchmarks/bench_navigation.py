@@ -0,0 +1,109 @@
+"""
+Microbenchmark of annotator navigation: the linear scans over an
+`annotated_idx` set used before, against ChunkNavigator.
+
+The scenario is an annotator near the end of a large queue: everything but
+a few chunks at the start and end has been annotated, so each scan has to
+walk over most of the queue. Both implementations are also replayed against
+the same random click sequence to check that they agree.
+
+Usage (from the benchmarks directory):
+    python bench_navigation.py --size 100000
+"""
+import argparse
+import random
+import time
+
+import synthetic  # noqa: F401  (puts src/ on the import path)
+
+from navigation import ChunkNavigator
+
+
+class ScanNavigator:
+    """The previous set + linear scan navigation, for comparison."""
+
+    def __init__(self, n_chunks):
+        self.n_chunks = n_chunks
+        self.annotated_idx = set()
+
+    def next(self, idx):
+        idx += 1
+        while True:
+            if idx == self.n_chunks:
+                idx = 0
+            if idx not in self.annotated_idx:
+                return idx
+            idx += 1
+
+    def prev(self, idx):
+        idx -= 1
+        while idx != -1:
+            if idx not in self.annotated_idx:
+                return idx
+            idx -= 1
+        return None
+
+    def remove(self, idx):
+        self.annotated_idx.add(idx)
+        if len(self.annotated_idx) == self.n_chunks:
+            return None
+        return self.next(idx)
+
+
+def check_equivalent(size, clicks, seed=0):
+    rng = random.Random(seed)
+    scan, linked = ScanNavigator(size), ChunkNavigator(size)
+    current = 0
+    for _ in range(clicks):
+        action = rng.choice(["next", "prev", "save"])
+        if action == "next":
+            expected, got = scan.next(current), linked.next(current)
+        elif action == "prev":
+            expected, got = scan.prev(current), linked.prev(current)
+        else:
+            expected, got = scan.remove(current), linked.remove(current)
+        assert expected == got, (action, current, expected, got)
+        if got is None and action == "save":
+            break
+        current = got if got is not None else current
+
+
+def time_clicks(navigator, current, clicks):
+    start = time.perf_counter()
+    for _ in range(clicks):
+        navigator.next(current)
+        navigator.prev(current)
+    return (time.perf_counter() - start) / (2 * clicks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=100_000)
+    parser.add_argument("--clicks", type=int, default=20)
+    args = parser.parse_args()
+
+    check_equivalent(size=500, clicks=5_000)
+
+    keep = 5
+    scan, linked = ScanNavigator(args.size), ChunkNavigator(args.size)
+    for idx in range(keep, args.size - keep):
+        scan.annotated_idx.add(idx)
+        linked.remove(idx)
+
+    # first pending chunk after the annotated block
+    current = args.size - keep
+    t_scan = time_clicks(scan, current, args.clicks)
+    t_linked = time_clicks(linked, current, args.clicks)
+
+    start = time.perf_counter()
+    ChunkNavigator(args.size)
+    t_build = time.perf_counter() - start
+
+    print(f"queue size {args.size:,}, {len(linked)} chunks pending")
+    print(f"  set + scan:     {t_scan * 1e6:>10.1f} us per click")
+    print(f"  ChunkNavigator: {t_linked * 1e6:>10.1f} us per click")
+    print(f"  ChunkNavigator build: {t_build * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
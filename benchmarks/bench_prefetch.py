@@ -0,0 +1,144 @@
+"""
+Median click-to-render latency of the annotator page with and without
+prefetching the next chunks.
+
+Builds a synthetic inputs/outputs tree in a temporary directory and drives
+the real annotator page with Streamlit's AppTest (streamlit.testing, which
+needs Streamlit 1.28 or later). The time of a click is the time of the
+rerun it triggers, until the page's elements are ready. Each setting runs in
+a fresh process because PREFETCH_CHUNKS is read at import.
+
+Usage (from the benchmarks directory):
+    python bench_prefetch.py --chunks 20000 --clicks 60
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from synthetic import make_call_data, make_mapping
+
+from config import INTENT_COLNAME, SUB_INTENT_COLNAME
+
+REPO = Path(__file__).resolve().parents[1]
+
+PAGE = """
+import streamlit as st
+
+from annot_page import get_annotator_page
+from helper_functions import init_pool, init_writer
+
+st.session_state["name"] = "Annotator 0"
+st.session_state["role"] = "annotator"
+init_writer()
+get_annotator_page(pool=init_pool())
+"""
+
+
+def build_tree(root, n_chunks, text_len):
+    for name in ["src", "inputs", "outputs", "logs"]:
+        (root / name).mkdir()
+    shutil.copy(REPO / "sample.pdf", root / "sample.pdf")
+    shutil.copy(REPO / "inputs" / "intents.parquet", root / "inputs")
+
+    data = make_call_data(n_chunks, text_len=text_len)
+    # the page expects label strings; empty means no default
+    data[[INTENT_COLNAME, SUB_INTENT_COLNAME]] = data[
+        [INTENT_COLNAME, SUB_INTENT_COLNAME]
+    ].fillna("")
+    data.to_parquet(root / "inputs" / "data.parquet", index=False, row_group_size=256)
+    make_mapping(data, n_annotators=1).to_parquet(
+        root / "inputs" / "mapping.parquet", index=False
+    )
+    (root / "src" / "page.py").write_text(PAGE)
+
+
+def measure(root, depth, clicks, think_s, button):
+    import config
+
+    config.PREFETCH_CHUNKS = depth
+    os.chdir(root / "src")
+
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(str(root / "src" / "page.py"), default_timeout=120)
+    app.run()
+
+    latencies = []
+    for _ in range(clicks):
+        # the annotator reads the chunk; prefetching happens meanwhile
+        time.sleep(think_s)
+        target = next(b for b in app.button if b.label == button)
+        start = time.perf_counter()
+        target.click().run()
+        latencies.append(time.perf_counter() - start)
+        assert not app.exception, app.exception
+
+    print(" ".join(f"{1000 * t:.2f}" for t in latencies))
+
+
+def run_child(root, depth, args, button):
+    out = subprocess.run(
+        [
+            sys.executable,
+            __file__,
+            "--child",
+            str(root),
+            "--depth",
+            str(depth),
+            "--clicks",
+            str(args.clicks),
+            "--think-s",
+            str(args.think_s),
+            "--button",
+            button,
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return np.array([float(x) for x in out.stdout.split()])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chunks", type=int, default=20_000)
+    parser.add_argument("--text-len", type=int, default=2000)
+    parser.add_argument("--clicks", type=int, default=60)
+    parser.add_argument("--think-s", type=float, default=0.2)
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--button", default="Save and Next")
+    parser.add_argument("--child")
+    args = parser.parse_args()
+
+    if args.child:
+        measure(Path(args.child), args.depth, args.clicks, args.think_s, args.button)
+        return
+
+    print(f"{'button':>14} {'prefetch':>9} {'median ms':>10} {'p90 ms':>8}")
+    for button in ["Next", "Save and Next"]:
+        for depth in [0, args.depth]:
+            # a fresh tree per run, so saved chunks don't carry over
+            with tempfile.TemporaryDirectory() as tmp:
+                root = Path(tmp)
+                build_tree(root, args.chunks, args.text_len)
+                try:
+                    ms = run_child(root, depth, args, button)
+                except subprocess.CalledProcessError as e:
+                    print(e.stderr[-2000:])
+                    raise
+            print(
+                f"{button:>14} {depth:>9} {np.median(ms):>10.1f} "
+                f"{np.percentile(ms, 90):>8.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
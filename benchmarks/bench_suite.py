@@ -0,0 +1,283 @@
+"""
+Time the main helpers of the annotation workflow on synthetic datasets of
+several sizes and write a JSON report that can be diffed between versions.
+
+For every size a dataset is written with `synthetic.write_dataset` into a
+temporary copy of the repository layout, and a fresh process runs the
+helpers from its src/ directory, as the app would:
+
+- read_dataframes (cold: first call of the process; warm: later calls)
+- get_unannotated_ids (baseline; cold: cache cleared first; warm: cached)
+- get_call_ids_to_be_reviewed (baseline)
+- get_review_window (keyset window of the same queue at random positions)
+- get_already_reviewed_calls
+- save_data_to_table (queued: the call itself; flushed: until committed)
+
+Usage (from the benchmarks directory):
+    python bench_suite.py --calls 250 2500 25000 --out report.json
+    python bench_suite.py --calls 250 2500 --compare report.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from synthetic import write_dataset
+
+REPO = Path(__file__).resolve().parents[1]
+
+
+def timings(fn, runs):
+    """Call `fn` `runs` times; return the durations in ms and the last result."""
+    durations = []
+    result = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn()
+        durations.append(1000 * (time.perf_counter() - start))
+    return durations, result
+
+
+def summarize(function, case, durations, rows=None):
+    durations = np.array(durations)
+    return {
+        "function": function,
+        "case": case,
+        "runs": len(durations),
+        "median_ms": round(float(np.median(durations)), 3),
+        "p95_ms": round(float(np.percentile(durations, 95)), 3),
+        "min_ms": round(float(durations.min()), 3),
+        "rows": rows,
+    }
+
+
+def run_helpers(root, runs, seed):
+    """Runs in the child process, from root/src."""
+    os.chdir(root / "src")
+
+    import streamlit as st
+
+    import baselines
+    import helper_functions as hf
+    from annotation_store import AnnotationStore
+
+    rng = np.random.default_rng(seed)
+    results = []
+    pool = hf.init_pool()
+    writer = hf.init_writer()
+
+    cold, (data, _, mapping) = timings(hf.read_dataframes, 1)
+    results.append(summarize("read_dataframes", "cold", cold, len(data)))
+    warm, _ = timings(hf.read_dataframes, runs)
+    results.append(summarize("read_dataframes", "warm", warm, len(data)))
+
+    annotated_df = AnnotationStore(pool).snapshot()
+    annotator = mapping["Annotator"].iloc[0]
+
+    def unannotated_cold():
+        baselines.get_unannotated_ids.clear()
+        return baselines.get_unannotated_ids(data, annotated_df, mapping, annotator)
+
+    cold, ids = timings(unannotated_cold, runs)
+    results.append(summarize("get_unannotated_ids", "cold", cold, len(ids)))
+    warm, ids = timings(
+        lambda: baselines.get_unannotated_ids(data, annotated_df, mapping, annotator),
+        runs,
+    )
+    results.append(summarize("get_unannotated_ids", "warm", warm, len(ids)))
+
+    reviewer = mapping["Reviewer"].iloc[0]
+    st.session_state["name"] = reviewer
+    st.session_state["role"] = "reviewer"
+    durations, review_ids = timings(
+        lambda: baselines.get_call_ids_to_be_reviewed(
+            data, mapping, annotated_df, reviewer, "reviewer"
+        ),
+        runs,
+    )
+    results.append(
+        summarize("get_call_ids_to_be_reviewed", "", durations, len(review_ids))
+    )
+
+    hf.init_work_queue(pool, data, mapping)
+    positions = rng.integers(max(len(review_ids), 1), size=runs)
+    keys = iter(
+        [
+            (review_ids["ConnectionID"].iloc[i], int(review_ids["chunk_id"].iloc[i]))
+            if len(review_ids)
+            else None
+            for i in positions
+        ]
+    )
+    durations, (window, _, n_chunks) = timings(
+        lambda: hf.get_review_window(pool, reviewer, next(keys)), runs
+    )
+    results.append(summarize("get_review_window", "", durations, n_chunks))
+
+    chunks = data.sample(runs, random_state=seed)
+    picks = iter(zip(chunks["ConnectionID"], chunks["chunk_id"]))
+    durations, _ = timings(
+        lambda: hf.get_already_reviewed_calls(pool, *next(picks)), runs
+    )
+    results.append(summarize("get_already_reviewed_calls", "", durations))
+
+    def save():
+        row = data.iloc[int(rng.integers(len(data)))]
+        hf.save_data_to_table(
+            pool,
+            f"{row['ConnectionID']}_chunk_{row['chunk_id']}",
+            reviewer,
+            "reviewer",
+            "2023-06-02",
+            "02:00:00",
+            "Intent 0",
+            "Intent 0 Sub 0",
+            "High",
+            "",
+        )
+
+    queued, _ = timings(save, runs)
+    results.append(summarize("save_data_to_table", "queued", queued))
+    flushed, _ = timings(lambda: (save(), writer.flush()), runs)
+    results.append(summarize("save_data_to_table", "flushed", flushed))
+
+    writer.close()
+    pool.close()
+    return results
+
+
+def run_size(args, n_calls):
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        for name in ["src", "logs"]:
+            (root / name).mkdir()
+        write_dataset(
+            root,
+            n_calls,
+            args.chunks_per_call,
+            args.text_len,
+            args.intents,
+            n_annotators=args.annotators,
+            n_reviewers=args.reviewers,
+            annotated_fraction=args.annotated_fraction,
+            reviewed_fraction=args.reviewed_fraction,
+            seed=args.seed,
+        )
+        out = subprocess.run(
+            [sys.executable, __file__, "--child", str(root)]
+            + ["--runs", str(args.runs), "--seed", str(args.seed)],
+            capture_output=True,
+            text=True,
+        )
+        if out.returncode:
+            sys.exit(out.stderr[-3000:])
+
+    results = json.loads(out.stdout.splitlines()[-1])
+    for result in results:
+        result.update(calls=n_calls, chunks=n_calls * args.chunks_per_call)
+    return results
+
+
+def version_info():
+    def git(*cmd):
+        return subprocess.run(
+            ["git", *cmd], cwd=REPO, capture_output=True, text=True
+        ).stdout.strip()
+
+    import pandas as pd
+    import streamlit as st
+
+    return {
+        "commit": git("rev-parse", "--short", "HEAD"),
+        "dirty": bool(git("status", "--porcelain", "--", "src")),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "streamlit": st.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def result_key(result):
+    return (result["chunks"], result["function"], result["case"])
+
+
+def compare(report, baseline):
+    """Print the median of every result next to the baseline's."""
+    old = {result_key(r): r for r in baseline["results"]}
+    print(f"baseline {baseline['version']['commit']} vs {report['version']['commit']}")
+    print(
+        f"{'chunks':>9} {'function':>28} {'case':>8} "
+        f"{'base ms':>10} {'new ms':>10} {'ratio':>7}"
+    )
+    for result in report["results"]:
+        before = old.get(result_key(result))
+        base = f"{before['median_ms']:>10.2f}" if before else f"{'-':>10}"
+        ratio = (
+            f"{result['median_ms'] / before['median_ms']:>6.2f}x"
+            if before and before["median_ms"]
+            else f"{'-':>7}"
+        )
+        print(
+            f"{result['chunks']:>9} {result['function']:>28} {result['case']:>8} "
+            f"{base} {result['median_ms']:>10.2f} {ratio}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--calls", type=int, nargs="+", default=[250, 2500, 25000])
+    parser.add_argument("--chunks-per-call", type=int, default=40)
+    parser.add_argument("--text-len", type=int, default=300)
+    parser.add_argument("--intents", type=int, default=10)
+    parser.add_argument("--annotators", type=int, default=30)
+    parser.add_argument("--reviewers", type=int, default=5)
+    parser.add_argument("--annotated-fraction", type=float, default=0.5)
+    parser.add_argument("--reviewed-fraction", type=float, default=0.2)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", type=Path, help="where to write the JSON report")
+    parser.add_argument("--compare", type=Path, help="a previous JSON report")
+    parser.add_argument("--child", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_helpers(args.child, args.runs, args.seed)))
+        return
+
+    results = []
+    for n_calls in args.calls:
+        results += run_size(args, n_calls)
+        print(f"{n_calls} calls done", file=sys.stderr)
+
+    params = {
+        k: v for k, v in vars(args).items() if k not in ("out", "compare", "child")
+    }
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "version": version_info(),
+        "params": params,
+        "results": sorted(results, key=result_key),
+    }
+
+    if args.out:
+        args.out.write_text(json.dumps(report, indent=2, sort_keys=True) + "\n")
+    if args.compare:
+        compare(report, json.loads(args.compare.read_text()))
+    elif not args.out:
+        print(json.dumps(report, indent=2, sort_keys=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Compare the indexed work queue against the pandas anti-join in
+`baselines.get_unannotated_ids` for a single annotator.
+
+Usage (from the benchmarks directory):
+    python bench_work_queue.py --sizes 10000 100000 1000000
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from synthetic import make_annotations, make_call_data, make_mapping
+
+from baselines import get_pending_call_ids, get_unannotated_ids
+from db_pool import ConnectionPool
+from work_queue import sync_assignments
+
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000]
+    )
+    parser.add_argument("--annotators", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'chunks':>10} {'pandas (s)':>12} {'queue (s)':>12} {'speedup':>9}")
+    for n_chunks in args.sizes:
+        data = make_call_data(n_chunks)
+        mapping = make_mapping(data, n_annotators=args.annotators)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            pool = ConnectionPool(str(Path(tmp) / "annotations.db"))
+            with pool.writer_connection() as conn:
+                annotated_df = make_annotations(conn, data, mapping)
+                sync_assignments(conn, data, mapping)
+
+            username = mapping["Annotator"].iloc[0]
+
+            def pandas_path():
+                get_unannotated_ids.clear()
+                get_unannotated_ids(data, annotated_df, mapping, username)
+
+            def queue_path():
+                get_pending_call_ids(pool, data, username)
+
+            t_pandas = best_of(pandas_path, args.repeat)
+            t_queue = best_of(queue_path, args.repeat)
+            print(
+                f"{n_chunks:>10} {t_pandas:>12.4f} {t_queue:>12.4f} {t_pandas / t_queue:>8.1f}x"
+            )
+            pool.close()
+
+
+if __name__ == "__main__":
+    main()
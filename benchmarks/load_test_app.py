@@ -0,0 +1,406 @@
+"""
+Headless load test of the annotator and reviewer flows: many simulated users
+sign in, render their page and click its buttons against a local database.
+
+A synthetic dataset and a utils/config.yaml with one user per annotator and
+reviewer of its mapping are written into a temporary copy of the repository
+layout. Each of `--processes` worker processes runs its share of the users
+as threads, from that src/ directory, as the app would. A user's session:
+
+- render: `app.show_user_page`, i.e. the role dispatch after the login and
+  the whole annotator or reviewer page
+- click: the callback of one of the buttons the render showed ("Save and
+  Next" with probability `--save-fraction`, otherwise "Next" or "Previous"),
+  called as Streamlit would before the next rerun
+
+Streamlit 1.22 has no AppTest, so the pages run in Streamlit's bare mode:
+widgets return their defaults, `st.session_state` is replaced by one dict
+per simulated session and buttons record their callbacks instead of being
+drawn. The password check of the login form is not exercised.
+
+Reports throughput, latency percentiles per action, the errors logged by the
+helpers (database locked / busy separately) and whether every save reached
+the database.
+
+Usage (from the benchmarks directory):
+    python load_test_app.py --annotators 30 --reviewers 5 --processes 4 --duration 60
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import yaml
+
+from synthetic import write_dataset
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+LOCK_ERRORS = ("database is locked", "database is busy", "database table is locked")
+
+
+class SessionStateStub:
+    """
+    Stands in for `st.session_state`: the state of the simulated session
+    running on the current thread.
+    """
+
+    def __init__(self):
+        object.__setattr__(self, "_local", threading.local())
+
+    def bind(self, state: dict) -> None:
+        self._local.state = state
+
+    @property
+    def _state(self) -> dict:
+        # a missing state must not raise AttributeError, or __getattr__
+        # would look it up again and recurse
+        state = getattr(self._local, "state", None)
+        if state is None:
+            raise RuntimeError(
+                f"No session state bound to thread {threading.current_thread().name}."
+            )
+        return state
+
+    def __getitem__(self, key):
+        return self._state[key]
+
+    def __setitem__(self, key, value):
+        self._state[key] = value
+
+    def __delitem__(self, key):
+        del self._state[key]
+
+    def __contains__(self, key):
+        return key in self._state
+
+    def __iter__(self):
+        return iter(self._state)
+
+    def __len__(self):
+        return len(self._state)
+
+    def __getattr__(self, key):
+        try:
+            return self._state[key]
+        except KeyError:
+            raise AttributeError(key) from None
+
+    def __setattr__(self, key, value):
+        self._state[key] = value
+
+    def get(self, key, default=None):
+        return self._state.get(key, default)
+
+    def pop(self, key, *default):
+        return self._state.pop(key, *default)
+
+    def setdefault(self, key, default=None):
+        return self._state.setdefault(key, default)
+
+    def keys(self):
+        return self._state.keys()
+
+    def items(self):
+        return self._state.items()
+
+
+class ErrorCounter(logging.Handler):
+    """Counts the errors the helpers log, database lock errors separately."""
+
+    def __init__(self):
+        super().__init__(level=logging.ERROR)
+        self.lock_errors = 0
+        self.other_errors = 0
+
+    def count(self, message: str) -> None:
+        with self.lock:
+            if any(e in message for e in LOCK_ERRORS):
+                self.lock_errors += 1
+            else:
+                self.other_errors += 1
+
+    def emit(self, record):
+        message = record.getMessage()
+        # the traceback logged after each error message
+        if not message.startswith("Traceback"):
+            self.count(message)
+
+
+def write_users(root, mapping_path):
+    """Write a utils/config.yaml with a user per annotator and reviewer."""
+    import pandas as pd
+
+    mapping = pd.read_parquet(mapping_path)
+    usernames = {}
+    for role, column in [("annotator", "Annotator"), ("reviewer", "Reviewer")]:
+        for name in sorted(mapping[column].unique()):
+            usernames[name.lower().replace(" ", "")] = {
+                "name": name,
+                "role": role,
+                "password": "",
+            }
+    config = {
+        "credentials": {"usernames": usernames},
+        "cookie": {"name": "load_test", "key": "load_test", "expiry_days": 0},
+    }
+    (root / "utils").mkdir()
+    with open(root / "utils" / "config.yaml", "w") as f:
+        yaml.safe_dump(config, f)
+    return usernames
+
+
+def run_users(root, users, start_at, duration, save_fraction, think_ms, seed):
+    """Runs in a worker process, from root/src."""
+    os.chdir(root / "src")
+
+    import streamlit as st
+    from streamlit.delta_generator import DeltaGenerator
+
+    session_state = SessionStateStub()
+    st.session_state = session_state
+    buttons = threading.local()
+
+    def button(self, label, key=None, help=None, on_click=None, args=None, **kwargs):
+        buttons.shown[label] = (on_click, args or (), kwargs.get("kwargs") or {})
+        return False
+
+    DeltaGenerator.button = button
+
+    # importing the app runs its module level code, e.g. the authenticator,
+    # which reads the session state of the importing thread
+    session_state.bind({})
+    import app
+    import helper_functions as hf
+
+    errors = ErrorCounter()
+    logging.getLogger().addHandler(errors)
+
+    latencies = {}
+    n_saves = 0
+    results_lock = threading.Lock()
+
+    def user(username, user_seed):
+        nonlocal n_saves
+        rng = random.Random(user_seed)
+        local = {}
+        saves = 0
+        session_state.bind({})
+        name = app.config["credentials"]["usernames"][username]["name"]
+
+        def timed(action, fn, *args):
+            start = time.perf_counter()
+            try:
+                fn(*args)
+            except Exception as e:
+                errors.count(str(e))
+            ms = 1000 * (time.perf_counter() - start)
+            local.setdefault(action, []).append(ms)
+
+        time.sleep(max(0.0, start_at - time.time()))
+        role = None
+        while time.time() < start_at + duration:
+            buttons.shown = {}
+            timed("render", app.show_user_page, name, username)
+            role = session_state.get("role")
+
+            if "Save and Next" not in buttons.shown:
+                # nothing left to annotate or review
+                break
+            if rng.random() < save_fraction:
+                label = "Save and Next"
+                saves += 1
+            else:
+                label = rng.choice(
+                    [b for b in ["Next", "Previous"] if b in buttons.shown]
+                )
+            on_click, args, kwargs = buttons.shown[label]
+            timed(f"click {label}", lambda: on_click(*args, **kwargs))
+            time.sleep(think_ms / 1000)
+
+        with results_lock:
+            n_saves += saves
+            for action, durations in local.items():
+                latencies.setdefault(f"{role} {action}", []).extend(durations)
+
+    threads = [
+        threading.Thread(target=user, args=(username, seed + i))
+        for i, username in enumerate(users)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    # commit the queued saves before the parent counts them
+    hf.init_writer().flush()
+    return {
+        "latencies": latencies,
+        "saves": n_saves,
+        "lock_errors": errors.lock_errors,
+        "other_errors": errors.other_errors,
+    }
+
+
+def count_annotations(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM annotations").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def summarize(results, elapsed):
+    latencies = {}
+    for result in results:
+        for action, durations in result["latencies"].items():
+            latencies.setdefault(action, []).extend(durations)
+
+    actions = {}
+    for action, durations in sorted(latencies.items()):
+        durations = np.array(durations)
+        actions[action] = {
+            "count": len(durations),
+            "per_s": round(len(durations) / elapsed, 2),
+            "p50_ms": round(float(np.percentile(durations, 50)), 2),
+            "p95_ms": round(float(np.percentile(durations, 95)), 2),
+            "p99_ms": round(float(np.percentile(durations, 99)), 2),
+            "max_ms": round(float(durations.max()), 2),
+        }
+    n_actions = sum(a["count"] for a in actions.values())
+    return {
+        "elapsed_s": round(elapsed, 2),
+        "actions_per_s": round(n_actions / elapsed, 2),
+        "saves": sum(r["saves"] for r in results),
+        "lock_errors": sum(r["lock_errors"] for r in results),
+        "other_errors": sum(r["other_errors"] for r in results),
+        "actions": actions,
+    }
+
+
+def print_report(report):
+    print(
+        f"{report['elapsed_s']:.1f}s, {report['actions_per_s']:,.1f} actions/s, "
+        f"{report['saves']} saves ({report['saved_rows']} rows written), "
+        f"{report['lock_errors']} lock errors, {report['other_errors']} other errors"
+    )
+    print(
+        f"{'action':>28} {'count':>7} {'per s':>8} "
+        f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}"
+    )
+    for action, a in report["actions"].items():
+        print(
+            f"{action:>28} {a['count']:>7} {a['per_s']:>8.1f} {a['p50_ms']:>9.1f} "
+            f"{a['p95_ms']:>9.1f} {a['p99_ms']:>9.1f} {a['max_ms']:>9.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--annotators", type=int, default=30)
+    parser.add_argument("--reviewers", type=int, default=5)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=60, help="seconds")
+    parser.add_argument("--save-fraction", type=float, default=0.8)
+    parser.add_argument("--think-ms", type=float, default=0)
+    parser.add_argument("--calls", type=int, default=2500)
+    parser.add_argument("--chunks-per-call", type=int, default=40)
+    parser.add_argument("--text-len", type=int, default=300)
+    parser.add_argument("--annotated-fraction", type=float, default=0.5)
+    parser.add_argument("--reviewed-fraction", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", type=Path, help="where to write the JSON report")
+    parser.add_argument("--child", type=Path, help=argparse.SUPPRESS)
+    parser.add_argument("--users", nargs="*", help=argparse.SUPPRESS)
+    parser.add_argument("--start-at", type=float, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        result = run_users(
+            args.child,
+            args.users,
+            args.start_at,
+            args.duration,
+            args.save_fraction,
+            args.think_ms,
+            args.seed,
+        )
+        print(json.dumps(result))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        for name in ["src", "logs"]:
+            (root / name).mkdir()
+        # the guidelines and page icon the app publishes as assets
+        shutil.copy(REPO_ROOT / "sample.pdf", root / "sample.pdf")
+        shutil.copytree(REPO_ROOT / "images", root / "images")
+        write_dataset(
+            root,
+            args.calls,
+            args.chunks_per_call,
+            args.text_len,
+            n_annotators=args.annotators,
+            n_reviewers=args.reviewers,
+            annotated_fraction=args.annotated_fraction,
+            reviewed_fraction=args.reviewed_fraction,
+            seed=args.seed,
+        )
+        users = list(write_users(root, root / "inputs" / "mapping.parquet"))
+        db_path = root / "outputs" / "annotations_db.db"
+        rows_before = count_annotations(db_path)
+
+        # the workers import the app first and then start together
+        start_at = time.time() + 10
+        workers = []
+        for p in range(args.processes):
+            cmd = [sys.executable, __file__, "--child", str(root)]
+            cmd += ["--users", *users[p :: args.processes]]
+            cmd += ["--start-at", str(start_at), "--duration", str(args.duration)]
+            cmd += ["--save-fraction", str(args.save_fraction)]
+            cmd += ["--think-ms", str(args.think_ms)]
+            cmd += ["--seed", str(args.seed + 1000 * p)]
+            workers.append(
+                subprocess.Popen(
+                    cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+                )
+            )
+
+        results = []
+        for worker in workers:
+            out, err = worker.communicate()
+            if worker.returncode:
+                sys.exit(err[-3000:])
+            results.append(json.loads(out.splitlines()[-1]))
+        elapsed = min(time.time() - start_at, args.duration)
+
+        report = summarize(results, elapsed)
+        report["saved_rows"] = count_annotations(db_path) - rows_before
+
+    report["params"] = {
+        k: v
+        for k, v in vars(args).items()
+        if k not in ("out", "child", "users", "start_at")
+    }
+    print_report(report)
+    if args.out:
+        args.out.write_text(
+            json.dumps(report, indent=2, sort_keys=True, default=str) + "\n"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Measure save throughput with many concurrent savers, comparing the old
+synchronous execute + commit path with the group-committing AnnotationWriter.
+
+Usage (from the benchmarks directory):
+    python load_test_writer.py --savers 50 --saves 40
+"""
+
+import argparse
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import synthetic  # noqa: F401  (puts src/ on the import path)
+
+from db_pool import ConnectionPool
+from annotation_schema import insert_annotations
+from db_writer import AnnotationWriter
+from migrations import apply_migrations
+
+
+def make_values(saver, i):
+    return (
+        f"c_{saver:06d}_chunk_{i}",
+        f"User {saver}",
+        "annotator",
+        "2023-06-02",
+        f"{i // 3600:02d}:{i // 60 % 60:02d}:{i % 60:02d}",
+        "Claim",
+        "Claim Status",
+        "High",
+        "",
+    )
+
+
+def run(save, n_savers, n_saves):
+    latencies = []
+    lock = threading.Lock()
+
+    def saver(saver_id):
+        local = []
+        for i in range(n_saves):
+            start = time.perf_counter()
+            save(make_values(saver_id, i))
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=saver, args=(s,)) for s in range(n_savers)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - start, latencies
+
+
+def report(name, elapsed, latencies, db_path):
+    rows = (
+        sqlite3.connect(db_path)
+        .execute("SELECT COUNT(*) FROM annotations")
+        .fetchone()[0]
+    )
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(
+        f"{name:>12}: {rows} rows in {elapsed:.2f}s "
+        f"({rows / elapsed:,.0f} saves/s), "
+        f"save call p50 {statistics.median(latencies) * 1000:.2f} ms, "
+        f"p99 {p99 * 1000:.2f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--savers", type=int, default=50)
+    parser.add_argument("--saves", type=int, default=40, help="saves per saver")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # baseline: one shared connection, commit per save
+        db_path = str(Path(tmp) / "sync.db")
+        conn = sqlite3.connect(db_path, check_same_thread=False)
+        apply_migrations(conn)
+        conn_lock = threading.Lock()
+
+        def sync_save(values):
+            with conn_lock:
+                insert_annotations(conn, [values])
+                conn.commit()
+
+        elapsed, latencies = run(sync_save, args.savers, args.saves)
+        report("synchronous", elapsed, latencies, db_path)
+        conn.close()
+
+        # group commit through the background writer
+        db_path = str(Path(tmp) / "writer.db")
+        pool = ConnectionPool(db_path)
+        with pool.writer_connection() as conn:
+            apply_migrations(conn)
+        writer = AnnotationWriter(pool)
+
+        start = time.perf_counter()
+        _, latencies = run(writer.submit, args.savers, args.saves)
+        writer.flush()
+        elapsed = time.perf_counter() - start
+        writer.close()
+        report("group commit", elapsed, latencies, db_path)
+        pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""
+Simulate hundreds of annotators pulling calls from the lease scheduler at once.
+
+The annotators run as threads spread over several processes, each with its
+own SQLite connection, like sessions of several app processes. Every
+annotator leases a call, saves its chunks and completes it until no call is
+left. Some annotators abandon a call halfway, so its lease has to expire and
+the rest of the call has to be picked up by someone else.
+
+At the end the simulation checks that every chunk was annotated exactly once
+and every call is done, and prints the lease acquisition latencies.
+
+Usage (from the benchmarks directory):
+    python sim_lease_scheduler.py --annotators 200 --processes 8
+"""
+
+import argparse
+import multiprocessing
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from synthetic import make_call_data, make_mapping
+
+from annotation_schema import insert_annotations
+from migrations import apply_migrations
+from work_queue import acquire_call, complete_call, get_leased_chunks, sync_assignments
+
+
+def connect(db):
+    conn = sqlite3.connect(db, timeout=60, check_same_thread=False)
+    conn.execute("PRAGMA busy_timeout = 60000")
+    return conn
+
+
+def run_annotator(db, name, lease_s, abandon_rate, seed, stats, write_lock):
+    rng = random.Random(seed)
+    conn = connect(db)
+    n_calls = n_chunks = n_abandoned = n_lost = 0
+
+    while True:
+        start = time.perf_counter()
+        connection_id = acquire_call(conn, name, lease_s=lease_s)
+        stats["acquire_s"].append(time.perf_counter() - start)
+        if connection_id is None:
+            break
+
+        pending = get_leased_chunks(conn, name)
+        abandon = rng.random() < abandon_rate
+        if abandon:
+            pending = pending.head(len(pending) // 2)
+
+        # like the annotator page, which renews the lease on every render and
+        # drops its queue when the lease moved on
+        if acquire_call(conn, name, lease_s=lease_s) != connection_id:
+            n_lost += 1
+            continue
+
+        now = datetime.now()
+        rows = [
+            (
+                call_id,
+                name,
+                "annotator",
+                now.strftime("%Y-%m-%d"),
+                now.strftime("%H:%M:%S"),
+                "Claim",
+                "Claim Status",
+                "High",
+                "",
+            )
+            for call_id in pending["new_id"]
+        ]
+        # the app saves through one writer thread per process
+        with write_lock, conn:
+            insert_annotations(conn, rows)
+        n_chunks += len(rows)
+
+        if abandon:
+            # walk away without completing; the lease has to run out
+            n_abandoned += 1
+            time.sleep(lease_s + rng.random())
+            continue
+
+        complete_call(conn, name)
+        n_calls += 1
+
+    conn.close()
+    stats["per_annotator"].append((name, n_calls, n_chunks, n_abandoned, n_lost))
+
+
+def run_process(db, names, lease_s, abandon_rate, seed):
+    stats = {"acquire_s": [], "per_annotator": []}
+    write_lock = threading.Lock()
+    threads = [
+        threading.Thread(
+            target=run_annotator,
+            args=(db, name, lease_s, abandon_rate, seed + i, stats, write_lock),
+        )
+        for i, name in enumerate(names)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chunks", type=int, default=40_000)
+    parser.add_argument("--chunks-per-call", type=int, default=20)
+    parser.add_argument("--annotators", type=int, default=200)
+    parser.add_argument("--reviewers", type=int, default=10)
+    parser.add_argument("--processes", type=int, default=8)
+    parser.add_argument("--lease-s", type=int, default=10)
+    parser.add_argument("--abandon-rate", type=float, default=0.02)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = str(Path(tmp) / "sim.db")
+        conn = connect(db)
+        conn.execute("PRAGMA journal_mode=WAL")
+        apply_migrations(conn)
+
+        data = make_call_data(args.chunks, chunks_per_call=args.chunks_per_call)
+        mapping = make_mapping(data, args.annotators, args.reviewers)
+        sync_assignments(conn, data, mapping)
+        n_calls = conn.execute("SELECT COUNT(*) FROM call_lease_table").fetchone()[0]
+
+        names = [f"Annotator {i}" for i in range(args.annotators)]
+        groups = [names[i :: args.processes] for i in range(args.processes)]
+
+        start = time.perf_counter()
+        with multiprocessing.Pool(args.processes) as pool:
+            results = pool.starmap(
+                run_process,
+                [
+                    (db, group, args.lease_s, args.abandon_rate, 1000 * i)
+                    for i, group in enumerate(groups)
+                ],
+            )
+        elapsed = time.perf_counter() - start
+
+        acquire_ms = 1000 * np.concatenate([r["acquire_s"] for r in results])
+        per_annotator = [row for r in results for row in r["per_annotator"]]
+        chunks_done = np.array([row[2] for row in per_annotator])
+
+        annotated, duplicated = conn.execute(
+            "SELECT COUNT(DISTINCT call_id), COUNT(*) - COUNT(DISTINCT call_id) "
+            "FROM annotations"
+        ).fetchone()
+        assigned = conn.execute("SELECT COUNT(*) FROM call_assignment_table").fetchone()
+        not_done = conn.execute(
+            "SELECT COUNT(*) FROM call_lease_table WHERE status != 'done'"
+        ).fetchone()[0]
+        conn.close()
+
+    print(
+        f"{args.annotators} annotators in {args.processes} processes, "
+        f"{n_calls} calls, {assigned[0]} chunks, lease {args.lease_s}s"
+    )
+    print(f"finished in {elapsed:.1f} s")
+    print(
+        f"lease acquisitions: {len(acquire_ms)} "
+        f"({len(acquire_ms) / elapsed:.0f}/s), latency ms "
+        f"p50 {np.percentile(acquire_ms, 50):.1f} "
+        f"p95 {np.percentile(acquire_ms, 95):.1f} "
+        f"p99 {np.percentile(acquire_ms, 99):.1f} "
+        f"max {acquire_ms.max():.1f}"
+    )
+    print(
+        f"abandoned calls: {sum(row[3] for row in per_annotator)}, "
+        f"leases lost before saving: {sum(row[4] for row in per_annotator)}"
+    )
+    print(
+        f"chunks per annotator: min {chunks_done.min()} "
+        f"median {np.median(chunks_done):.0f} max {chunks_done.max()}"
+    )
+    print(
+        f"annotated chunks: {annotated} / {assigned[0]}, "
+        f"annotated twice: {duplicated}, calls not done: {not_done}"
+    )
+    assert annotated == assigned[0] and duplicated == 0 and not_done == 0
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Stress the connection pool with concurrent readers and writers and fail if
+any of them hits "database is locked", if the background writer fails to
+commit a row, or if the table doesn't end up with every row written.
+
+Usage (from the benchmarks directory):
+    python stress_db_pool.py --readers 32 --writers 16 --seconds 10
+"""
+
+import argparse
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import synthetic  # noqa: F401  (puts src/ on the import path)
+
+from annotation_store import AnnotationStore
+from db_pool import ConnectionPool
+from annotation_schema import insert_annotations
+from db_writer import AnnotationWriter
+from migrations import apply_migrations
+
+REVIEW_QUERY = (
+    "SELECT * FROM annotations_flat "
+    "WHERE call_id = ? AND username = ? "
+    "ORDER BY created_at DESC, annotation_id DESC "
+    "LIMIT 1"
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--readers", type=int, default=32)
+    parser.add_argument("--writers", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+
+    errors = []
+    counts = {"reads": 0, "writes": 0, "queued": 0}
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = ConnectionPool(str(Path(tmp) / "annotations.db"))
+        with pool.writer_connection() as conn:
+            apply_migrations(conn)
+
+        writer = AnnotationWriter(pool)
+        store = AnnotationStore(pool)
+
+        def record(kind, e=None):
+            with lock:
+                if e is None:
+                    counts[kind] += 1
+                else:
+                    errors.append(f"{kind}: {e}")
+
+        def reader(reader_id):
+            i = 0
+            while not stop.is_set():
+                try:
+                    with pool.reader() as conn:
+                        conn.execute(
+                            REVIEW_QUERY, (f"c_{i % 100}_chunk_0", f"User {i % 7}")
+                        ).fetchall()
+                    if reader_id % 4 == 0:
+                        store.snapshot()
+                    record("reads")
+                except sqlite3.OperationalError as e:
+                    record("reads", e)
+                i += 1
+
+        def queued_writer(writer_id):
+            i = 0
+            while not stop.is_set():
+                values = (
+                    f"c_{writer_id}_chunk_{i}",
+                    f"User {writer_id}",
+                    "annotator",
+                    "2023-06-02",
+                    f"{i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d}",
+                    "Claim",
+                    "Claim Status",
+                    "High",
+                    "",
+                )
+                writer.submit(values)
+                record("queued")
+                i += 1
+
+        def direct_writer():
+            # a second writer outside the background thread, as done by
+            # maintenance jobs, to make sure both contend for the write lock
+            i = 0
+            while not stop.is_set():
+                try:
+                    with pool.writer_connection() as conn, conn:
+                        values = (
+                            f"direct_chunk_{i}",
+                            "Admin",
+                            "reviewer",
+                            "2023-06-02",
+                            f"{i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d}",
+                            "",
+                            "",
+                            "High",
+                            "",
+                        )
+                        insert_annotations(conn, [values])
+                    record("writes")
+                except sqlite3.OperationalError as e:
+                    record("writes", e)
+                i += 1
+
+        threads = [
+            threading.Thread(target=reader, args=(r,)) for r in range(args.readers)
+        ]
+        threads += [
+            threading.Thread(target=queued_writer, args=(w,))
+            for w in range(args.writers)
+        ]
+        threads.append(threading.Thread(target=direct_writer))
+
+        for t in threads:
+            t.start()
+        time.sleep(args.seconds)
+        stop.set()
+        for t in threads:
+            t.join()
+        writer.close()
+        with pool.reader() as conn:
+            n_rows = conn.execute("SELECT COUNT(*) FROM annotations").fetchone()[0]
+        pool.close()
+
+    print(
+        f"{counts['reads']} reads, {counts['queued']} queued writes, "
+        f"{counts['writes']} direct writes, {len(errors)} errors, "
+        f"{writer.n_failed} failed commits, {n_rows} rows"
+    )
+    for error in errors[:10]:
+        print(f"  {error}")
+
+    locked = [e for e in errors if "database is locked" in e]
+    if locked:
+        sys.exit(f"FAILED: {len(locked)} 'database is locked' errors")
+    if writer.n_failed:
+        sys.exit(f"FAILED: the writer failed to commit {writer.n_failed} rows")
+    if n_rows != counts["queued"] + counts["writes"]:
+        sys.exit(
+            f"FAILED: {n_rows} rows saved for "
+            f"{counts['queued'] + counts['writes']} writes"
+        )
+
+
+if __name__ == "__main__":
+    main()
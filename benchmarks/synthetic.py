@@ -0,0 +1,301 @@
+"""
+Synthetic inputs shaped like the files in `inputs/`, for benchmarks.
+
+Run as a script to write a whole dataset (inputs/ and the annotations
+database in outputs/) to a directory:
+    python synthetic.py <dir> --calls 2500 --chunks-per-call 40 --text-len 300
+"""
+
+import argparse
+import sqlite3
+import sys
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from config import (  # noqa: E402
+    CHUNK_ID_COLNAME,
+    CONN_ID_COLNAME,
+    FULL_TEXT_COLNAME,
+    INTENT_COLNAME,
+    SUB_INTENT_COLNAME,
+    TEXT_COLNAME,
+)
+from annotation_schema import insert_annotations  # noqa: E402
+from migrations import apply_migrations  # noqa: E402
+
+
+def make_intents(n_intents: int = 10, subintents_per_intent: int = 3) -> pd.DataFrame:
+    """Build an intents.parquet-like taxonomy of intents and their sub intents."""
+    return pd.DataFrame(
+        [
+            (f"Intent {i}", f"Intent {i} Sub {j}")
+            for i in range(n_intents)
+            for j in range(subintents_per_intent)
+        ],
+        columns=["Intent", "Sub Intent"],
+    )
+
+
+def _sample_labels(rng, intents: pd.DataFrame, n: int):
+    """Pick `n` random (intent, sub intent) pairs of the taxonomy."""
+    picks = intents.iloc[rng.integers(0, len(intents), n)]
+    return picks["Intent"].to_numpy(), picks["Sub Intent"].to_numpy()
+
+
+def make_call_data(
+    n_chunks: int,
+    chunks_per_call: int = 40,
+    text_len: int = 0,
+    seed: int = 0,
+    intents: Optional[pd.DataFrame] = None,
+    labelled_fraction: float = 0.5,
+) -> pd.DataFrame:
+    """
+    Build a data.parquet-like frame with `n_chunks` rows.
+
+    A `labelled_fraction` of the chunks get default labels: random pairs of
+    `intents` if given, otherwise Claim / Claim Status.
+    """
+    rng = np.random.default_rng(seed)
+    n_calls = max(1, n_chunks // chunks_per_call)
+    call_idx = np.arange(n_chunks) // chunks_per_call
+    conn_ids = pd.Series([f"c_{i:012d}" for i in range(n_calls + 1)])
+
+    data = pd.DataFrame(
+        {
+            CHUNK_ID_COLNAME: np.arange(n_chunks) % chunks_per_call,
+            CONN_ID_COLNAME: conn_ids.iloc[call_idx].to_numpy(),
+        }
+    )
+    if text_len:
+        filler = "x" * text_len
+        data[TEXT_COLNAME] = (
+            "agent: chunk "
+            + data[CHUNK_ID_COLNAME].astype(str)
+            + " of "
+            + data[CONN_ID_COLNAME]
+            + " "
+            + filler
+        ).str.slice(0, text_len)
+        data[FULL_TEXT_COLNAME] = data.groupby(CONN_ID_COLNAME)[TEXT_COLNAME].transform(
+            "\n".join
+        )
+    else:
+        data[TEXT_COLNAME] = ""
+        data[FULL_TEXT_COLNAME] = ""
+    labelled = rng.random(n_chunks) < labelled_fraction
+    if intents is None:
+        intent, subintent = "Claim", "Claim Status"
+    else:
+        intent, subintent = _sample_labels(rng, intents, n_chunks)
+    data[INTENT_COLNAME] = np.where(labelled, intent, None)
+    data[SUB_INTENT_COLNAME] = np.where(labelled, subintent, None)
+    return data
+
+
+def make_mapping(
+    call_data: pd.DataFrame, n_annotators: int = 30, n_reviewers: int = 5
+) -> pd.DataFrame:
+    """Assign every call round-robin to an annotator and a reviewer."""
+    conn_ids = call_data[CONN_ID_COLNAME].drop_duplicates().reset_index(drop=True)
+    return pd.DataFrame(
+        {
+            CONN_ID_COLNAME: conn_ids,
+            "Annotator": [f"Annotator {i % n_annotators}" for i in conn_ids.index],
+            "Reviewer": [f"Reviewer {i % n_reviewers}" for i in conn_ids.index],
+        }
+    )
+
+
+def make_annotations(
+    conn: sqlite3.Connection,
+    call_data: pd.DataFrame,
+    mapping: pd.DataFrame,
+    annotated_fraction: float = 0.5,
+    seed: int = 0,
+    reviewed_fraction: float = 0.0,
+    intents: Optional[pd.DataFrame] = None,
+) -> pd.DataFrame:
+    """
+    Insert annotator rows for a random fraction of the chunks, and reviewer
+    rows for a `reviewed_fraction` of those.
+
+    The labels are random pairs of `intents` if given, otherwise Claim /
+    Claim Status.
+    """
+    rng = np.random.default_rng(seed)
+    rows = call_data.merge(mapping, on=CONN_ID_COLNAME)
+    rows = rows[rng.random(len(rows)) < annotated_fraction]
+    parts = [(rows, "Annotator", "annotator", "00:00:00")]
+    if reviewed_fraction:
+        reviewed = rows[rng.random(len(rows)) < reviewed_fraction]
+        parts.append((reviewed, "Reviewer", "reviewer", "01:00:00"))
+
+    frames = []
+    for part, user_col, role, time in parts:
+        if intents is None:
+            intent, subintent = "Claim", "Claim Status"
+        else:
+            intent, subintent = _sample_labels(rng, intents, len(part))
+        frames.append(
+            pd.DataFrame(
+                {
+                    "call_id": part[CONN_ID_COLNAME]
+                    + "_chunk_"
+                    + part[CHUNK_ID_COLNAME].astype(str),
+                    "username": part[user_col],
+                    "role": role,
+                    "date": "2023-06-02",
+                    "time": time,
+                    "case_type": intent,
+                    "subcase_type": subintent,
+                    "confidence": "High",
+                    "comments": "",
+                }
+            )
+        )
+    annotations = pd.concat(frames, ignore_index=True)
+    apply_migrations(conn)
+    with conn:
+        insert_annotations(conn, annotations.itertuples(index=False, name=None))
+    return annotations
+
+
+def make_reviewed_annotations(
+    conn: sqlite3.Connection,
+    n_annotations: int,
+    intent_names,
+    n_annotators: int = 30,
+    n_reviewers: int = 5,
+    agreement: float = 0.8,
+    seed: int = 0,
+) -> None:
+    """
+    Bulk insert annotator and reviewer annotations straight into the v2 tables.
+
+    Half of the rows are annotator rows; every annotated chunk is reviewed
+    once, and the reviewer keeps each annotator label with probability
+    `agreement`.
+    """
+    rng = np.random.default_rng(seed)
+    n_chunks = n_annotations // 2
+    n_labels = len(intent_names)
+
+    annotator_labels = rng.random((n_chunks, n_labels)) < 1.5 / n_labels
+    flips = rng.random((n_chunks, n_labels)) < (1 - agreement) / n_labels
+    reviewer_labels = annotator_labels ^ flips
+    label_matrix = np.concatenate([annotator_labels, reviewer_labels])
+
+    chunk = np.tile(np.arange(n_chunks), 2)
+    is_review = np.arange(2 * n_chunks) >= n_chunks
+    annotation_rows = zip(
+        range(1, 2 * n_chunks + 1),
+        (f"c_{i:012d}_chunk_0" for i in chunk),
+        (
+            f"Reviewer {c % n_reviewers}" if r else f"Annotator {c % n_annotators}"
+            for c, r in zip(chunk.tolist(), is_review.tolist())
+        ),
+        ("reviewer" if r else "annotator" for r in is_review.tolist()),
+        (1_686_000_000 + int(r) for r in is_review.tolist()),
+    )
+
+    apply_migrations(conn)
+    with conn:
+        conn.executemany(
+            "INSERT INTO labels (label_id, kind, name) VALUES (?, 'intent', ?)",
+            enumerate(intent_names, start=1),
+        )
+        conn.executemany(
+            "INSERT INTO annotations (annotation_id, call_id, username, role, "
+            "created_at, confidence, comments) VALUES (?, ?, ?, ?, ?, 'High', '')",
+            annotation_rows,
+        )
+        rows, labels = np.nonzero(label_matrix)
+        conn.executemany(
+            "INSERT INTO annotation_labels (annotation_id, label_id, position) "
+            "VALUES (?, ?, 0)",
+            zip((rows + 1).tolist(), (labels + 1).tolist()),
+        )
+
+
+def write_dataset(
+    root: Path,
+    n_calls: int,
+    chunks_per_call: int = 40,
+    text_len: int = 300,
+    n_intents: int = 10,
+    subintents_per_intent: int = 3,
+    n_annotators: int = 30,
+    n_reviewers: int = 5,
+    annotated_fraction: float = 0.5,
+    reviewed_fraction: float = 0.2,
+    seed: int = 0,
+) -> None:
+    """
+    Write a synthetic dataset laid out like the repository: inputs/ with
+    data.parquet, intents.parquet and mapping.parquet, and the annotations
+    database in outputs/ (paths as in `config.py`, relative to `root/src`).
+    """
+    (root / "inputs").mkdir(parents=True, exist_ok=True)
+    (root / "outputs").mkdir(parents=True, exist_ok=True)
+
+    intents = make_intents(n_intents, subintents_per_intent)
+    data = make_call_data(
+        n_calls * chunks_per_call, chunks_per_call, text_len, seed, intents
+    )
+    mapping = make_mapping(data, n_annotators, n_reviewers)
+
+    intents.to_parquet(root / "inputs" / "intents.parquet", index=False)
+    data.to_parquet(root / "inputs" / "data.parquet", index=False, row_group_size=256)
+    mapping.to_parquet(root / "inputs" / "mapping.parquet", index=False)
+
+    conn = sqlite3.connect(root / "outputs" / "annotations_db.db")
+    make_annotations(
+        conn,
+        data,
+        mapping,
+        annotated_fraction,
+        seed,
+        reviewed_fraction=reviewed_fraction,
+        intents=intents,
+    )
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("root", type=Path)
+    parser.add_argument("--calls", type=int, default=2500)
+    parser.add_argument("--chunks-per-call", type=int, default=40)
+    parser.add_argument("--text-len", type=int, default=300)
+    parser.add_argument("--intents", type=int, default=10)
+    parser.add_argument("--subintents-per-intent", type=int, default=3)
+    parser.add_argument("--annotators", type=int, default=30)
+    parser.add_argument("--reviewers", type=int, default=5)
+    parser.add_argument("--annotated-fraction", type=float, default=0.5)
+    parser.add_argument("--reviewed-fraction", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    write_dataset(
+        args.root,
+        args.calls,
+        args.chunks_per_call,
+        args.text_len,
+        args.intents,
+        args.subintents_per_intent,
+        args.annotators,
+        args.reviewers,
+        args.annotated_fraction,
+        args.reviewed_fraction,
+        args.seed,
+    )
+
+
+if __name__ == "__main__":
+    main()
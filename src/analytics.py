@@ -0,0 +1,491 @@
+import argparse
+import logging
+import sqlite3
+import traceback
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from annotation_schema import INTENT_LABEL, SUBINTENT_LABEL
+from config import DB_PATH, INTENTS_PATH
+
+# roles whose annotations are taken as the reference labels
+REVIEWER_ROLES = ("reviewer", "admin")
+ANNOTATOR_ROLE = "annotator"
+
+
+def get_label_options(intent_df: pd.DataFrame, kind: str = INTENT_LABEL) -> List[str]:
+    """
+    Get the labels of one kind in the order of intents.parquet.
+
+    Args:
+        intent_df (pd.DataFrame): The dataframe containing the intent data.
+        kind (str): "intent" or "subintent".
+
+    Returns:
+        List[str]: The unique labels.
+    """
+    column = "Intent" if kind == INTENT_LABEL else "Sub Intent"
+    return intent_df[column].dropna().unique().tolist()
+
+
+class LabelledAnnotations(NamedTuple):
+    """
+    All annotations with their labels of one kind, as integer arrays.
+
+    Rows are sorted by (call_id, username, created_at, annotation_id), the
+    order of the idx_annotations_call_user_ts index, so the rows of a chunk
+    are contiguous and the latest annotation of a user on a chunk is the last
+    row of its run.
+    """
+
+    annotation_id: np.ndarray
+    created_at: np.ndarray
+    chunk: np.ndarray  # chunk number of every row, increasing
+    user: np.ndarray  # position of the username in `usernames`
+    usernames: np.ndarray
+    is_review: np.ndarray
+    matrix: np.ndarray  # multi-hot labels, one column per label name
+
+
+class ReviewedChunks(NamedTuple):
+    """The latest annotator and reviewer labels of every reviewed chunk."""
+
+    annotator: np.ndarray  # user position of the annotator of every chunk
+    reviewer: np.ndarray
+    annotator_matrix: np.ndarray
+    reviewer_matrix: np.ndarray
+
+
+# separates the text values of a group_concat column
+_SEPARATOR = "\x1f"
+
+
+def _parse_integers(values: Optional[str]) -> np.ndarray:
+    """Parse a comma separated group_concat of integers."""
+    if not values:
+        return np.zeros(0, dtype=np.int64)
+    return np.array(values.split(","), dtype=np.int64)
+
+
+def _split_strings(values: Optional[str]) -> np.ndarray:
+    """Split a group_concat of text values joined by _SEPARATOR."""
+    if values is None:
+        return np.zeros(0, dtype=object)
+    return np.array(values.split(_SEPARATOR), dtype=object)
+
+
+def load_label_matrix(
+    conn: sqlite3.Connection, label_names: Sequence[str], kind: str = INTENT_LABEL
+) -> LabelledAnnotations:
+    """
+    Load every annotation with its labels as a multi-hot matrix.
+
+    Reads the annotations and annotation_labels tables directly, so no label
+    strings are split. Labels that are not in `label_names` are ignored.
+
+    Fetching a million rows through the sqlite3 module costs a few seconds of
+    Python object creation alone, so each column is fetched as a single
+    group_concat string instead and parsed with NumPy. All aggregates of one
+    query see the rows in the same order, so the columns stay aligned.
+
+    Args:
+        conn (sqlite3.Connection): Connection object to the database.
+        label_names (Sequence[str]): Labels, one matrix column each.
+        kind (str): "intent" or "subintent".
+
+    Returns:
+        LabelledAnnotations: The annotations and their label matrix.
+    """
+    try:
+        reviewer_roles = ", ".join(f"'{role}'" for role in REVIEWER_ROLES)
+        ids, created, review_flags, call_ids, users = conn.execute(
+            "SELECT group_concat(annotation_id), group_concat(created_at), "
+            f"group_concat(ifnull(role IN ({reviewer_roles}), 0), ''), "
+            f"group_concat(call_id, '{_SEPARATOR}'), "
+            f"group_concat(ifnull(username, ''), '{_SEPARATOR}') "
+            "FROM annotations"
+        ).fetchone()
+
+        annotation_id = _parse_integers(ids)
+        created_at = _parse_integers(created)
+        flags = (review_flags or "").encode()
+        is_review = np.frombuffer(flags, dtype=np.uint8) == ord("1")
+        chunk, _ = pd.factorize(_split_strings(call_ids))
+        user, usernames = pd.factorize(_split_strings(users))
+
+        order = np.lexsort((annotation_id, created_at, user, chunk))
+        annotation_id, created_at, is_review = (
+            annotation_id[order],
+            created_at[order],
+            is_review[order],
+        )
+        chunk, user = chunk[order], user[order]
+
+        # label_id -> matrix column, -1 for other kinds and unknown labels
+        label_ids = dict(
+            conn.execute(
+                "SELECT name, label_id FROM labels WHERE kind = ?", (kind,)
+            ).fetchall()
+        )
+        max_label_id = conn.execute("SELECT ifnull(max(label_id), 0) FROM labels")
+        label_column = np.full(max_label_id.fetchone()[0] + 1, -1)
+        for column, name in enumerate(label_names):
+            if name in label_ids:
+                label_column[label_ids[name]] = column
+        unknown = set(label_ids) - set(label_names)
+        if unknown:
+            logging.warning(
+                f"Ignoring {kind} labels missing from the intents file: {unknown}"
+            )
+
+        links = _parse_integers(
+            conn.execute(
+                "SELECT group_concat((annotation_id << 32) | label_id) "
+                "FROM annotation_labels"
+            ).fetchone()[0]
+        )
+        link_columns = label_column[links & 0xFFFFFFFF]
+        known = link_columns >= 0
+
+        by_id = np.argsort(annotation_id)
+        link_rows = by_id[np.searchsorted(annotation_id[by_id], links[known] >> 32)]
+        matrix = np.zeros((len(annotation_id), len(label_names)), dtype=bool)
+        matrix[link_rows, link_columns[known]] = True
+
+        return LabelledAnnotations(
+            annotation_id=annotation_id,
+            created_at=created_at,
+            chunk=chunk,
+            user=user,
+            usernames=np.asarray(usernames, dtype=object),
+            is_review=is_review,
+            matrix=matrix,
+        )
+
+    except Exception as e:
+        logging.error(f"An error occurred in 'load_label_matrix': {e}")
+        logging.error(traceback.format_exc())
+        raise
+
+
+def _last_of_runs(keys: Sequence[np.ndarray]) -> np.ndarray:
+    """Mask of the rows where any of the sorted `keys` changes on the next row."""
+    n_rows = len(keys[0])
+    last = np.zeros(n_rows, dtype=bool)
+    if n_rows:
+        last[-1] = True
+        for key in keys:
+            last[:-1] |= key[1:] != key[:-1]
+    return last
+
+
+def _latest_per_chunk(annotations: LabelledAnnotations, mask: np.ndarray) -> np.ndarray:
+    """Positions of the latest masked annotation of every chunk, by chunk."""
+    positions = np.flatnonzero(mask)
+    order = np.lexsort(
+        (
+            annotations.annotation_id[positions],
+            annotations.created_at[positions],
+            annotations.chunk[positions],
+        )
+    )
+    positions = positions[order]
+    return positions[_last_of_runs([annotations.chunk[positions]])]
+
+
+def pair_with_reviews(annotations: LabelledAnnotations) -> ReviewedChunks:
+    """
+    Align the latest annotator labels of each chunk with its latest review.
+
+    Args:
+        annotations (LabelledAnnotations): Annotations from `load_label_matrix`.
+
+    Returns:
+        ReviewedChunks: One entry per chunk that has both an annotator and a
+            reviewer annotation.
+    """
+    annotated = _latest_per_chunk(annotations, ~annotations.is_review)
+    reviewed = _latest_per_chunk(annotations, annotations.is_review)
+
+    # both are sorted by chunk, so the chunks they share line up in order
+    _, a_idx, r_idx = np.intersect1d(
+        annotations.chunk[annotated],
+        annotations.chunk[reviewed],
+        assume_unique=True,
+        return_indices=True,
+    )
+    annotated, reviewed = annotated[a_idx], reviewed[r_idx]
+
+    return ReviewedChunks(
+        annotator=annotations.user[annotated],
+        reviewer=annotations.user[reviewed],
+        annotator_matrix=annotations.matrix[annotated],
+        reviewer_matrix=annotations.matrix[reviewed],
+    )
+
+
+def _group_sums(codes: np.ndarray, n_groups: int, values: np.ndarray) -> np.ndarray:
+    """Sum the rows of `values` per group code, one output row per group."""
+    order = np.argsort(codes, kind="stable")
+    sorted_codes = codes[order]
+    sums = np.zeros((n_groups, values.shape[1]), dtype=np.int64)
+    present = np.unique(sorted_codes)
+    if len(present):
+        starts = np.searchsorted(sorted_codes, present)
+        sums[present] = np.add.reduceat(values[order].astype(np.int64), starts, axis=0)
+    return sums
+
+
+def _scores(tp: np.ndarray, predicted: np.ndarray, actual: np.ndarray) -> Dict:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        precision = np.where(predicted > 0, tp / predicted, np.nan)
+        recall = np.where(actual > 0, tp / actual, np.nan)
+        f1 = np.where(predicted + actual > 0, 2 * tp / (predicted + actual), np.nan)
+    return {"precision": precision, "recall": recall, "f1": f1}
+
+
+def label_scores(
+    chunks: ReviewedChunks,
+    label_names: Sequence[str],
+    usernames: Optional[np.ndarray] = None,
+) -> pd.DataFrame:
+    """
+    Per label precision and recall of the annotators against the reviewers.
+
+    Args:
+        chunks (ReviewedChunks): Reviewed chunks from `pair_with_reviews`.
+        label_names (Sequence[str]): Name of each matrix column.
+        usernames (np.ndarray, optional): Score every annotator separately,
+            naming them from these usernames.
+
+    Returns:
+        pd.DataFrame: label, support (chunks the reviewer gave the label),
+            predicted (chunks the annotator gave the label), true_positives,
+            precision, recall and f1, plus annotator when scored per annotator.
+    """
+    a, r = chunks.annotator_matrix, chunks.reviewer_matrix
+    if usernames is not None:
+        groups, codes = np.unique(chunks.annotator, return_inverse=True)
+        tp = _group_sums(codes, len(groups), a & r)
+        predicted = _group_sums(codes, len(groups), a)
+        actual = _group_sums(codes, len(groups), r)
+    else:
+        tp = (a & r).sum(axis=0, dtype=np.int64)[None, :]
+        predicted = a.sum(axis=0, dtype=np.int64)[None, :]
+        actual = r.sum(axis=0, dtype=np.int64)[None, :]
+
+    n_groups, n_labels = tp.shape
+    scores = pd.DataFrame(
+        {
+            "label": np.tile(np.asarray(label_names, dtype=object), n_groups),
+            "support": actual.ravel(),
+            "predicted": predicted.ravel(),
+            "true_positives": tp.ravel(),
+            **{k: v.ravel() for k, v in _scores(tp, predicted, actual).items()},
+        }
+    )
+    if usernames is not None:
+        scores.insert(0, "annotator", np.repeat(usernames[groups], n_labels))
+    return scores
+
+
+def cohen_kappa(chunks: ReviewedChunks, usernames: np.ndarray) -> pd.DataFrame:
+    """
+    Cohen's kappa of every annotator and reviewer pair.
+
+    Every (chunk, label) is treated as a yes/no decision by both raters, so the
+    kappa pools the agreement over all labels of the chunks the two shared.
+
+    Args:
+        chunks (ReviewedChunks): Reviewed chunks from `pair_with_reviews`.
+        usernames (np.ndarray): Username of every user position.
+
+    Returns:
+        pd.DataFrame: annotator, reviewer, n_chunks, observed_agreement and
+            kappa, one row per pair.
+    """
+    a, r = chunks.annotator_matrix, chunks.reviewer_matrix
+    pair_keys = chunks.annotator * len(usernames) + chunks.reviewer
+    pairs, codes = np.unique(pair_keys, return_inverse=True)
+    n_labels = a.shape[1]
+
+    # per pair: chunks, labels given by each rater and labels given by both
+    counts = _group_sums(
+        codes,
+        len(pairs),
+        np.column_stack(
+            [
+                np.ones(len(codes), dtype=np.int64),
+                a.sum(axis=1),
+                r.sum(axis=1),
+                (a & r).sum(axis=1),
+                (~a & ~r).sum(axis=1),
+            ]
+        ),
+    )
+    n_chunks, a_yes, r_yes, both_yes, both_no = counts.T
+    decisions = n_chunks * n_labels
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        observed = (both_yes + both_no) / decisions
+        p_a, p_r = a_yes / decisions, r_yes / decisions
+        expected = p_a * p_r + (1 - p_a) * (1 - p_r)
+        kappa = np.where(expected < 1, (observed - expected) / (1 - expected), np.nan)
+
+    return pd.DataFrame(
+        {
+            "annotator": usernames[pairs // len(usernames)],
+            "reviewer": usernames[pairs % len(usernames)],
+            "n_chunks": n_chunks,
+            "observed_agreement": observed,
+            "kappa": kappa,
+        }
+    )
+
+
+def fleiss_kappa(
+    annotations: LabelledAnnotations, label_names: Sequence[str]
+) -> pd.DataFrame:
+    """
+    Fleiss' kappa of every label over all raters of each chunk.
+
+    The latest annotation of every user on a chunk counts as one rating.
+    Chunks rated by fewer than two users are skipped; the number of raters
+    may differ between chunks.
+
+    Args:
+        annotations (LabelledAnnotations): Annotations from `load_label_matrix`.
+        label_names (Sequence[str]): Name of each matrix column.
+
+    Returns:
+        pd.DataFrame: label, n_chunks and kappa.
+    """
+    latest = np.flatnonzero(_last_of_runs([annotations.chunk, annotations.user]))
+    chunk = annotations.chunk[latest]
+    if len(chunk) == 0:
+        return pd.DataFrame(
+            {"label": list(label_names), "n_chunks": 0, "kappa": np.nan}
+        )
+
+    # rows are sorted by chunk, so each chunk's ratings are one run
+    starts = np.flatnonzero(np.r_[True, chunk[1:] != chunk[:-1]])
+    raters = np.diff(np.r_[starts, len(chunk)])
+    yes = np.add.reduceat(annotations.matrix[latest].astype(np.int64), starts, axis=0)
+
+    rated = raters >= 2
+    n, yes = raters[rated][:, None], yes[rated]
+    no = n - yes
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # agreement within each chunk, then the chance agreement of each label
+        p_chunk = (yes * (yes - 1) + no * (no - 1)) / (n * (n - 1))
+        p_observed = p_chunk.mean(axis=0)
+        p_yes = yes.sum(axis=0) / n.sum()
+        p_expected = p_yes**2 + (1 - p_yes) ** 2
+        kappa = np.where(
+            p_expected < 1, (p_observed - p_expected) / (1 - p_expected), np.nan
+        )
+
+    return pd.DataFrame(
+        {"label": list(label_names), "n_chunks": int(rated.sum()), "kappa": kappa}
+    )
+
+
+def confusion_matrix(
+    annotator_matrix: np.ndarray,
+    reviewer_matrix: np.ndarray,
+    label_names: Sequence[str],
+) -> pd.DataFrame:
+    """
+    Count how often the annotator's labels co-occur with the reviewer's labels.
+
+    Cell (i, j) is the number of chunks where the annotator chose label i and
+    the reviewer chose label j; the diagonal holds the agreements. The
+    "(none)" row and column count chunks where one side chose no label.
+
+    Args:
+        annotator_matrix (np.ndarray): Annotator labels of the chunks.
+        reviewer_matrix (np.ndarray): Reviewer labels of the chunks.
+        label_names (Sequence[str]): Name of each matrix column.
+
+    Returns:
+        pd.DataFrame: Annotator labels as rows, reviewer labels as columns.
+    """
+    names = list(label_names) + ["(none)"]
+    a = np.column_stack([annotator_matrix, ~annotator_matrix.any(axis=1)])
+    r = np.column_stack([reviewer_matrix, ~reviewer_matrix.any(axis=1)])
+    # float matmul runs on BLAS and is exact for counts below 2**53
+    counts = (a.T.astype(np.float64) @ r.astype(np.float64)).astype(np.int64)
+    return pd.DataFrame(
+        counts,
+        index=pd.Index(names, name="annotator"),
+        columns=pd.Index(names, name="reviewer"),
+    )
+
+
+def compute_agreement(
+    conn: sqlite3.Connection, intent_df: pd.DataFrame, kind: str = INTENT_LABEL
+) -> Dict[str, pd.DataFrame]:
+    """
+    Compute all agreement metrics of one label kind.
+
+    Args:
+        conn (sqlite3.Connection): Connection object to the database.
+        intent_df (pd.DataFrame): The dataframe containing the intent data.
+        kind (str): "intent" or "subintent".
+
+    Returns:
+        Dict[str, pd.DataFrame]: The label_scores, annotator_scores,
+            cohen_kappa, fleiss_kappa and confusion_matrix tables.
+    """
+    try:
+        label_names = get_label_options(intent_df, kind)
+        annotations = load_label_matrix(conn, label_names, kind)
+        chunks = pair_with_reviews(annotations)
+        usernames = annotations.usernames
+
+        return {
+            "label_scores": label_scores(chunks, label_names),
+            "annotator_scores": label_scores(chunks, label_names, usernames),
+            "cohen_kappa": cohen_kappa(chunks, usernames),
+            "fleiss_kappa": fleiss_kappa(annotations, label_names),
+            "confusion_matrix": confusion_matrix(
+                chunks.annotator_matrix, chunks.reviewer_matrix, label_names
+            ),
+        }
+
+    except Exception as e:
+        logging.error(f"An error occurred in 'compute_agreement': {e}")
+        logging.error(traceback.format_exc())
+        raise
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Agreement of the annotators with the reviewers."
+    )
+    parser.add_argument("--db", default=DB_PATH, help="Path to the SQLite database.")
+    parser.add_argument("--intents", default=INTENTS_PATH)
+    parser.add_argument(
+        "--kind", choices=[INTENT_LABEL, SUBINTENT_LABEL], default=INTENT_LABEL
+    )
+    parser.add_argument(
+        "--csv-dir", help="Also write every table to a CSV file in this directory."
+    )
+    args = parser.parse_args()
+
+    connection = sqlite3.connect(args.db)
+    report = compute_agreement(connection, pd.read_parquet(args.intents), args.kind)
+    connection.close()
+
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        for table_name, table in report.items():
+            print(f"\n== {table_name} ==")
+            print(table.to_string())
+            if args.csv_dir:
+                table.to_csv(
+                    f"{args.csv_dir}/{args.kind}_{table_name}.csv",
+                    index=table_name == "confusion_matrix",
+                )
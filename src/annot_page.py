@@ -1,11 +1,13 @@
 import pandas as pd
 import streamlit as st
 
-from config import CONN_ID_COLNAME
+from config import CONN_ID_COLNAME, GUIDELINES_PATH
 from helper_functions import *
+from tracing import traced
 
 
-def get_annotator_page(conn, cursor):
+@traced(ends_rerun=True)
+def get_annotator_page(pool):
     # Centered title using HTML tags
     st.markdown(
         "<h1 style='text-align: center;'>Sunlife Annotation Tool</h1>",
@@ -13,45 +15,72 @@ def get_annotator_page(conn, cursor):
     )
 
     display_name_and_role()
-
-    data, intents, mapping = read_dataframes()
-    all_intents = get_all_intent_options(intent_df=intents)
-    all_subintents = get_all_subintent_options(intent_df=intents)
-
-    already_annotated_df = read_annotated_data(_conn=conn)
-
-    # this can be some chunk of a call too...not necessarily the starting from a new call
-    call_ids = get_unannotated_ids(
-        call_data=data,
-        annotated_df=already_annotated_df,
-        user_call_mapping=mapping,
-        username=st.session_state.get("name"),
-    )
-
-    if "all_done" not in st.session_state:
-        st.session_state["all_done"] = False
+    show_save_error()
+
+    data, _, mapping = read_dataframes()
+    taxonomy = get_taxonomy()
+
+    init_work_queue(_pool=pool, _call_data=data, _user_call_mapping=mapping)
+
+    # the queue holds the pending chunks of the call leased to the annotator;
+    # it is snapshotted so the row positions stay stable, and rebuilt when the
+    # lease expired and a different call was leased
+    username = st.session_state.get("name")
+    leased_call = renew_call_lease(pool=pool, username=username)
+    if (
+        "annotator_queue" not in st.session_state
+        or st.session_state.get("leased_call") != leased_call
+    ):
+        leased_call, queue = get_leased_call_ids(
+            pool=pool, call_data=data, username=username
+        )
+        st.session_state["leased_call"] = leased_call
+        st.session_state["annotator_queue"] = queue
+        st.session_state.pop("navigator", None)
+        st.session_state.pop("prefetcher", None)
+    call_ids = st.session_state["annotator_queue"]
 
     # st.write(call_ids)
 
-    if call_ids.empty or st.session_state["all_done"]:
+    if call_ids.empty:
         st.balloons()
         st.success("You don't have any texts to annotate!")
     else:
         # connection_id = connection_ids[0]
-        if "annotated_idx" not in st.session_state:
+        if "navigator" not in st.session_state:
             st.session_state["current_idx"] = 0
             st.session_state["n_chunks"] = call_ids.shape[0]
-            st.session_state["annotated_idx"] = set()
+            st.session_state["navigator"] = ChunkNavigator(call_ids.shape[0])
+
+        navigator = st.session_state["navigator"]
+
+        # chunks prepared with a taxonomy that has since been reloaded are
+        # prepared again
+        if st.session_state.get("taxonomy_version") != taxonomy.version:
+            st.session_state["taxonomy_version"] = taxonomy.version
+            st.session_state.pop("prefetcher", None)
+
+        if "prefetcher" not in st.session_state:
+            st.session_state["prefetcher"] = new_chunk_prefetcher(
+                call_ids=call_ids, taxonomy=taxonomy
+            )
+        prefetcher = st.session_state["prefetcher"]
 
         current_row = call_ids.iloc[st.session_state["current_idx"]]
         current_conn_id = current_row[CONN_ID_COLNAME]
 
         # st.write(current_row)
 
+        # texts, HTML and defaults were usually prepared in the background
+        # while the previous chunk was on screen
+        prepared = prefetcher.get(st.session_state["current_idx"])
+        prefetcher.prefetch(navigator, st.session_state["current_idx"])
+        texts = prepared.texts
+
         with st.expander(
             label=f"Expand to see full conversation (ConnectionID: {current_conn_id})"
         ):
-            full_text = current_row[FULL_TEXT_COLNAME]
+            full_text = texts[FULL_TEXT_COLNAME]
             st.text(full_text)
 
             st.markdown(
@@ -71,9 +100,11 @@ def get_annotator_page(conn, cursor):
                 unsafe_allow_html=True,
             )
 
-        progress_text = f"Progress: [{len(st.session_state['annotated_idx'])} / {st.session_state['n_chunks']}]"
+        progress_text = (
+            f"Progress: [{navigator.n_done} / {st.session_state['n_chunks']}]"
+        )
         st.progress(
-            value=len(st.session_state["annotated_idx"]) / st.session_state["n_chunks"],
+            value=navigator.n_done / st.session_state["n_chunks"],
             text=progress_text,
         )
 
@@ -97,28 +128,21 @@ def get_annotator_page(conn, cursor):
 
         # Text display
         _, chunk_col, _ = st.columns([1, 2, 1])
-        chunk_col.markdown(
-            f"<p style='text-align: justify; padding: 10px; border: 1px solid black; border-radius: 5px; background-color: #D8D8D8; -webkit-user-select: none; -moz-user-select: none; -ms-user-select: none; user-select: none;'>{current_row[TEXT_COLNAME]}</p>",
-            unsafe_allow_html=True,
-        )
+        chunk_col.markdown(prepared.chunk_html, unsafe_allow_html=True)
 
         # Dropdowns
         _, scol1, scol2, _ = st.columns([1, 1, 1, 1])
-        default_intents = get_default_options(current_row[INTENT_COLNAME])
+        default_intents = prepared.default_intents
         # st.write(f"Default Intents: {default_intents}, {st.session_state.get('intent_dropdown')}")
         intent_list = scol1.multiselect(
             label="Intent",
-            options=all_intents,
+            options=taxonomy.intents,
             default=default_intents,
             key=f"intent_dropdown_{current_row['new_id']}",
         )
 
-        valid_subintents = get_valid_subintent_options(
-            intent_list=intent_list, subintent_map=all_subintents
-        )
-        default_subintents = get_default_options(current_row[SUB_INTENT_COLNAME])
-        final_default_subintents = list(
-            set(valid_subintents).intersection(set(default_subintents))
+        valid_subintents, final_default_subintents = prepared.subintent_options(
+            intent_list, taxonomy
         )
 
         # st.write(f"Valid Subintents: {valid_subintents} || Default Subintents: {default_subintents} Final Default: {final_default_subintents}")
@@ -157,7 +181,7 @@ def get_annotator_page(conn, cursor):
         _, bcol1, bcol2, bcol3, _ = st.columns([1.5, 1, 1, 1, 1])
 
         # st.write(st.session_state)
-        if st.session_state["current_idx"] > 0:
+        if navigator.prev(st.session_state["current_idx"]) is not None:
             bcol1.button("Previous", on_click=previous_button_clicked)
 
         # if done with all the chunks for the user, don't show the save and next button
@@ -168,8 +192,7 @@ def get_annotator_page(conn, cursor):
             "Save and Next",
             on_click=save_next_button_clicked,
             args=(
-                conn,
-                cursor,
+                pool,
                 current_row["new_id"],
                 intent_list,
                 subintent_list,
@@ -180,5 +203,4 @@ def get_annotator_page(conn, cursor):
 
         st.divider()
 
-        with st.expander(label="Guidelines to use the dashboard"):
-            show_pdf(file_path="../sample.pdf")
+        show_guidelines(file_path=GUIDELINES_PATH)
@@ -0,0 +1,269 @@
+import sqlite3
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+# Columns of the call_annotation_table documented in the README. Rows are
+# passed around in this order: save_data_to_table and the annotation writer
+# both use it.
+ANNOTATION_COLUMNS = [
+    "call_id",
+    "username",
+    "role",
+    "date",
+    "time",
+    "case_type",
+    "subcase_type",
+    "confidence",
+    "comments",
+]
+
+INTENT_LABEL = "intent"
+SUBINTENT_LABEL = "subintent"
+
+V2_TABLES = f"""
+CREATE TABLE annotations (
+    annotation_id INTEGER PRIMARY KEY,
+    call_id TEXT NOT NULL,
+    username TEXT,
+    role TEXT,
+    created_at INTEGER NOT NULL,
+    confidence TEXT,
+    comments TEXT,
+    UNIQUE (call_id, created_at)
+);
+CREATE INDEX idx_annotations_call_user_ts
+    ON annotations (call_id, username, created_at);
+CREATE INDEX idx_annotations_role_call
+    ON annotations (role, call_id, created_at);
+
+CREATE TABLE labels (
+    label_id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL CHECK (kind IN ('{INTENT_LABEL}', '{SUBINTENT_LABEL}')),
+    name TEXT NOT NULL,
+    UNIQUE (kind, name)
+);
+
+CREATE TABLE annotation_labels (
+    annotation_id INTEGER NOT NULL REFERENCES annotations (annotation_id),
+    label_id INTEGER NOT NULL REFERENCES labels (label_id),
+    position INTEGER NOT NULL,
+    PRIMARY KEY (annotation_id, label_id)
+) WITHOUT ROWID;
+CREATE INDEX idx_annotation_labels_label
+    ON annotation_labels (label_id, annotation_id);
+"""
+
+
+def _labels_column(kind: str) -> str:
+    return f"""COALESCE((
+        SELECT group_concat(name, ', ') FROM (
+            SELECT l.name FROM annotation_labels AS al
+            JOIN labels AS l ON l.label_id = al.label_id
+            WHERE al.annotation_id = a.annotation_id AND l.kind = '{kind}'
+            ORDER BY al.position
+        )
+    ), '')"""
+
+
+# annotations_flat adds the annotation_id and the integer timestamp to the
+# documented columns, for readers that page by id or sort by time through
+# the indexes; call_annotation_table keeps the documented v1 layout
+V2_VIEWS = f"""
+CREATE VIEW annotations_flat AS
+SELECT
+    a.annotation_id,
+    a.created_at,
+    a.call_id,
+    a.username,
+    a.role,
+    date(a.created_at, 'unixepoch', 'localtime') AS date,
+    time(a.created_at, 'unixepoch', 'localtime') AS time,
+    {_labels_column(INTENT_LABEL)} AS case_type,
+    {_labels_column(SUBINTENT_LABEL)} AS subcase_type,
+    a.confidence,
+    a.comments
+FROM annotations AS a;
+
+CREATE VIEW call_annotation_table AS
+SELECT {", ".join(ANNOTATION_COLUMNS)} FROM annotations_flat;
+"""
+
+
+def to_timestamp(date: str, time_of_day: str) -> int:
+    """
+    Convert a local "YYYY-mm-dd" date and "HH:MM:SS" time to a unix timestamp.
+
+    Args:
+        date (str): The date.
+        time_of_day (str): The time.
+
+    Returns:
+        int: Seconds since the epoch.
+    """
+    return int(time.mktime(time.strptime(f"{date} {time_of_day}", "%Y-%m-%d %H:%M:%S")))
+
+
+def split_labels(values: Optional[str]) -> List[str]:
+    """
+    Split a comma separated label string as stored by the v1 schema.
+
+    Args:
+        values (str): Comma separated labels.
+
+    Returns:
+        List[str]: The labels, in order, without blanks.
+    """
+    if values is None or values != values:  # None or NaN
+        return []
+    return [s.strip() for s in values.split(",") if s.strip()]
+
+
+class LabelDictionary:
+    """Cache of label ids, inserting labels the first time they are seen."""
+
+    def __init__(self):
+        self._ids: Dict[Tuple[str, str], int] = {}
+
+    def get_id(self, conn: sqlite3.Connection, kind: str, name: str) -> int:
+        label_id = self._ids.get((kind, name))
+        if label_id is None:
+            conn.execute(
+                "INSERT OR IGNORE INTO labels (kind, name) VALUES (?, ?)", (kind, name)
+            )
+            label_id = conn.execute(
+                "SELECT label_id FROM labels WHERE kind = ? AND name = ?", (kind, name)
+            ).fetchone()[0]
+            self._ids[(kind, name)] = label_id
+        return label_id
+
+
+def insert_annotations(
+    conn: sqlite3.Connection,
+    rows: Iterable[Sequence],
+    labels: Optional[LabelDictionary] = None,
+) -> int:
+    """
+    Insert annotation rows given in the documented call_annotation_table layout.
+
+    A row may be followed by the version of the taxonomy its labels were
+    chosen from. Runs in the caller's transaction; nothing is committed here.
+
+    Args:
+        conn (sqlite3.Connection): Connection object to the database.
+        rows (Iterable[Sequence]): Rows in the order of ANNOTATION_COLUMNS,
+            optionally followed by the taxonomy version.
+        labels (LabelDictionary, optional): Label id cache to reuse across calls.
+
+    Returns:
+        int: Number of rows inserted.
+    """
+    labels = labels or LabelDictionary()
+    count = 0
+    for (
+        call_id,
+        user,
+        role,
+        date,
+        time_of_day,
+        intents,
+        subintents,
+        conf,
+        comment,
+        *taxonomy_version,
+    ) in rows:
+        cursor = conn.execute(
+            "INSERT INTO annotations (call_id, username, role, created_at, confidence, "
+            "comments, taxonomy_version) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                call_id,
+                user,
+                role,
+                to_timestamp(date, time_of_day),
+                conf,
+                comment,
+                taxonomy_version[0] if taxonomy_version else None,
+            ),
+        )
+        annotation_id = cursor.lastrowid
+
+        label_rows = []
+        for kind, values in [(INTENT_LABEL, intents), (SUBINTENT_LABEL, subintents)]:
+            for position, name in enumerate(dict.fromkeys(split_labels(values))):
+                label_id = labels.get_id(conn, kind, name)
+                label_rows.append((annotation_id, label_id, position))
+        conn.executemany(
+            "INSERT INTO annotation_labels (annotation_id, label_id, position) VALUES (?, ?, ?)",
+            label_rows,
+        )
+        count += 1
+    return count
+
+
+def get_latest_annotations(
+    conn: sqlite3.Connection,
+    call_ids: Sequence[str],
+    role: Optional[str] = None,
+) -> pd.DataFrame:
+    """
+    Get the latest annotation of each given chunk, optionally for one role.
+
+    Each lookup is a seek on the (role, call_id, created_at) or
+    (call_id, username, created_at) index rather than a scan.
+
+    Args:
+        conn (sqlite3.Connection): Connection object to the database.
+        call_ids (Sequence[str]): Chunk ids to look up.
+        role (str, optional): Only consider annotations of this role.
+
+    Returns:
+        pd.DataFrame: At most one row per call_id, in the documented layout.
+    """
+    role_filter = "AND a.role = :role" if role is not None else ""
+    query = (
+        f"SELECT {', '.join(ANNOTATION_COLUMNS)} FROM annotations_flat "
+        "WHERE annotation_id = ("
+        "SELECT a.annotation_id FROM annotations AS a "
+        f"WHERE a.call_id = :call_id {role_filter} "
+        "ORDER BY a.created_at DESC, a.annotation_id DESC LIMIT 1"
+        ")"
+    )
+    frames = [
+        pd.read_sql_query(query, conn, params={"call_id": call_id, "role": role})
+        for call_id in call_ids
+    ]
+    if not frames:
+        return pd.DataFrame(columns=ANNOTATION_COLUMNS)
+    return pd.concat(frames, ignore_index=True)
+
+
+def count_labels(
+    conn: sqlite3.Connection, kind: str = INTENT_LABEL, role: Optional[str] = None
+) -> pd.DataFrame:
+    """
+    Count how many annotations carry each label.
+
+    Args:
+        conn (sqlite3.Connection): Connection object to the database.
+        kind (str): "intent" or "subintent".
+        role (str, optional): Only count annotations of this role.
+
+    Returns:
+        pd.DataFrame: Columns name and n_annotations, most used first.
+    """
+    role_join = (
+        "JOIN annotations AS a ON a.annotation_id = al.annotation_id AND a.role = :role"
+        if role is not None
+        else ""
+    )
+    query = (
+        "SELECT l.name, COUNT(*) AS n_annotations "
+        "FROM labels AS l "
+        "JOIN annotation_labels AS al ON al.label_id = l.label_id "
+        f"{role_join} "
+        "WHERE l.kind = :kind "
+        "GROUP BY l.label_id "
+        "ORDER BY n_annotations DESC, l.name"
+    )
+    return pd.read_sql_query(query, conn, params={"kind": kind, "role": role})
@@ -5,10 +5,17 @@ import yaml
 from yaml.loader import SafeLoader
 
 from annot_page import get_annotator_page
+from config import PAGE_ICON_PATH
 from helper_functions import *
-from review_page import get_reviewer_page
+from review_page import (
+    get_agreement_page,
+    get_export_page,
+    get_performance_page,
+    get_progress_page,
+    get_reviewer_page,
+)
 
-page_icon_img = "../images/sunlife.png"
+page_icon_img = get_asset_url(PAGE_ICON_PATH)
 st.set_page_config(
     page_title="Intent Detection | Data Labeling Testing",
     layout="wide",
@@ -28,36 +35,62 @@ authenticator = stauth.Authenticate(
 )
 
 
+def show_user_page(name, username):
+    """
+    Show the page of a signed in user's role.
+
+    Args:
+        name (str): The user's display name.
+        username (str): The user's login name in utils/config.yaml.
+
+    Returns:
+        tuple: The database connection pool and the annotation writer.
+    """
+    role = config.get("credentials").get("usernames").get(username).get("role")
+    logging.info(f"Welcome {name}!")
+
+    st.session_state["name"] = name
+    st.session_state["role"] = role
+
+    pool = init_pool()
+    writer = init_writer()
+
+    if role == "annotator":
+        get_annotator_page(pool=pool)
+    elif role == "reviewer":
+        get_reviewer_page(pool=pool)
+    elif role == "admin":
+        page = st.sidebar.radio(
+            "Page",
+            options=["Review", "Progress", "Agreement", "Export", "Performance"],
+        )
+        if page == "Progress":
+            get_progress_page(pool=pool)
+        elif page == "Agreement":
+            get_agreement_page(pool=pool)
+        elif page == "Export":
+            get_export_page(pool=pool)
+        elif page == "Performance":
+            get_performance_page(pool=pool)
+        else:
+            get_reviewer_page(pool=pool)
+
+    return pool, writer
+
+
 if __name__ == "__main__":
     name, authentication_status, username = authenticator.login("Login", "main")
 
     if authentication_status:
         # authenticator.logout("Logout", "main", )
-        role = config.get("credentials").get("usernames").get(username).get("role")
-        logging.info(f"Welcome {name}!")
-
-        st.session_state["name"] = name
-        st.session_state["role"] = role
-
-        conn, cursor = init_connection()
-
-        if role == "annotator":
-            get_annotator_page(conn=conn, cursor=cursor)
-        elif role == "reviewer" or role == "admin":
-            get_reviewer_page(conn=conn, cursor=cursor)
+        pool, writer = show_user_page(name, username)
 
         @atexit.register
         def close_db():
-            close_database(cursor=cursor, connection=conn)
+            close_database(pool=pool, writer=writer)
 
     elif authentication_status is False:
         st.error("Username/password is incorrect")
 
     elif authentication_status is None:
-        # clear the cache for these two functions
-        # so that the annotator doesn't see repeated
-        # chunks on reload of page or closing and
-        # reopening the webpage
-        read_annotated_data.clear()
-        get_unannotated_ids.clear()
         st.warning("Please enter your username and password")
@@ -1,6 +1,99 @@
+import os
+
 CONN_ID_COLNAME = "ConnectionID"
 CHUNK_ID_COLNAME = "chunk_id"
 TEXT_COLNAME = "text"
 FULL_TEXT_COLNAME = "full_text"
 INTENT_COLNAME = "Call Type"
 SUB_INTENT_COLNAME = "Call SubType"
+ROW_IDX_COLNAME = "row_idx"
+
+DATA_PATH = "../inputs/data.parquet"
+INTENTS_PATH = "../inputs/intents.parquet"
+MAPPING_PATH = "../inputs/mapping.parquet"
+
+# Seconds between checks of INTENTS_PATH for a changed taxonomy, which is
+# then used without restarting the app
+TAXONOMY_CHECK_INTERVAL_S = 5
+
+# Normalized call data written by convert_inputs.py; used instead of
+# DATA_PATH when both files exist
+CHUNKS_PATH = "../inputs/chunks.parquet"
+CONVERSATIONS_PATH = "../inputs/conversations.parquet"
+
+# Rows per parquet row group of the call data files. A chunk's text is read
+# by decoding its whole row group, so the files are written with small
+# groups; a file opened with larger groups is rewritten once with this size
+ROW_GROUP_SIZE = 256
+
+# Call batches added by ingest.py, one partition directory per batch
+INGEST_DIR = "../inputs/batches"
+
+DB_PATH = "../outputs/annotations_db.db"
+
+# Directory (ideally on a tmpfs, e.g. /dev/shm/annotation-app) where
+# shared_cache.py publishes the call data and mapping as Arrow files for all
+# app processes to memory-map instead of each reading its own copy; it
+# checks for new batches every SHARED_CACHE_POLL_S. Unset, every process
+# reads the inputs itself
+SHARED_CACHE_DIR = os.environ.get("SHARED_CACHE_DIR")
+SHARED_CACHE_POLL_S = 5
+
+# Guidelines document and page icon, served as static assets
+GUIDELINES_PATH = "../sample.pdf"
+PAGE_ICON_PATH = "../images/sunlife.png"
+
+# The static asset server publishes files under content-hashed names in
+# ASSET_DIR. ASSET_BASE_URL is the address browsers reach it at (e.g. behind a
+# proxy); by default localhost on ASSET_PORT. It uses TLS when the certificate
+# and key Streamlit is configured with exist.
+ASSET_DIR = "../outputs/assets"
+ASSET_HOST = "0.0.0.0"
+ASSET_PORT = 8502
+ASSET_BASE_URL = os.environ.get("ASSET_BASE_URL")
+ASSET_CERT_FILE = "certificate.pem"
+ASSET_KEY_FILE = "private_key.pem"
+
+# Group commit settings of the background annotation writer
+WRITER_MAX_BATCH_SIZE = 64
+WRITER_MAX_LATENCY_MS = 50
+WRITER_QUEUE_SIZE = 1024
+
+# Connection pool settings
+DB_BUSY_TIMEOUT_MS = 5000
+DB_MAX_READERS = 8
+
+# Seconds an annotator keeps a leased call without activity before it is
+# handed to someone else
+LEASE_DURATION_S = 1800
+
+# Number of chunks after the current one the annotator page prepares in the
+# background, and the threads shared by all sessions to do it; 0 turns
+# prefetching off
+PREFETCH_CHUNKS = 3
+PREFETCH_WORKERS = 2
+
+# Number of ConnectionIDs sent to the reviewer's call picker at a time
+CALL_PICKER_PAGE_SIZE = 50
+
+# Number of chunks the reviewer page reads on each side of the current one
+REVIEW_WINDOW_SIZE = 10
+
+# Seconds the admin agreement metrics are cached before being recomputed
+AGREEMENT_CACHE_TTL_S = 300
+
+# Seconds the admin progress page keeps the summary tables it read
+PROGRESS_CACHE_TTL_S = 10
+
+# Timing spans of the app's helpers, written as JSON lines per call; the file
+# is moved to TRACE_LOG_PATH + ".1" once it grows past TRACE_MAX_BYTES. Set
+# the TRACE_ENABLED environment variable to 0 to turn tracing off
+TRACE_ENABLED = os.environ.get("TRACE_ENABLED", "1") != "0"
+TRACE_LOG_PATH = "../logs/trace.jsonl"
+TRACE_MAX_BYTES = 50 * 2**20
+
+# Seconds the admin performance page keeps its summary of the trace log
+TRACE_CACHE_TTL_S = 30
+
+# Directory the admin export page writes its files to
+EXPORT_DIR = "../outputs/exports"
@@ -0,0 +1,64 @@
+import argparse
+import logging
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from config import CHUNKS_PATH, CONVERSATIONS_PATH, DATA_PATH, ROW_GROUP_SIZE
+from data_store import normalize_call_data
+
+
+def convert_call_data(
+    data_path: str = DATA_PATH,
+    chunks_path: str = CHUNKS_PATH,
+    conversations_path: str = CONVERSATIONS_PATH,
+    row_group_size: int = ROW_GROUP_SIZE,
+) -> None:
+    """
+    Convert data.parquet into the normalized conversations and chunks files.
+
+    Small row groups keep the cost of reading a single conversation low.
+
+    Args:
+        data_path (str): Path to the per-chunk data.parquet.
+        chunks_path (str): Output path of the chunks file.
+        conversations_path (str): Output path of the conversations file.
+        row_group_size (int): Number of rows per parquet row group.
+
+    Returns:
+        None
+    """
+    data = pq.read_table(data_path).to_pandas()
+    conversations, chunks = normalize_call_data(data)
+
+    for df, path in [(conversations, conversations_path), (chunks, chunks_path)]:
+        pq.write_table(
+            pa.Table.from_pandas(df, preserve_index=False),
+            path,
+            row_group_size=row_group_size,
+        )
+
+    located = chunks["text_start"].notna().sum()
+    logging.info(
+        f"Converted {len(chunks)} chunks of {len(conversations)} conversations; "
+        f"{located} chunk texts stored as offsets."
+    )
+    print(
+        f"Wrote {len(conversations)} conversations to {conversations_path} and "
+        f"{len(chunks)} chunks to {chunks_path} ({located} stored as offsets)."
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Store each conversation's full_text once instead of per chunk."
+    )
+    parser.add_argument("--data", default=DATA_PATH)
+    parser.add_argument("--chunks", default=CHUNKS_PATH)
+    parser.add_argument("--conversations", default=CONVERSATIONS_PATH)
+    parser.add_argument("--row-group-size", type=int, default=ROW_GROUP_SIZE)
+    args = parser.parse_args()
+
+    convert_call_data(
+        args.data, args.chunks, args.conversations, row_group_size=args.row_group_size
+    )
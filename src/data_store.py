@@ -0,0 +1,705 @@
+import logging
+import os
+import threading
+import traceback
+from collections import OrderedDict
+from typing import Dict, Iterator, Sequence, Union
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from config import (
+    CHUNK_ID_COLNAME,
+    CHUNKS_PATH,
+    CONN_ID_COLNAME,
+    CONVERSATIONS_PATH,
+    DATA_PATH,
+    FULL_TEXT_COLNAME,
+    INTENT_COLNAME,
+    ROW_GROUP_SIZE,
+    ROW_IDX_COLNAME,
+    SUB_INTENT_COLNAME,
+    TEXT_COLNAME,
+)
+
+# columns needed to build the annotator and reviewer queues
+QUEUE_COLUMNS = [CONN_ID_COLNAME, CHUNK_ID_COLNAME, INTENT_COLNAME, SUB_INTENT_COLNAME]
+
+# large columns that are only read for the chunk on screen
+TEXT_COLUMNS = [TEXT_COLNAME, FULL_TEXT_COLNAME]
+
+# extra columns of the normalized chunks file
+CONVERSATION_IDX_COLNAME = "conversation_idx"
+TEXT_START_COLNAME = "text_start"
+TEXT_END_COLNAME = "text_end"
+
+
+def bound_row_groups(path: str, row_group_size: int = ROW_GROUP_SIZE) -> bool:
+    """
+    Rewrite a parquet file whose row groups have more than `row_group_size` rows.
+
+    The rows keep their order, so row_idx values stay valid. The file is
+    written next to the old one and renamed over it, so a reader never sees
+    a half written file; files with small enough row groups are left as is.
+
+    Args:
+        path (str): Path to the parquet file.
+        row_group_size (int): Maximum number of rows per row group.
+
+    Returns:
+        bool: True if the file was rewritten.
+    """
+    try:
+        file = pq.ParquetFile(path)
+        metadata = file.metadata
+        largest = max(
+            (metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)),
+            default=0,
+        )
+        if largest <= row_group_size:
+            return False
+
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with pq.ParquetWriter(tmp_path, file.schema_arrow) as writer:
+            for batch in file.iter_batches(batch_size=row_group_size):
+                writer.write_batch(batch, row_group_size=row_group_size)
+        os.replace(tmp_path, path)
+
+        logging.info(
+            f"Rewrote {path} with row groups of {row_group_size} rows "
+            f"instead of up to {largest}."
+        )
+        return True
+
+    except Exception as e:
+        logging.error(f"An error occurred in 'bound_row_groups': {e}")
+        logging.error(traceback.format_exc())
+        raise
+
+
+class RowGroupReader:
+    """
+    Random access to single rows of a memory-mapped parquet file.
+
+    Rows are decoded one row group at a time; the last few decoded row groups
+    are kept so reading neighbouring rows doesn't decode them again. Reading
+    one row decodes its whole row group, so the file must be written with
+    small row groups (see `bound_row_groups`); files with row groups of more
+    than `max_row_group_rows` rows are refused.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        columns: Sequence[str],
+        cached_row_groups: int = 4,
+        max_row_group_rows: int = ROW_GROUP_SIZE,
+    ):
+        self.path = path
+        self.file = pq.ParquetFile(path, memory_map=True)
+        self._columns = list(columns)
+        self._cached_row_groups = cached_row_groups
+        self._row_groups: "OrderedDict[int, pa.Table]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        metadata = self.file.metadata
+        row_counts = [
+            metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)
+        ]
+        if max(row_counts, default=0) > max_row_group_rows:
+            raise ValueError(
+                f"{path} has row groups of up to {max(row_counts)} rows; rewrite "
+                f"it with at most {max_row_group_rows} rows per row group."
+            )
+        # first row index of every row group
+        self._starts = np.concatenate([[0], np.cumsum(row_counts)]).astype(np.int64)
+
+    @property
+    def num_rows(self) -> int:
+        return int(self._starts[-1])
+
+    def get(self, row_idx: int, column: str):
+        group = int(np.searchsorted(self._starts, row_idx, side="right")) - 1
+        table = self._read_row_group(group)
+        return table.column(column)[int(row_idx - self._starts[group])].as_py()
+
+    def take(self, row_indices: Sequence[int], column: str) -> pa.Array:
+        """
+        Read one column of many rows, decoding each row group once.
+
+        Args:
+            row_indices (Sequence[int]): Positions of the rows in the file.
+            column (str): Column to read.
+
+        Returns:
+            pa.Array: The values, in the order of `row_indices`.
+        """
+        row_indices = np.asarray(row_indices, dtype=np.int64)
+        groups = np.searchsorted(self._starts, row_indices, side="right") - 1
+        order = np.argsort(groups, kind="stable")
+
+        sorted_rows, sorted_groups = row_indices[order], groups[order]
+
+        parts = []
+        for group in np.unique(sorted_groups):
+            lo, hi = np.searchsorted(sorted_groups, [group, group + 1])
+            rows = sorted_rows[lo:hi] - self._starts[group]
+            table = self._read_row_group(int(group))
+            parts.append(table.column(column).take(pa.array(rows)).combine_chunks())
+
+        if not parts:
+            return pa.array([], type=pa.string())
+        values = pa.concat_arrays(parts)
+        return values.take(pa.array(np.argsort(order)))
+
+    def _read_row_group(self, group: int) -> pa.Table:
+        with self._lock:
+            table = self._row_groups.get(group)
+            if table is not None:
+                self._row_groups.move_to_end(group)
+                return table
+
+            table = self.file.read_row_group(group, columns=self._columns)
+            self._row_groups[group] = table
+            if len(self._row_groups) > self._cached_row_groups:
+                self._row_groups.popitem(last=False)
+            return table
+
+
+def _iter_frames(
+    file: pq.ParquetFile, columns: Sequence[str], batch_size: int
+) -> Iterator[pd.DataFrame]:
+    start = 0
+    for batch in file.iter_batches(batch_size=batch_size, columns=list(columns)):
+        df = batch.to_pandas()
+        df[ROW_IDX_COLNAME] = np.arange(start, start + len(df), dtype=np.int64)
+        start += len(df)
+        yield df
+
+
+class ChunkDataStore:
+    """
+    Memory-mapped, column-projected access to the call data parquet file.
+
+    `read_queue_frame` loads only the small queue columns. The chunk and
+    conversation texts stay in the memory-mapped file and are decoded only
+    when a chunk is displayed. A file with large row groups is rewritten with
+    small ones when it is opened.
+    """
+
+    def __init__(self, path: str):
+        bound_row_groups(path)
+        self._texts = RowGroupReader(path, TEXT_COLUMNS)
+
+    @property
+    def num_rows(self) -> int:
+        return self._texts.num_rows
+
+    def read_queue_frame(self, columns: Sequence[str] = QUEUE_COLUMNS) -> pd.DataFrame:
+        """
+        Read the given columns of every chunk, without the text columns.
+
+        Args:
+            columns (Sequence[str]): Columns to read from the file.
+
+        Returns:
+            pd.DataFrame: One row per chunk, with a row_idx column holding the
+                row's position in the file for `get_texts`.
+        """
+        try:
+            df = self._texts.file.read(columns=list(columns)).to_pandas()
+            df[ROW_IDX_COLNAME] = np.arange(len(df), dtype=np.int64)
+            return df
+
+        except Exception as e:
+            logging.error(
+                f"An error occurred in 'ChunkDataStore.read_queue_frame': {e}"
+            )
+            logging.error(traceback.format_exc())
+            raise
+
+    def iter_queue_frames(
+        self, columns: Sequence[str] = QUEUE_COLUMNS, batch_size: int = 65536
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Read the given columns of every chunk in batches.
+
+        Args:
+            columns (Sequence[str]): Columns to read from the file.
+            batch_size (int): Maximum number of rows per frame.
+
+        Yields:
+            pd.DataFrame: Consecutive rows of the file, with a row_idx column.
+        """
+        yield from _iter_frames(self._texts.file, columns, batch_size)
+
+    def get_texts(
+        self, row_idx: int, columns: Sequence[str] = TEXT_COLUMNS
+    ) -> Dict[str, str]:
+        """
+        Read the text columns of a single chunk.
+
+        Args:
+            row_idx (int): Position of the chunk in the file.
+            columns (Sequence[str]): Text columns to read.
+
+        Returns:
+            Dict[str, str]: Mapping of column name to value.
+        """
+        try:
+            return {col: self._texts.get(row_idx, col) for col in columns}
+
+        except Exception as e:
+            logging.error(f"An error occurred in 'ChunkDataStore.get_texts': {e}")
+            logging.error(traceback.format_exc())
+            raise
+
+    def take_texts(
+        self, row_indices: Sequence[int], columns: Sequence[str] = TEXT_COLUMNS
+    ) -> Dict[str, pa.Array]:
+        """
+        Read the text columns of many chunks at once.
+
+        Args:
+            row_indices (Sequence[int]): Positions of the chunks in the file.
+            columns (Sequence[str]): Text columns to read.
+
+        Returns:
+            Dict[str, pa.Array]: Mapping of column name to values, in the
+                order of `row_indices`.
+        """
+        return {col: self._texts.take(row_indices, col) for col in columns}
+
+
+class NormalizedChunkStore:
+    """
+    Call data stored with every conversation's full text held only once.
+
+    The conversations file has one row per ConnectionID with its full_text.
+    The chunks file has one row per chunk with the queue columns, the row of
+    its conversation and the [text_start, text_end) offsets of the chunk text
+    inside the full text. Chunks whose text could not be located in the
+    conversation keep their own text instead (text_start is null).
+    """
+
+    def __init__(self, chunks_path: str, conversations_path: str):
+        self.chunks_path = chunks_path
+        bound_row_groups(chunks_path)
+        bound_row_groups(conversations_path)
+        self._conversations = RowGroupReader(conversations_path, [FULL_TEXT_COLNAME])
+        self._chunk_texts = RowGroupReader(chunks_path, [TEXT_COLNAME])
+
+        offsets = self._chunk_texts.file.read(
+            columns=[CONVERSATION_IDX_COLNAME, TEXT_START_COLNAME, TEXT_END_COLNAME]
+        )
+        # the columns are chunked, one chunk per row group
+        self._conversation_idx = offsets.column(0).to_numpy()
+        self._text_start = (
+            offsets.column(1).combine_chunks().to_numpy(zero_copy_only=False)
+        )
+        self._text_end = (
+            offsets.column(2).combine_chunks().to_numpy(zero_copy_only=False)
+        )
+
+    @property
+    def num_rows(self) -> int:
+        return self._chunk_texts.num_rows
+
+    def read_queue_frame(self, columns: Sequence[str] = QUEUE_COLUMNS) -> pd.DataFrame:
+        """
+        Read the given columns of every chunk, without the text columns.
+
+        Args:
+            columns (Sequence[str]): Columns to read from the chunks file.
+
+        Returns:
+            pd.DataFrame: One row per chunk, with a row_idx column holding the
+                row's position in the chunks file for `get_texts`.
+        """
+        try:
+            df = self._chunk_texts.file.read(columns=list(columns)).to_pandas()
+            df[ROW_IDX_COLNAME] = np.arange(len(df), dtype=np.int64)
+            return df
+
+        except Exception as e:
+            logging.error(
+                f"An error occurred in 'NormalizedChunkStore.read_queue_frame': {e}"
+            )
+            logging.error(traceback.format_exc())
+            raise
+
+    def iter_queue_frames(
+        self, columns: Sequence[str] = QUEUE_COLUMNS, batch_size: int = 65536
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Read the given columns of every chunk in batches.
+
+        Args:
+            columns (Sequence[str]): Columns to read from the chunks file.
+            batch_size (int): Maximum number of rows per frame.
+
+        Yields:
+            pd.DataFrame: Consecutive rows of the chunks file, with a row_idx
+                column.
+        """
+        yield from _iter_frames(self._chunk_texts.file, columns, batch_size)
+
+    def get_full_text(self, row_idx: int) -> str:
+        """
+        Get the full conversation text of the call a chunk belongs to.
+
+        Args:
+            row_idx (int): Position of the chunk in the chunks file.
+
+        Returns:
+            str: The full conversation text.
+        """
+        return self._conversations.get(
+            int(self._conversation_idx[row_idx]), FULL_TEXT_COLNAME
+        )
+
+    def get_chunk_text(self, row_idx: int) -> str:
+        """
+        Get the text of a single chunk.
+
+        Args:
+            row_idx (int): Position of the chunk in the chunks file.
+
+        Returns:
+            str: The chunk text.
+        """
+        start = self._text_start[row_idx]
+        if np.isnan(start):
+            return self._chunk_texts.get(row_idx, TEXT_COLNAME)
+
+        full_text = self.get_full_text(row_idx)
+        return full_text[int(start) : int(self._text_end[row_idx])]
+
+    def get_texts(
+        self, row_idx: int, columns: Sequence[str] = TEXT_COLUMNS
+    ) -> Dict[str, str]:
+        """
+        Read the text columns of a single chunk.
+
+        Args:
+            row_idx (int): Position of the chunk in the chunks file.
+            columns (Sequence[str]): Text columns to read.
+
+        Returns:
+            Dict[str, str]: Mapping of column name to value.
+        """
+        try:
+            getters = {
+                TEXT_COLNAME: self.get_chunk_text,
+                FULL_TEXT_COLNAME: self.get_full_text,
+            }
+            return {col: getters[col](row_idx) for col in columns}
+
+        except Exception as e:
+            logging.error(f"An error occurred in 'NormalizedChunkStore.get_texts': {e}")
+            logging.error(traceback.format_exc())
+            raise
+
+    def take_texts(
+        self, row_indices: Sequence[int], columns: Sequence[str] = TEXT_COLUMNS
+    ) -> Dict[str, pa.Array]:
+        """
+        Read the text columns of many chunks at once.
+
+        Args:
+            row_indices (Sequence[int]): Positions of the chunks in the chunks file.
+            columns (Sequence[str]): Text columns to read.
+
+        Returns:
+            Dict[str, pa.Array]: Mapping of column name to values, in the
+                order of `row_indices`.
+        """
+        row_indices = np.asarray(row_indices, dtype=np.int64)
+        full_texts = self._conversations.take(
+            self._conversation_idx[row_indices], FULL_TEXT_COLNAME
+        )
+        texts = {FULL_TEXT_COLNAME: full_texts}
+
+        if TEXT_COLNAME in columns:
+            own_texts = self._chunk_texts.take(row_indices, TEXT_COLNAME).to_pylist()
+            starts, ends = self._text_start[row_indices], self._text_end[row_indices]
+            texts[TEXT_COLNAME] = pa.array(
+                [
+                    own if np.isnan(start) else full[int(start) : int(end)]
+                    for own, full, start, end in zip(
+                        own_texts, full_texts.to_pylist(), starts, ends
+                    )
+                ],
+                type=pa.string(),
+            )
+
+        return {col: texts[col] for col in columns}
+
+
+class PartitionedChunkStore:
+    """
+    The base call data followed by the partitions of ingested call batches.
+
+    Every partition stays in its own file. The row_idx values are global: the
+    rows of a partition are numbered after those of the partitions before it,
+    so row_idx values handed out earlier stay valid when a partition is added.
+    """
+
+    def __init__(self, base: Union[ChunkDataStore, NormalizedChunkStore]):
+        # parts and their first global rows, swapped as one tuple so readers
+        # never see one updated without the other
+        self._layout = ([base], np.array([0, base.num_rows], dtype=np.int64))
+        self._lock = threading.Lock()
+
+    @property
+    def num_rows(self) -> int:
+        return int(self._layout[1][-1])
+
+    @property
+    def num_partitions(self) -> int:
+        return len(self._layout[0])
+
+    def add_partition(self, store: ChunkDataStore) -> int:
+        """
+        Append a partition after the existing ones.
+
+        Args:
+            store (ChunkDataStore): The partition's call data.
+
+        Returns:
+            int: Global row_idx of the partition's first row; add it to the
+                row_idx values read from the partition itself.
+        """
+        with self._lock:
+            parts, starts = self._layout
+            offset = int(starts[-1])
+            self._layout = (parts + [store], np.append(starts, offset + store.num_rows))
+            return offset
+
+    def read_queue_frame(self, columns: Sequence[str] = QUEUE_COLUMNS) -> pd.DataFrame:
+        """
+        Read the given columns of every chunk of every partition.
+
+        Args:
+            columns (Sequence[str]): Columns to read.
+
+        Returns:
+            pd.DataFrame: One row per chunk, with global row_idx values.
+        """
+        parts, starts = self._layout
+        frames = []
+        for part, offset in zip(parts, starts):
+            df = part.read_queue_frame(columns)
+            df[ROW_IDX_COLNAME] += offset
+            frames.append(df)
+        return pd.concat(frames, ignore_index=True)
+
+    def iter_queue_frames(
+        self, columns: Sequence[str] = QUEUE_COLUMNS, batch_size: int = 65536
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Read the given columns of every chunk of every partition in batches.
+
+        Args:
+            columns (Sequence[str]): Columns to read.
+            batch_size (int): Maximum number of rows per frame.
+
+        Yields:
+            pd.DataFrame: Consecutive rows, with global row_idx values.
+        """
+        parts, starts = self._layout
+        for part, offset in zip(parts, starts):
+            for df in part.iter_queue_frames(columns, batch_size):
+                df[ROW_IDX_COLNAME] += offset
+                yield df
+
+    def get_texts(
+        self, row_idx: int, columns: Sequence[str] = TEXT_COLUMNS
+    ) -> Dict[str, str]:
+        """
+        Read the text columns of a single chunk.
+
+        Args:
+            row_idx (int): Global position of the chunk.
+            columns (Sequence[str]): Text columns to read.
+
+        Returns:
+            Dict[str, str]: Mapping of column name to value.
+        """
+        parts, starts = self._layout
+        part = int(np.searchsorted(starts, row_idx, side="right")) - 1
+        return parts[part].get_texts(int(row_idx - starts[part]), columns)
+
+    def take_texts(
+        self, row_indices: Sequence[int], columns: Sequence[str] = TEXT_COLUMNS
+    ) -> Dict[str, pa.Array]:
+        """
+        Read the text columns of many chunks at once.
+
+        Args:
+            row_indices (Sequence[int]): Global positions of the chunks.
+            columns (Sequence[str]): Text columns to read.
+
+        Returns:
+            Dict[str, pa.Array]: Mapping of column name to values, in the
+                order of `row_indices`.
+        """
+        parts, starts = self._layout
+        row_indices = np.asarray(row_indices, dtype=np.int64)
+        part_of_row = np.searchsorted(starts, row_indices, side="right") - 1
+        order = np.argsort(part_of_row, kind="stable")
+        sorted_rows, sorted_parts = row_indices[order], part_of_row[order]
+
+        taken = {col: [] for col in columns}
+        for part in np.unique(sorted_parts):
+            lo, hi = np.searchsorted(sorted_parts, [part, part + 1])
+            texts = parts[part].take_texts(sorted_rows[lo:hi] - starts[part], columns)
+            for col in columns:
+                taken[col].append(texts[col])
+
+        inverse = pa.array(np.argsort(order))
+        return {
+            col: (
+                pa.concat_arrays(values).take(inverse)
+                if values
+                else pa.array([], type=pa.string())
+            )
+            for col, values in taken.items()
+        }
+
+
+# any of the stores above; they share the read_queue_frame, iter_queue_frames,
+# get_texts and take_texts interface
+CallDataStore = Union[ChunkDataStore, NormalizedChunkStore, PartitionedChunkStore]
+
+
+class ChunkPositionIndex:
+    """
+    Lookup of the row of a chunk in the call data by its call_id.
+
+    Keeps a sorted array of 64-bit call_id hashes instead of the call_id
+    strings themselves, about 16 bytes per chunk, and builds it from the call
+    data in batches, so the whole key column is never held at once. With
+    64-bit hashes a collision is vanishingly unlikely at the sizes of the
+    call data.
+    """
+
+    def __init__(self, store: CallDataStore):
+        hashes, rows = [], []
+        for chunks in store.iter_queue_frames([CONN_ID_COLNAME, CHUNK_ID_COLNAME]):
+            call_ids = (
+                chunks[CONN_ID_COLNAME]
+                + "_chunk_"
+                + chunks[CHUNK_ID_COLNAME].astype(str)
+            )
+            hashes.append(_hash_call_ids(call_ids))
+            rows.append(chunks[ROW_IDX_COLNAME].to_numpy())
+
+        hashes = np.concatenate(hashes) if hashes else np.zeros(0, dtype=np.uint64)
+        rows = np.concatenate(rows) if rows else np.zeros(0, dtype=np.int64)
+
+        # np.unique keeps the first row when a chunk appears more than once
+        self._hashes, first = np.unique(hashes, return_index=True)
+        self._rows = rows[first]
+
+    def get_positions(self, call_ids: Sequence[str]) -> np.ndarray:
+        """
+        Get the rows of the given chunks in the call data.
+
+        Args:
+            call_ids (Sequence[str]): Chunk ids to look up.
+
+        Returns:
+            np.ndarray: Row positions, -1 for chunks missing from the call data.
+        """
+        hashes = _hash_call_ids(call_ids)
+        if len(self._hashes) == 0:
+            return np.full(len(hashes), -1, dtype=np.int64)
+
+        idx = np.minimum(np.searchsorted(self._hashes, hashes), len(self._hashes) - 1)
+        return np.where(self._hashes[idx] == hashes, self._rows[idx], -1)
+
+
+def _hash_call_ids(call_ids) -> np.ndarray:
+    return pd.util.hash_array(np.asarray(call_ids, dtype=object))
+
+
+def open_chunk_data_store(
+    data_path: str = DATA_PATH,
+    chunks_path: str = CHUNKS_PATH,
+    conversations_path: str = CONVERSATIONS_PATH,
+) -> Union[ChunkDataStore, NormalizedChunkStore]:
+    """
+    Open the call data, preferring the normalized layout when it exists.
+
+    Args:
+        data_path (str): Path to the per-chunk data.parquet.
+        chunks_path (str): Path to the normalized chunks file.
+        conversations_path (str): Path to the normalized conversations file.
+
+    Returns:
+        ChunkDataStore | NormalizedChunkStore: The opened store.
+    """
+    if os.path.exists(chunks_path) and os.path.exists(conversations_path):
+        logging.info(f"Reading call data from {chunks_path} and {conversations_path}.")
+        return NormalizedChunkStore(chunks_path, conversations_path)
+
+    logging.info(f"Reading call data from {data_path}.")
+    return ChunkDataStore(data_path)
+
+
+def normalize_call_data(data: pd.DataFrame):
+    """
+    Split per-chunk call data into a conversations table and a chunks table.
+
+    Args:
+        data (pd.DataFrame): Call data with the columns of data.parquet.
+
+    Returns:
+        tuple[pd.DataFrame, pd.DataFrame]: The (conversations, chunks) tables.
+    """
+    data = data.sort_values(
+        [CONN_ID_COLNAME, CHUNK_ID_COLNAME], kind="stable"
+    ).reset_index(drop=True)
+
+    conversations = data.drop_duplicates(subset=CONN_ID_COLNAME)[
+        [CONN_ID_COLNAME, FULL_TEXT_COLNAME]
+    ].reset_index(drop=True)
+    conversation_idx = pd.Series(
+        np.arange(len(conversations)), index=conversations[CONN_ID_COLNAME]
+    )
+
+    starts = np.full(len(data), np.nan)
+    ends = np.full(len(data), np.nan)
+    texts = data[TEXT_COLNAME].astype(object).to_numpy(copy=True)
+
+    # chunks appear in order in the conversation, so each search starts where
+    # the previous chunk of the same call ended
+    full_texts = data[FULL_TEXT_COLNAME].to_numpy()
+    conn_ids = data[CONN_ID_COLNAME].to_numpy()
+    position, previous_conn_id = 0, None
+    for i, text in enumerate(texts):
+        if conn_ids[i] != previous_conn_id:
+            position, previous_conn_id = 0, conn_ids[i]
+        if text is None or full_texts[i] is None:
+            continue
+
+        start = full_texts[i].find(text, position)
+        if start == -1:
+            start = full_texts[i].find(text)
+        if start != -1:
+            starts[i], ends[i] = start, start + len(text)
+            position = start + len(text)
+            texts[i] = None
+
+    chunks = data[QUEUE_COLUMNS].copy()
+    chunks[CONVERSATION_IDX_COLNAME] = (
+        conversation_idx.loc[data[CONN_ID_COLNAME]].to_numpy().astype(np.int32)
+    )
+    chunks[TEXT_START_COLNAME] = starts
+    chunks[TEXT_END_COLNAME] = ends
+    chunks[TEXT_COLNAME] = pd.Series(texts, dtype=object)
+
+    return conversations, chunks
@@ -0,0 +1,111 @@
+import logging
+import queue
+import sqlite3
+import threading
+import traceback
+from contextlib import contextmanager
+from typing import Iterator, List
+
+from config import DB_BUSY_TIMEOUT_MS, DB_MAX_READERS
+
+
+class ConnectionPool:
+    """
+    Pool of SQLite connections shared by the Streamlit session threads.
+
+    Readers check a connection out for the duration of a query and check it
+    back in afterwards, so no connection is ever used by two threads at once.
+    Read connections are query-only; writes go through dedicated writer
+    connections (the background AnnotationWriter and one-off maintenance such
+    as migrations). The database runs in WAL mode so readers don't block the
+    writer and vice versa, and every connection waits up to `busy_timeout_ms`
+    for a lock instead of failing with "database is locked".
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        max_readers: int = DB_MAX_READERS,
+        busy_timeout_ms: int = DB_BUSY_TIMEOUT_MS,
+    ):
+        self.db_path = db_path
+        self.busy_timeout_ms = busy_timeout_ms
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_readers)
+        self._all: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+
+        with self.writer_connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout_ms / 1000,
+            check_same_thread=False,
+        )
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+        with self._lock:
+            self._all.append(conn)
+        return conn
+
+    @contextmanager
+    def reader(self) -> Iterator[sqlite3.Connection]:
+        """
+        Check out a read-only connection.
+
+        Blocks while `max_readers` connections are already checked out.
+
+        Yields:
+            sqlite3.Connection: A query-only connection.
+        """
+        with self._slots:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._connect()
+                conn.execute("PRAGMA query_only = ON")
+            try:
+                yield conn
+            finally:
+                if conn.in_transaction:
+                    conn.rollback()
+                self._idle.put(conn)
+
+    @contextmanager
+    def writer_connection(self) -> Iterator[sqlite3.Connection]:
+        """
+        Open a dedicated connection for writing, closed on exit.
+
+        Yields:
+            sqlite3.Connection: A writable connection.
+        """
+        conn = self._connect()
+        try:
+            yield conn
+        finally:
+            self._discard(conn)
+
+    def close(self) -> None:
+        """
+        Close every connection opened by the pool.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            connections, self._all = self._all, []
+        for conn in connections:
+            try:
+                conn.close()
+            except Exception as e:
+                logging.error(
+                    f"An error occurred while closing a pooled connection: {e}"
+                )
+                logging.error(traceback.format_exc())
+
+    def _discard(self, conn: sqlite3.Connection) -> None:
+        with self._lock:
+            if conn in self._all:
+                self._all.remove(conn)
+        conn.close()
@@ -0,0 +1,141 @@
+import logging
+import queue
+import sqlite3
+import threading
+import time
+import traceback
+from typing import List, Tuple
+
+from annotation_schema import LabelDictionary, insert_annotations
+from config import WRITER_MAX_BATCH_SIZE, WRITER_MAX_LATENCY_MS, WRITER_QUEUE_SIZE
+from db_pool import ConnectionPool
+from tracing import trace_span
+
+_STOP = object()
+
+
+class AnnotationWriter:
+    """
+    Background thread that group-commits annotation inserts.
+
+    Saves are put on a bounded queue and return immediately; the writer thread
+    collects up to `max_batch_size` rows, or whatever arrived within
+    `max_latency_ms` of the first one, and commits them in one transaction, so
+    concurrent saves share a single fsync. A full queue blocks the caller,
+    which keeps memory bounded when the disk can't keep up.
+
+    Rows that can't be committed are logged and counted in `n_failed`, since
+    the callers have already returned.
+    """
+
+    def __init__(
+        self,
+        pool: ConnectionPool,
+        max_batch_size: int = WRITER_MAX_BATCH_SIZE,
+        max_latency_ms: float = WRITER_MAX_LATENCY_MS,
+        queue_size: int = WRITER_QUEUE_SIZE,
+    ):
+        self._pool = pool
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency_ms / 1000
+        self._queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self._closed = False
+        self._labels = LabelDictionary()
+        self.n_failed = 0
+        self._thread = threading.Thread(
+            target=self._run, name="annotation-writer", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, values: Tuple) -> None:
+        """
+        Queue a row for insertion into the call_annotation_table.
+
+        Args:
+            values (tuple): Values in the column order of ANNOTATION_COLUMNS,
+                optionally followed by the taxonomy version.
+
+        Returns:
+            None
+        """
+        if self._closed:
+            raise RuntimeError("The annotation writer is closed.")
+        self._queue.put(values)
+
+    def flush(self) -> None:
+        """
+        Block until every queued row has been committed.
+
+        Returns:
+            None
+        """
+        self._queue.join()
+
+    def close(self) -> None:
+        """
+        Commit the queued rows and stop the writer thread.
+
+        Returns:
+            None
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+        logging.info("Annotation writer flushed and stopped.")
+
+    def _run(self) -> None:
+        with self._pool.writer_connection() as conn:
+            conn.execute("PRAGMA synchronous=NORMAL")
+
+            stop = False
+            while not stop:
+                batch, stop = self._next_batch()
+                if batch:
+                    with trace_span("AnnotationWriter._commit") as span:
+                        span.rows = len(batch)
+                        self._commit(conn, batch)
+                for _ in range(len(batch) + stop):
+                    self._queue.task_done()
+
+    def _next_batch(self) -> Tuple[List[Tuple], bool]:
+        first = self._queue.get()
+        if first is _STOP:
+            return [], True
+
+        batch = [first]
+        deadline = time.monotonic() + self.max_latency
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=max(timeout, 0))
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+
+        return batch, False
+
+    def _commit(self, conn: sqlite3.Connection, batch: List[Tuple]) -> None:
+        try:
+            with conn:
+                insert_annotations(conn, batch, self._labels)
+        except sqlite3.IntegrityError:
+            # one bad row must not drop the rest of the batch
+            self._labels = LabelDictionary()
+            for values in batch:
+                try:
+                    with conn:
+                        insert_annotations(conn, [values], self._labels)
+                except Exception as e:
+                    self._labels = LabelDictionary()
+                    self.n_failed += 1
+                    logging.error(f"Failed to save annotation {values[:3]}: {e}")
+        except Exception as e:
+            # label ids cached during the rolled back batch may not exist
+            self._labels = LabelDictionary()
+            self.n_failed += len(batch)
+            logging.error(f"An error occurred in 'AnnotationWriter._commit': {e}")
+            logging.error(traceback.format_exc())
@@ -0,0 +1,221 @@
+import argparse
+import logging
+import sqlite3
+import traceback
+from datetime import datetime, timedelta
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+from annotation_schema import ANNOTATION_COLUMNS, to_timestamp
+from config import DB_PATH, TEXT_COLNAME
+from data_store import CallDataStore, ChunkPositionIndex
+from ingest import open_call_data_store
+
+EXPORT_FORMATS = ["parquet", "csv", "jsonl"]
+EXPORT_BATCH_SIZE = 10_000
+
+EXPORT_SCHEMA = pa.schema(
+    [(col, pa.string()) for col in ANNOTATION_COLUMNS] + [(TEXT_COLNAME, pa.string())]
+)
+
+
+def build_export_query(
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    role: Optional[str] = None,
+    username: Optional[str] = None,
+    latest_only: bool = False,
+) -> Tuple[str, List]:
+    """
+    Build the query selecting the annotations to export.
+
+    Rows are returned in call_id order, which walks the
+    (call_id, username, created_at) index instead of sorting, and keeps the
+    chunks of a call next to each other for the text lookups.
+
+    Args:
+        start_date (str, optional): First date to export (YYYY-mm-dd).
+        end_date (str, optional): Last date to export (YYYY-mm-dd), inclusive.
+        role (str, optional): Only export annotations of this role.
+        username (str, optional): Only export annotations of this user.
+        latest_only (bool): Only export the latest annotation of every user
+            on a chunk.
+
+    Returns:
+        Tuple[str, List]: The query and its parameters.
+    """
+    conditions, params = [], []
+    if start_date:
+        conditions.append("a.created_at >= ?")
+        params.append(to_timestamp(str(start_date), "00:00:00"))
+    if end_date:
+        next_day = datetime.strptime(str(end_date), "%Y-%m-%d") + timedelta(days=1)
+        conditions.append("a.created_at < ?")
+        params.append(to_timestamp(next_day.strftime("%Y-%m-%d"), "00:00:00"))
+    if role:
+        conditions.append("a.role = ?")
+        params.append(role)
+    if username:
+        conditions.append("a.username = ?")
+        params.append(username)
+    if latest_only:
+        conditions.append(
+            "a.annotation_id = ("
+            "SELECT b.annotation_id FROM annotations AS b "
+            "WHERE b.call_id = a.call_id AND b.username = a.username "
+            "ORDER BY b.created_at DESC, b.annotation_id DESC LIMIT 1)"
+        )
+
+    where = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+    query = (
+        f"SELECT {', '.join('f.' + col for col in ANNOTATION_COLUMNS)} "
+        "FROM annotations AS a "
+        "JOIN annotations_flat AS f ON f.annotation_id = a.annotation_id "
+        f"{where}"
+        "ORDER BY a.call_id, a.username, a.created_at"
+    )
+    return query, params
+
+
+def iter_export_batches(
+    conn: sqlite3.Connection,
+    store: CallDataStore,
+    batch_size: int = EXPORT_BATCH_SIZE,
+    **filters,
+) -> Iterator[pa.RecordBatch]:
+    """
+    Stream the annotations joined with their chunk text in fixed-size batches.
+
+    Only one batch of annotations and its texts is held in memory at a time.
+
+    Args:
+        conn (sqlite3.Connection): Connection object to the database.
+        store (CallDataStore): The call data.
+        batch_size (int): Number of rows per batch.
+        **filters: Filters passed to `build_export_query`.
+
+    Yields:
+        pa.RecordBatch: Batches with the columns of EXPORT_SCHEMA.
+    """
+    positions = ChunkPositionIndex(store)
+    query, params = build_export_query(**filters)
+    cursor = conn.execute(query, params)
+
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+
+        columns = list(zip(*rows))
+        row_idx = positions.get_positions(columns[0])
+        found = row_idx >= 0
+
+        texts = np.full(len(rows), None, dtype=object)
+        if found.any():
+            taken = store.take_texts(row_idx[found], [TEXT_COLNAME])[TEXT_COLNAME]
+            texts[found] = taken.to_numpy(zero_copy_only=False)
+
+        arrays = [pa.array(col, type=pa.string()) for col in columns]
+        arrays.append(pa.array(texts, type=pa.string()))
+        yield pa.RecordBatch.from_arrays(arrays, schema=EXPORT_SCHEMA)
+
+
+def export_annotations(
+    conn: sqlite3.Connection,
+    path: str,
+    fmt: str = "parquet",
+    store: Optional[CallDataStore] = None,
+    batch_size: int = EXPORT_BATCH_SIZE,
+    **filters,
+) -> int:
+    """
+    Export the annotations, joined with their chunk text, to a file.
+
+    Args:
+        conn (sqlite3.Connection): Connection object to the database.
+        path (str): Output file path.
+        fmt (str): One of "parquet", "csv" or "jsonl".
+        store (CallDataStore, optional): The call data; the base inputs and
+            the ingested batches are opened when None.
+        batch_size (int): Number of rows written at a time.
+        **filters: Filters passed to `build_export_query`.
+
+    Returns:
+        int: Number of rows exported.
+    """
+    try:
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(
+                f"Unknown export format {fmt!r}; use one of {EXPORT_FORMATS}."
+            )
+
+        store = store or open_call_data_store(conn)
+        batches = iter_export_batches(conn, store, batch_size, **filters)
+        n_rows = 0
+
+        if fmt == "parquet":
+            with pq.ParquetWriter(path, EXPORT_SCHEMA) as writer:
+                for batch in batches:
+                    writer.write_batch(batch)
+                    n_rows += batch.num_rows
+
+        elif fmt == "csv":
+            with pacsv.CSVWriter(path, EXPORT_SCHEMA) as writer:
+                for batch in batches:
+                    writer.write_batch(batch)
+                    n_rows += batch.num_rows
+
+        else:
+            with open(path, "w", encoding="utf-8") as f:
+                for batch in batches:
+                    batch.to_pandas().to_json(
+                        f, orient="records", lines=True, force_ascii=False
+                    )
+                    n_rows += batch.num_rows
+
+        logging.info(f"Exported {n_rows} annotations to {path}.")
+        return n_rows
+
+    except Exception as e:
+        logging.error(f"An error occurred in 'export_annotations': {e}")
+        logging.error(traceback.format_exc())
+        raise
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Export the annotations joined with their chunk text."
+    )
+    parser.add_argument("output", help="Path of the file to write.")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="parquet")
+    parser.add_argument("--db", default=DB_PATH, help="Path to the SQLite database.")
+    parser.add_argument("--start-date", help="First date to export (YYYY-mm-dd).")
+    parser.add_argument("--end-date", help="Last date to export (YYYY-mm-dd).")
+    parser.add_argument("--role")
+    parser.add_argument("--username")
+    parser.add_argument(
+        "--latest-only",
+        action="store_true",
+        help="Only export the latest annotation of every user on a chunk.",
+    )
+    parser.add_argument("--batch-size", type=int, default=EXPORT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    connection = sqlite3.connect(args.db)
+    exported = export_annotations(
+        connection,
+        args.output,
+        args.format,
+        batch_size=args.batch_size,
+        start_date=args.start_date,
+        end_date=args.end_date,
+        role=args.role,
+        username=args.username,
+        latest_only=args.latest_only,
+    )
+    connection.close()
+    print(f"Exported {exported} annotations to {args.output}.")
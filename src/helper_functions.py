@@ -1,20 +1,78 @@
-import base64
 import logging
+import os
 import sqlite3
+import time
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, List, Tuple
+from functools import partial
+from typing import Dict, List, Optional, Tuple
 
 import pandas as pd
 import streamlit as st
 
 from config import (
+    AGREEMENT_CACHE_TTL_S,
+    ASSET_BASE_URL,
+    ASSET_CERT_FILE,
+    ASSET_DIR,
+    ASSET_HOST,
+    ASSET_KEY_FILE,
+    ASSET_PORT,
+    CALL_PICKER_PAGE_SIZE,
     CHUNK_ID_COLNAME,
     CONN_ID_COLNAME,
+    DB_PATH,
+    EXPORT_DIR,
     FULL_TEXT_COLNAME,
     INTENT_COLNAME,
+    INTENTS_PATH,
+    MAPPING_PATH,
+    PREFETCH_CHUNKS,
+    PREFETCH_WORKERS,
+    PROGRESS_CACHE_TTL_S,
+    REVIEW_WINDOW_SIZE,
+    ROW_IDX_COLNAME,
+    SHARED_CACHE_DIR,
     SUB_INTENT_COLNAME,
+    TAXONOMY_CHECK_INTERVAL_S,
     TEXT_COLNAME,
+    TRACE_CACHE_TTL_S,
+)
+from analytics import compute_agreement
+from data_store import TEXT_COLUMNS, ChunkPositionIndex
+from export import export_annotations
+from ingest import CallDataCatalog
+from annotation_schema import ANNOTATION_COLUMNS, get_latest_annotations, split_labels
+from db_pool import ConnectionPool
+from db_writer import AnnotationWriter
+from migrations import apply_migrations
+from navigation import ChunkNavigator
+from prefetch import ChunkPrefetcher, prepare_chunk
+from progress import read_progress
+from review_queue import (
+    count_review_queue,
+    list_review_calls,
+    list_review_chunks,
+    read_review_window,
+)
+from shared_cache import SharedCallData
+from static_assets import AssetServer
+from taxonomy import InvalidLabelsError, Taxonomy, TaxonomyStore
+from tracing import (
+    cache_miss,
+    read_spans,
+    rerun_durations,
+    summarize_spans,
+    traced,
+)
+from work_queue import (
+    acquire_call,
+    complete_call,
+    get_held_lease,
+    get_leased_chunks,
+    lease_is_fresh,
+    sync_assignments,
 )
 
 # Configure logging
@@ -25,10 +83,54 @@ logging.basicConfig(
 )
 
 
+@traced
+@st.cache_resource(show_spinner=False)
+@cache_miss
+def get_asset_server() -> AssetServer:
+    """
+    Start the server of the static assets (guidelines, icons).
+
+    No spinner is shown, as app.py needs the page icon's URL before
+    `st.set_page_config`.
+
+    Returns:
+        AssetServer: The process-wide asset server.
+    """
+    return AssetServer(
+        ASSET_DIR,
+        ASSET_HOST,
+        ASSET_PORT,
+        base_url=ASSET_BASE_URL,
+        cert_file=ASSET_CERT_FILE,
+        key_file=ASSET_KEY_FILE,
+    ).start()
+
+
+def get_asset_url(file_path: str) -> str:
+    """
+    Get the cached, content-hashed URL of a static asset.
+
+    Args:
+        file_path (str): The path to the file.
+
+    Returns:
+        str: The URL of the file, or the path itself if it can't be served.
+    """
+    try:
+        return get_asset_server().publish(file_path)
+    except Exception as e:
+        logging.error(f"Error occurred while publishing the asset {file_path}: {e}")
+        logging.error(traceback.format_exc())
+        return file_path
+
+
 def show_pdf(file_path: str) -> None:
     """
     Displays a PDF file.
 
+    Only the URL of the file is sent to the browser, which downloads the
+    file once and then reads it from its cache.
+
     Args:
         file_path (str): The path to the PDF file.
 
@@ -36,10 +138,8 @@ def show_pdf(file_path: str) -> None:
         None
     """
     try:
-        with open(file_path, "rb") as f:
-            base64_pdf = base64.b64encode(f.read()).decode("utf-8")
-
-        pdf_display = f'<iframe src="data:application/pdf;base64,{base64_pdf}" width="100%" height="800" type="application/pdf"></iframe>'
+        pdf_url = get_asset_url(file_path)
+        pdf_display = f'<iframe src="{pdf_url}" width="100%" height="800" type="application/pdf" loading="lazy"></iframe>'
         st.markdown(pdf_display, unsafe_allow_html=True)
     except Exception as e:
         logging.error(f"Error occurred while displaying PDF: {e}")
@@ -48,16 +148,11 @@ def show_pdf(file_path: str) -> None:
 
 def download_pdf(filepath):
     try:
-        # Read the file content
-        with open(filepath, "rb") as file:
-            pdf_bytes = file.read()
-
-        # Display the download button
-        st.download_button(
-            "Download Guideline PDF",
-            data=pdf_bytes,
-            file_name="Sunlife_Annotation_Tool_Guidelines.pdf",
-            mime="application/pdf",
+        # Link to the cached asset instead of sending the file with the page
+        pdf_url = get_asset_url(filepath)
+        st.markdown(
+            f'<a href="{pdf_url}" target="_blank" download="Sunlife_Annotation_Tool_Guidelines.pdf">Download Guideline PDF</a>',
+            unsafe_allow_html=True,
         )
     except Exception as e:
         # Log the error message and traceback
@@ -65,12 +160,34 @@ def download_pdf(filepath):
         logging.error(traceback.format_exc())
 
 
+@traced
+def show_guidelines(file_path: str) -> None:
+    """
+    Displays the guidelines expander.
+
+    The document is only embedded once the user asks for it, so a closed
+    expander costs nothing on a rerun.
+
+    Args:
+        file_path (str): The path to the guidelines PDF file.
+
+    Returns:
+        None
+    """
+    with st.expander(label="Guidelines to use the dashboard"):
+        download_pdf(file_path)
+        if st.checkbox("Show the guidelines here"):
+            show_pdf(file_path)
+
+
 # Register a function to close the database connection.
-def close_database(cursor, connection):
-    # Close the database connection.
+def close_database(pool, writer=None):
+    # Commit the queued annotations before closing the database connections.
     try:
-        cursor.close()
-        connection.close()
+        if writer is not None:
+            writer.close()
+
+        pool.close()
         logging.info(f"Connection to the database closed.")
 
     # it is closing multiple instances of connections...
@@ -89,24 +206,26 @@ def close_database(cursor, connection):
         raise
 
 
+@traced
 @st.cache_resource
-def init_connection() -> Tuple[sqlite3.Connection, sqlite3.Cursor]:
+@cache_miss
+def init_pool() -> ConnectionPool:
     """
-    Initialize connection to the SQLite database.
+    Initialize the connection pool for the SQLite database and migrate its schema.
 
     Returns:
-        conn (sqlite3.Connection): Connection object to the database.
-        cursor (sqlite3.Cursor): Cursor object for executing SQL queries.
+        pool (ConnectionPool): Pool handing out read connections to the session threads.
     """
     try:
         # Connect to the database (creates a new database if it doesn't exist)
-        conn = sqlite3.connect("../outputs/annotations_db.db", check_same_thread=False)
-        cursor = conn.cursor()
+        pool = ConnectionPool(DB_PATH)
+        with pool.writer_connection() as conn:
+            apply_migrations(conn)
 
         logging.info(
             f"Connection to the database initialized. User: {st.session_state.get('name')}"
         )
-        return conn, cursor
+        return pool
 
     except sqlite3.Error as e:
         logging.error("Failed to initialize connection to the database.")
@@ -121,18 +240,89 @@ def init_connection() -> Tuple[sqlite3.Connection, sqlite3.Cursor]:
         raise
 
 
-@st.cache_data
+@traced
+@st.cache_resource
+@cache_miss
+def init_writer() -> AnnotationWriter:
+    """
+    Start the background writer that group-commits annotation inserts.
+
+    Returns:
+        AnnotationWriter: The process-wide annotation writer.
+    """
+    try:
+        writer = AnnotationWriter(init_pool())
+        logging.info("Annotation writer started.")
+        return writer
+
+    except Exception as e:
+        logging.error("An error occurred while starting the annotation writer.")
+        logging.error(traceback.format_exc())
+        raise
+
+
+@traced
+@st.cache_resource
+@cache_miss
+def get_call_data_catalog() -> CallDataCatalog:
+    """
+    Open the call data and mapping of the inputs and the ingested batches.
+
+    The call data is memory-mapped, in the normalized layout if it exists.
+    With SHARED_CACHE_DIR set, the queue frames are mapped from the files
+    shared_cache.py publishes there instead of read by every process.
+
+    Returns:
+        CallDataCatalog: The process-wide call data catalog.
+    """
+    try:
+        shared = SharedCallData(SHARED_CACHE_DIR) if SHARED_CACHE_DIR else None
+        return CallDataCatalog(init_pool(), shared=shared)
+
+    except Exception as e:
+        logging.error("An error occurred while opening the call data.")
+        logging.error(traceback.format_exc())
+        raise
+
+
+def get_chunk_data_store():
+    """
+    Get the memory-mapped call data of the inputs and the ingested batches.
+
+    Returns:
+        PartitionedChunkStore: The process-wide chunk data store.
+    """
+    return get_call_data_catalog().store
+
+
+@traced
+def read_intents() -> pd.DataFrame:
+    """
+    Read the intents dataframe of the current taxonomy.
+
+    Returns:
+        pd.DataFrame: The dataframe containing the intent data.
+    """
+    return get_taxonomy().intent_df
+
+
+@traced
 def read_dataframes() -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
     """
     Read the dataframes from parquet files.
 
+    Only the columns needed to build the queues are read from the call data;
+    the text columns are fetched per chunk with `get_chunk_texts`. Batches
+    added with ingest.py since the previous call are picked up here, reading
+    only their partitions. The frames are shared by all sessions and must not
+    be modified in place.
+
     Returns:
         tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]: A tuple containing the dataframes (data, intents, mapping).
     """
     try:
-        data = pd.read_parquet("../inputs/data.parquet")
-        intents = pd.read_parquet("../inputs/intents.parquet")
-        mapping = pd.read_parquet("../inputs/mapping.parquet")
+        data, mapping = get_call_data_catalog().snapshot()
+        intents = read_intents()
 
         return data, intents, mapping
 
@@ -142,152 +332,319 @@ def read_dataframes() -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
         raise
 
 
-@st.cache_data
-def read_annotated_data(_conn) -> pd.DataFrame:
+@traced
+def get_chunk_texts(row_idx: int, columns: List[str] = TEXT_COLUMNS) -> Dict[str, str]:
     """
-    Read the annotated data from the call_annotation_table in the database.
+    Get the chunk text and full conversation text of a single chunk.
 
     Args:
-        _conn: The database connection object.
+        row_idx (int): Position of the chunk in the call data (the row_idx column).
+        columns (List[str]): Text columns to read.
 
     Returns:
-        pd.DataFrame: The dataframe containing the annotated data.
+        Dict[str, str]: Mapping of column name to text.
     """
     try:
-        select_data_query = "SELECT * FROM call_annotation_table"
-        df = pd.read_sql_query(select_data_query, _conn)
-
-        return df
+        return get_chunk_data_store().get_texts(int(row_idx), columns)
 
     except Exception as e:
-        logging.error("An error occurred while reading the annotated data.")
+        logging.error(f"An error occurred in 'get_chunk_texts': {e}")
         logging.error(traceback.format_exc())
         raise
 
 
-@st.cache_data
-def get_unannotated_ids(
-    call_data: pd.DataFrame,
-    annotated_df: pd.DataFrame,
-    user_call_mapping: pd.DataFrame,
-    username: str,
-) -> pd.DataFrame:
+@traced
+@st.cache_resource
+@cache_miss
+def get_prefetch_executor() -> ThreadPoolExecutor:
+    """
+    Start the threads that prepare upcoming chunks for all sessions.
+
+    Returns:
+        ThreadPoolExecutor: The process-wide prefetch thread pool.
+    """
+    return ThreadPoolExecutor(
+        max_workers=PREFETCH_WORKERS, thread_name_prefix="chunk-prefetch"
+    )
+
+
+@traced
+def new_chunk_prefetcher(call_ids: pd.DataFrame, taxonomy: Taxonomy) -> ChunkPrefetcher:
     """
-    Get the unannotated IDs based on the call data, annotated dataframe, user-call mapping, and username.
+    Create the prefetcher of an annotator's queue.
 
     Args:
-        call_data (pd.DataFrame): DataFrame containing call data.
-        annotated_df (pd.DataFrame): DataFrame containing annotated data.
-        user_call_mapping (pd.DataFrame): DataFrame containing user-call mapping.
-        username (str): Username of the annotator.
+        call_ids (pd.DataFrame): The annotator's queue.
+        taxonomy (Taxonomy): The intent taxonomy.
 
     Returns:
-        pd.DataFrame: DataFrame containing the unannotated IDs.
+        ChunkPrefetcher: Prefetcher preparing the chunks of the queue.
     """
     try:
-        call_ids = (
-            pd.merge(call_data, user_call_mapping, on=CONN_ID_COLNAME, how="left")
-            .query("Annotator == @username")
-            .assign(
-                new_id=lambda x: x[CONN_ID_COLNAME]
-                + "_chunk_"
-                + x[CHUNK_ID_COLNAME].astype(str)
-            )
-            .sort_values(by=[CONN_ID_COLNAME, CHUNK_ID_COLNAME])
-            .reset_index(drop=True)
+        prepare = partial(
+            prepare_chunk,
+            get_chunk_data_store(),
+            get_defaults=get_default_options,
+            taxonomy=taxonomy,
         )
-
-        # Perform outer join
-        outer = call_ids.merge(
-            annotated_df,
-            left_on="new_id",
-            right_on="call_id",
-            how="outer",
-            indicator=True,
+        return ChunkPrefetcher(
+            get_prefetch_executor(), call_ids, prepare, depth=PREFETCH_CHUNKS
         )
 
-        # Perform anti-join
-        anti_join = outer[(outer._merge == "left_only")].drop("_merge", axis=1)
+    except Exception as e:
+        logging.error(f"An error occurred in 'new_chunk_prefetcher': {e}")
+        logging.error(traceback.format_exc())
+        raise
+
 
-        return anti_join
+@traced
+@st.cache_data(ttl=AGREEMENT_CACHE_TTL_S, show_spinner="Computing agreement...")
+@cache_miss
+def get_agreement_report(
+    _pool: ConnectionPool, intent_df: pd.DataFrame, kind: str
+) -> Dict[str, pd.DataFrame]:
+    """
+    Compute the annotator vs reviewer agreement metrics of one label kind.
+
+    Args:
+        _pool (ConnectionPool): The database connection pool.
+        intent_df (pd.DataFrame): The dataframe containing the intent data.
+        kind (str): "intent" or "subintent".
+
+    Returns:
+        Dict[str, pd.DataFrame]: The tables returned by `compute_agreement`.
+    """
+    try:
+        with _pool.reader() as conn:
+            return compute_agreement(conn, intent_df, kind)
 
     except Exception as e:
-        logging.error("An error occurred while retrieving unannotated IDs.")
+        logging.error(f"An error occurred in 'get_agreement_report': {e}")
         logging.error(traceback.format_exc())
         raise
 
 
-@st.cache_data
-def get_all_intent_options(intent_df: pd.DataFrame) -> List[str]:
+@traced
+@st.cache_data(ttl=PROGRESS_CACHE_TTL_S, show_spinner=False)
+@cache_miss
+def get_progress_report(
+    _pool: ConnectionPool, start_date: Optional[str], end_date: Optional[str]
+) -> Dict[str, pd.DataFrame]:
     """
-    Get all unique intent options from the intent dataframe.
+    Read the progress summary tables of a date range.
 
     Args:
-        intent_df (pd.DataFrame): The dataframe containing the intent data.
+        _pool (ConnectionPool): The database connection pool.
+        start_date (str, optional): First day, "YYYY-mm-dd", inclusive.
+        end_date (str, optional): Last day, "YYYY-mm-dd", inclusive.
 
     Returns:
-        List[str]: A list of all unique intent options.
+        Dict[str, pd.DataFrame]: The tables returned by `read_progress`.
     """
     try:
-        all_intents = intent_df["Intent"].unique().tolist()
-        return all_intents
+        with _pool.reader() as conn:
+            return read_progress(conn, start_date, end_date)
 
     except Exception as e:
-        logging.error("An error occurred while getting all intent options.")
+        logging.error(f"An error occurred in 'get_progress_report': {e}")
         logging.error(traceback.format_exc())
         raise
 
 
-@st.cache_data
-def get_all_subintent_options(intent_df: pd.DataFrame) -> Dict[str, List[str]]:
+@traced
+@st.cache_data(ttl=TRACE_CACHE_TTL_S, show_spinner=False)
+@cache_miss
+def get_trace_summary(window_s: int) -> Tuple[pd.DataFrame, pd.Series]:
     """
-    Get all subintent options for each intent from the intent dataframe.
+    Summarize the timing spans of the last `window_s` seconds.
 
     Args:
-        intent_df (pd.DataFrame): The dataframe containing the intent data.
+        window_s (int): Length of the time window in seconds.
 
     Returns:
-        Dict[str, List[str]]: A dictionary mapping each intent to a list of its subintent options.
+        Tuple[pd.DataFrame, pd.Series]: The per function summary of
+            `summarize_spans` and the total duration of every rerun in ms.
     """
     try:
-        si_map = intent_df.groupby("Intent")["Sub Intent"].unique().to_dict()
-        sub_intent_map = {k: list(v) for k, v in si_map.items()}
-        return sub_intent_map
+        spans = read_spans(since=time.time() - window_s)
+        return summarize_spans(spans), rerun_durations(spans)
 
     except Exception as e:
-        logging.error("An error occurred while getting all subintent options.")
+        logging.error(f"An error occurred in 'get_trace_summary': {e}")
         logging.error(traceback.format_exc())
         raise
 
 
-def get_valid_subintent_options(
-    intent_list: List[str], subintent_map: Dict[str, List[str]]
-) -> List[str]:
+@traced
+def export_annotations_to_file(
+    pool: ConnectionPool, fmt: str, **filters
+) -> Tuple[str, int]:
     """
-    Get valid sub-intent options for a given list of intents from the sub-intent map.
+    Stream the annotations matching the filters to a new file in EXPORT_DIR.
 
     Args:
-        intent_list (List[str]): The list of intents.
-        subintent_map (Dict[str, List[str]]): The sub-intent map.
+        pool (ConnectionPool): The database connection pool.
+        fmt (str): One of "parquet", "csv" or "jsonl".
+        **filters: Filters passed to `export.build_export_query`.
+
+    Returns:
+        Tuple[str, int]: Path of the written file and the number of rows.
+    """
+    try:
+        os.makedirs(EXPORT_DIR, exist_ok=True)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        path = os.path.join(EXPORT_DIR, f"annotations_{timestamp}.{fmt}")
+
+        with pool.reader() as conn:
+            n_rows = export_annotations(
+                conn, path, fmt, store=get_chunk_data_store(), **filters
+            )
+        return path, n_rows
+
+    except Exception as e:
+        logging.error(f"An error occurred in 'export_annotations_to_file': {e}")
+        logging.error(traceback.format_exc())
+        raise
+
+
+@traced
+@st.cache_resource
+@cache_miss
+def init_work_queue(
+    _pool: ConnectionPool, _call_data: pd.DataFrame, _user_call_mapping: pd.DataFrame
+) -> int:
+    """
+    Sync the chunk assignments from the user-call mapping into the work queue.
+
+    Runs once per process; the arguments are not hashed.
+
+    Args:
+        _pool (ConnectionPool): The database connection pool.
+        _call_data (pd.DataFrame): DataFrame containing call data.
+        _user_call_mapping (pd.DataFrame): DataFrame containing user-call mapping.
+
+    Returns:
+        int: Number of chunk assignments synced.
+    """
+    try:
+        with _pool.writer_connection() as conn:
+            return sync_assignments(conn, _call_data, _user_call_mapping)
+
+    except Exception as e:
+        logging.error("An error occurred while initializing the work queue.")
+        logging.error(traceback.format_exc())
+        raise
+
+
+@traced
+def renew_call_lease(pool: ConnectionPool, username: str) -> Optional[str]:
+    """
+    Keep the annotator's lease on their call, leasing a new call if they have none.
+
+    A lease with more than half of it left is only read, on a pooled reader;
+    a writer connection is opened to extend it or to lease a new call.
+
+    Args:
+        pool (ConnectionPool): The database connection pool.
+        username (str): Username of the annotator.
+
+    Returns:
+        Optional[str]: ConnectionID of the leased call, or None when no call is
+            left to annotate.
+    """
+    try:
+        now = int(time.time())
+        with pool.reader() as conn:
+            held = get_held_lease(conn, annotator=username, now=now)
+        if held is not None and lease_is_fresh(held[1], now):
+            return held[0]
+
+        with pool.writer_connection() as conn:
+            return acquire_call(conn, annotator=username)
+
+    except Exception as e:
+        logging.error(f"An error occurred in 'renew_call_lease': {e}")
+        logging.error(traceback.format_exc())
+        raise
+
+
+@traced
+def get_leased_call_ids(
+    pool: ConnectionPool, call_data: pd.DataFrame, username: str
+) -> Tuple[Optional[str], pd.DataFrame]:
+    """
+    Get the pending chunks of the call leased to an annotator, with their call data.
+
+    Replaces the static assignment of chunks to annotators (its queries are
+    kept in benchmarks/baselines.py): calls are leased on demand, a whole call
+    at a time. A leased call without pending chunks is
+    marked done and the next one is leased.
+
+    Args:
+        pool (ConnectionPool): The database connection pool.
+        call_data (pd.DataFrame): DataFrame containing call data.
+        username (str): Username of the annotator.
+
+    Returns:
+        Tuple[Optional[str], pd.DataFrame]: ConnectionID of the leased call
+            (None when no call is left) and its unannotated chunks.
+    """
+    try:
+        with pool.writer_connection() as conn:
+            while True:
+                connection_id = acquire_call(conn, annotator=username)
+                pending = get_leased_chunks(conn, annotator=username)
+                if connection_id is None or not pending.empty:
+                    break
+                complete_call(conn, annotator=username)
+
+        call_ids = pending.merge(
+            call_data, on=[CONN_ID_COLNAME, CHUNK_ID_COLNAME], how="inner"
+        ).reset_index(drop=True)
+
+        return connection_id, call_ids
+
+    except Exception as e:
+        logging.error(f"An error occurred in 'get_leased_call_ids': {e}")
+        logging.error(traceback.format_exc())
+        raise
+
+
+@traced
+@st.cache_resource
+@cache_miss
+def get_taxonomy_store() -> TaxonomyStore:
+    """
+    Load the intent taxonomy of intents.parquet and watch the file for changes.
 
     Returns:
-        List[str]: The list of valid sub-intent options.
+        TaxonomyStore: The process-wide taxonomy store.
     """
     try:
-        sub_intent_list = []
-        for intent in intent_list:
-            sub_intent_list.extend(subintent_map.get(intent, []))
+        return TaxonomyStore(INTENTS_PATH, TAXONOMY_CHECK_INTERVAL_S)
 
-        return sub_intent_list
     except Exception as e:
-        logging.error(f"An error occurred in 'get_valid_subintent_options': {e}")
+        logging.error(f"An error occurred in 'get_taxonomy_store': {e}")
         logging.error(traceback.format_exc())
         raise
 
 
+def get_taxonomy() -> Taxonomy:
+    """
+    Get the current intent taxonomy.
+
+    A changed intents.parquet is picked up here without a restart. Only what
+    is derived from the taxonomy changes; the call data stays cached.
+
+    Returns:
+        Taxonomy: The compiled taxonomy of the current intents file.
+    """
+    return get_taxonomy_store().get()
+
+
+@traced
 def save_data_to_table(
-    conn,
-    cursor,
+    pool,
     new_id,
     user,
     role,
@@ -301,9 +658,12 @@ def save_data_to_table(
     """
     Save data to the database table.
 
+    The labels are checked against the current intent taxonomy first, and
+    the taxonomy's version is saved with the row. The row is queued on the
+    background writer, which commits it together with other pending saves.
+
     Args:
-        conn: The database connection object.
-        cursor: The cursor object to execute SQL queries.
+        pool (ConnectionPool): The database connection pool.
         new_id (str): The new ID value.
         user (str): The username.
         role (str): The role.
@@ -315,14 +675,21 @@ def save_data_to_table(
         comment (str): The comment.
 
     Returns:
-        None
+        bool: Whether the row was queued.
+
+    Raises:
+        InvalidLabelsError: If the labels don't fit the taxonomy.
     """
     try:
-        # Insert values into the table using parameterized query
-        query = (
-            "INSERT INTO call_annotation_table (call_id, username, role, date, time, case_type, subcase_type, confidence, comments) "
-            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+        taxonomy = get_taxonomy()
+        invalid = taxonomy.invalid_labels(
+            split_labels(sel_int_str), split_labels(sel_subint_str)
         )
+        if invalid:
+            raise InvalidLabelsError(invalid)
+
+        # Values in the column order of ANNOTATION_COLUMNS; the writer also
+        # gets the taxonomy version
         values = (
             new_id,
             user,
@@ -334,70 +701,88 @@ def save_data_to_table(
             confidence,
             comment,
         )
-        cursor.execute(query, values)
+        init_writer().submit(values + (taxonomy.version,))
+        return True
 
-        # Commit the changes to the database
-        conn.commit()
+    except InvalidLabelsError as e:
+        logging.warning(f"Refused a save in 'save_data_to_table': {e}")
+        raise
 
     except Exception as e:
         logging.error(f"An error occurred in 'save_data_to_table': {e}")
         logging.error(traceback.format_exc())
+        return False
+
+
+INVALID_LABELS_MESSAGE = (
+    "The annotation was not saved: check that every sub intent belongs to "
+    "one of the selected intents."
+)
+SAVE_FAILED_MESSAGE = "The annotation was not saved because of an error; try again."
+LEASE_LOST_MESSAGE = (
+    "The annotation was not saved: your lease on this call expired and the "
+    "call may have gone to another annotator. Your queue has been reloaded."
+)
+
+# session state of the annotator's leased call, rebuilt on the next render
+_ANNOTATOR_QUEUE_KEYS = ["annotator_queue", "leased_call", "navigator", "prefetcher"]
 
 
-def previous_button_clicked_reviewer():
+@traced
+def previous_button_clicked_reviewer(previous_key):
     """
     Handle the click event of the previous button for the reviewer.
 
+    Args:
+        previous_key (tuple): (ConnectionID, chunk_id) of the previous chunk.
+
     Returns:
         None
     """
     try:
-        idx = st.session_state["current_idx"] - 1
-
-        if idx == -1:
-            idx = st.session_state["n_chunks"] - 1
-
-        st.session_state["current_idx"] = idx
+        st.session_state["review_key"] = previous_key
 
     except Exception as e:
         logging.error(f"An error occurred in 'previous_button_clicked_reviewer': {e}")
         logging.error(traceback.format_exc())
 
 
-def next_button_clicked_reviewer():
+@traced
+def next_button_clicked_reviewer(next_key):
     """
     Handle the click event of the next button for the reviewer.
 
+    Args:
+        next_key (tuple): (ConnectionID, chunk_id) of the next chunk; None
+            to go back to the start of the queue.
+
     Returns:
         None
     """
     try:
-        idx = st.session_state["current_idx"] + 1
-
-        if idx == st.session_state["n_chunks"]:
-            idx = 0
-
-        st.session_state["current_idx"] = idx
+        st.session_state["review_key"] = next_key
 
     except Exception as e:
         logging.error(f"An error occurred in 'next_button_clicked_reviewer': {e}")
         logging.error(traceback.format_exc())
 
 
+@traced
 def save_next_button_clicked_reviewer(
-    conn, cursor, new_id, selected_intents, selected_subintents, confidence, comment
+    pool, new_id, selected_intents, selected_subintents, confidence, comment, next_key
 ):
     """
     Handle the click event of the save and next button for the reviewer.
 
     Args:
-        conn (sqlite3.Connection): SQLite database connection object.
-        cursor (sqlite3.Cursor): SQLite database cursor object.
+        pool (ConnectionPool): The database connection pool.
         new_id (str): New ID value.
         selected_intents (list): List of selected intents.
         selected_subintents (list): List of selected subintents.
         confidence (float): Confidence value.
         comment (str): Comment value.
+        next_key (tuple): (ConnectionID, chunk_id) of the next chunk; None
+            to go back to the start of the queue.
 
     Returns:
         None
@@ -412,32 +797,35 @@ def save_next_button_clicked_reviewer(
         user = st.session_state.get("name")
         role = st.session_state.get("role")
 
-        save_data_to_table(
-            conn,
-            cursor,
-            new_id,
-            user,
-            role,
-            current_date,
-            current_time,
-            sel_int_str,
-            sel_subint_str,
-            confidence,
-            comment,
-        )
-
-        idx = st.session_state["current_idx"] + 1
-
-        if idx == st.session_state["n_chunks"]:
-            idx = 0
+        try:
+            saved = save_data_to_table(
+                pool,
+                new_id,
+                user,
+                role,
+                current_date,
+                current_time,
+                sel_int_str,
+                sel_subint_str,
+                confidence,
+                comment,
+            )
+            error = None if saved else SAVE_FAILED_MESSAGE
+        except InvalidLabelsError:
+            error = INVALID_LABELS_MESSAGE
+        if error:
+            # stay on the chunk; the page shows the error
+            st.session_state["save_error"] = error
+            return
 
-        st.session_state["current_idx"] = idx
+        st.session_state["review_key"] = next_key
 
     except Exception as e:
         logging.error(f"An error occurred in 'save_next_button_clicked_reviewer': {e}")
         logging.error(traceback.format_exc())
 
 
+@traced
 def previous_button_clicked():
     """
     Handle the click event of the previous button for annotator.
@@ -446,21 +834,17 @@ def previous_button_clicked():
         None
     """
     try:
-        idx = st.session_state["current_idx"] - 1
+        navigator: ChunkNavigator = st.session_state["navigator"]
+        idx = navigator.prev(st.session_state["current_idx"])
 
-        while True:
-            if idx == -1:
-                # idx = st.session_state["n_chunks"] - 1
-                break
-            if idx not in st.session_state["annotated_idx"]:
-                st.session_state["current_idx"] = idx
-                break
-            idx -= 1
+        if idx is not None:
+            st.session_state["current_idx"] = idx
     except Exception as e:
         logging.error(f"An error occurred in 'previous_button_clicked': {e}")
         logging.error(traceback.format_exc())
 
 
+@traced
 def next_button_clicked():
     """
     Handle the click event of the next button.
@@ -469,29 +853,24 @@ def next_button_clicked():
         None
     """
     try:
-        idx = st.session_state["current_idx"] + 1
-
-        while True:
-            if idx == st.session_state["n_chunks"]:
-                idx = 0
-            if idx not in st.session_state["annotated_idx"]:
-                st.session_state["current_idx"] = idx
-                break
-            idx += 1
+        navigator: ChunkNavigator = st.session_state["navigator"]
+        st.session_state["current_idx"] = navigator.next(
+            st.session_state["current_idx"]
+        )
     except Exception as e:
         logging.error(f"An error occurred in 'next_button_clicked': {e}")
         logging.error(traceback.format_exc())
 
 
+@traced
 def save_next_button_clicked(
-    conn, cursor, new_id, selected_intents, selected_subintents, confidence, comment
+    pool, new_id, selected_intents, selected_subintents, confidence, comment
 ):
     """
     Handle the click event of the save next button.
 
     Args:
-        conn (sqlite3.Connection): The SQLite database connection.
-        cursor (sqlite3.Cursor): The SQLite cursor.
+        pool (ConnectionPool): The database connection pool.
         new_id (str): The new ID for the annotation.
         selected_intents (list): The selected intents.
         selected_subintents (list): The selected subintents.
@@ -511,36 +890,51 @@ def save_next_button_clicked(
         user = st.session_state.get("name")
         role = st.session_state.get("role")
 
-        save_data_to_table(
-            conn,
-            cursor,
-            new_id,
-            user,
-            role,
-            current_date,
-            current_time,
-            sel_int_str,
-            sel_subint_str,
-            confidence,
-            comment,
-        )
-
-        st.session_state["annotated_idx"].add(st.session_state["current_idx"])
+        # the lease may have expired while the session sat idle and the call
+        # gone to someone else, who would annotate the chunk again
+        leased_call = st.session_state.get("leased_call")
+        with pool.reader() as conn:
+            held = get_held_lease(conn, annotator=user)
+        if held is None or held[0] != leased_call:
+            st.session_state["save_error"] = LEASE_LOST_MESSAGE
+            for key in _ANNOTATOR_QUEUE_KEYS:
+                st.session_state.pop(key, None)
+            return
 
-        if len(st.session_state["annotated_idx"]) == st.session_state["n_chunks"]:
-            st.session_state["all_done"] = True
+        try:
+            saved = save_data_to_table(
+                pool,
+                new_id,
+                user,
+                role,
+                current_date,
+                current_time,
+                sel_int_str,
+                sel_subint_str,
+                confidence,
+                comment,
+            )
+            error = None if saved else SAVE_FAILED_MESSAGE
+        except InvalidLabelsError:
+            error = INVALID_LABELS_MESSAGE
+        if error:
+            # stay on the chunk; the page shows the error
+            st.session_state["save_error"] = error
             return
 
-        idx = st.session_state["current_idx"] + 1
+        navigator: ChunkNavigator = st.session_state["navigator"]
+        idx = navigator.remove(st.session_state["current_idx"])
 
-        while True:
-            if idx == st.session_state["n_chunks"]:
-                idx = 0
+        # last chunk of the leased call: release it as done, the next render
+        # leases the next call
+        if idx is None:
+            with pool.writer_connection() as conn:
+                complete_call(conn, annotator=user, connection_id=leased_call)
+            for key in _ANNOTATOR_QUEUE_KEYS:
+                st.session_state.pop(key, None)
+            return
 
-            if idx not in st.session_state["annotated_idx"]:
-                st.session_state["current_idx"] = idx
-                break
-            idx += 1
+        st.session_state["current_idx"] = idx
     except Exception as e:
         logging.error(f"An error occurred in 'save_next_button_clicked': {e}")
         logging.error(traceback.format_exc())
@@ -557,7 +951,8 @@ def get_default_options(values):
         list: The default options.
     """
     try:
-        if values is None or values == "":
+        # missing labels are None, or NaN in the shared categorical columns
+        if values is None or pd.isna(values) or values == "":
             return []
 
         options = [s.strip() for s in values.split(",")]
@@ -567,104 +962,231 @@ def get_default_options(values):
         logging.error(traceback.format_exc())
 
 
-def get_call_ids_to_be_reviewed(
-    call_data: pd.DataFrame,
-    user_call_mapping: pd.DataFrame,
-    annot_data: pd.DataFrame,
-    rev_username: str,
-) -> pd.DataFrame:
+@traced
+def get_already_reviewed_calls(pool, connection_id, chunk_id):
     """
-    Retrieve the call IDs to be reviewed based on the given input data.
+    Get the status and review data for a specific call chunk.
 
     Args:
-        call_data (pd.DataFrame): Dataframe containing call information.
-        user_call_mapping (pd.DataFrame): Dataframe containing user-call mapping information.
-        annot_data (pd.DataFrame): Dataframe containing annotation data.
-        rev_username (str): Username of the reviewer.
+        pool (ConnectionPool): The database connection pool.
+        connection_id (str): Connection ID.
+        chunk_id (int): Chunk ID.
 
     Returns:
-        pd.DataFrame: Dataframe containing the call IDs to be reviewed.
+        tuple: A tuple containing the status and a DataFrame with the latest review row.
+    """
+    try:
+        name = st.session_state["name"]
+        new_id = f"{connection_id}_chunk_{chunk_id}"
 
-    Raises:
-        Exception: If an error occurs while retrieving call IDs to be reviewed.
+        # only the latest review is used, served by idx_annotations_call_user_ts
+        query = (
+            f"SELECT {', '.join(ANNOTATION_COLUMNS)} FROM annotations_flat "
+            "WHERE call_id = ? AND username = ? "
+            "ORDER BY created_at DESC, annotation_id DESC "
+            "LIMIT 1"
+        )
+        with pool.reader() as conn:
+            df = pd.read_sql_query(query, conn, params=(new_id, name))
+
+        if df.empty:
+            status = "Pending"
+        else:
+            status = "Reviewed"
+
+        return status, df
+    except Exception as e:
+        logging.error(f"An error occurred in 'get_already_reviewed_calls': {e}")
+        logging.error(traceback.format_exc())
+        return None, None
+
+
+@traced
+@st.cache_resource(max_entries=2)
+@cache_miss
+def get_chunk_position_index(version: int) -> ChunkPositionIndex:
     """
+    Build the call_id to row_idx lookup of the call data.
+
+    Cached per version of the call data catalog, so it is rebuilt only when
+    new batches are loaded.
 
+    Args:
+        version (int): batch_id of the last batch in the call data.
+
+    Returns:
+        ChunkPositionIndex: The lookup.
+    """
     try:
-        only_annotator_data = annot_data.query("role == 'annotator'")
+        return ChunkPositionIndex(get_chunk_data_store())
+
+    except Exception as e:
+        logging.error(f"An error occurred in 'get_chunk_position_index': {e}")
+        logging.error(traceback.format_exc())
+        raise
 
-        call_ids = (
-            pd.merge(call_data, user_call_mapping, on=CONN_ID_COLNAME, how="left")
-            .assign(
-                new_id=lambda x: x[CONN_ID_COLNAME]
-                + "_chunk_"
-                + x[CHUNK_ID_COLNAME].astype(str)
-            )
-            .merge(
-                only_annotator_data,
-                left_on=["new_id"],
-                right_on=["call_id"],
-                how="inner",
-            )
-            .sort_values(by=[CONN_ID_COLNAME, CHUNK_ID_COLNAME])
-            .reset_index(drop=True)
-        )
 
-        if st.session_state.get("role") == "admin":
-            final_call_ids = call_ids.copy()
-        elif st.session_state.get("role") == "reviewer":
-            final_call_ids = call_ids.query("Reviewer == @rev_username")
+def get_review_queue_owner() -> Optional[str]:
+    """
+    Get the reviewer whose queue the signed-in user works on.
+
+    Returns:
+        Optional[str]: The reviewer's name; None for an admin, who sees the
+            whole queue.
+    """
+    if st.session_state.get("role") == "admin":
+        return None
+    return st.session_state.get("name")
+
+
+@traced
+def get_review_window(
+    pool: ConnectionPool,
+    reviewer: Optional[str],
+    key: Optional[Tuple[str, Optional[int]]],
+    size: int = REVIEW_WINDOW_SIZE,
+) -> Tuple[pd.DataFrame, int, int]:
+    """
+    Get the chunks of a reviewer's queue around the current one.
 
-        return final_call_ids
+    Indexed replacement for the pandas join of the call data with every
+    annotation (kept in benchmarks/baselines.py): only the window is read,
+    with keyset pagination on (ConnectionID, chunk_id) over the
+    trigger-maintained review queue, and the length of the queue comes from
+    the progress tables.
+
+    Args:
+        pool (ConnectionPool): The database connection pool.
+        reviewer (str, optional): The reviewer; None for the whole queue.
+        key (Tuple[str, Optional[int]], optional): (ConnectionID, chunk_id)
+            of the current chunk; None for the start of the queue.
+        size (int): Number of chunks on each side of the current one.
+
+    Returns:
+        Tuple[pd.DataFrame, int, int]: The window, the position of the
+            current chunk in it and the number of chunks in the queue.
+    """
+    try:
+        with pool.reader() as conn:
+            n_chunks = count_review_queue(conn, reviewer)
+            window, current = read_review_window(conn, reviewer, key, size)
+
+        return window, current, n_chunks
 
     except Exception as e:
-        logging.error("An error occurred while retrieving call IDs to be reviewed.")
+        logging.error("An error occurred while reading the review queue.")
         logging.error(traceback.format_exc())
-        raise e
+        raise
 
 
-def get_already_reviewed_calls(_conn, connection_id, chunk_id):
+@traced
+def get_review_row(pool: ConnectionPool, chunk: pd.Series) -> pd.Series:
     """
-    Get the status and review data for a specific call chunk.
+    Get the chunk on the reviewer's screen with its latest annotator annotation.
 
     Args:
-        _conn (sqlite3.Connection): SQLite database connection object.
-        connection_id (str): Connection ID.
-        chunk_id (int): Chunk ID.
+        pool (ConnectionPool): The database connection pool.
+        chunk (pd.Series): Row of the window from `get_review_window`.
 
     Returns:
-        tuple: A tuple containing the status and review data DataFrame.
+        pd.Series: The chunk's ConnectionID, chunk_id, new_id, row_idx (-1 when
+            the call data doesn't have it yet), Annotator and the
+            annotation's columns.
     """
     try:
-        name = st.session_state["name"]
-        new_id = f"{connection_id}_chunk_{chunk_id}"
+        with pool.reader() as conn:
+            annotation = get_latest_annotations(
+                conn, [chunk["call_id"]], role="annotator"
+            )
 
-        query = f"SELECT * FROM call_annotation_table"
-        df = (
-            pd.read_sql_query(query, _conn)
-            .query("username == @name")
-            .query("call_id == @new_id")
-            .sort_values(["date", "time"], ascending=[False, False])
-            .reset_index(drop=True)
+        positions = get_chunk_position_index(get_call_data_catalog().version)
+        row = pd.Series(
+            {
+                CONN_ID_COLNAME: chunk[CONN_ID_COLNAME],
+                CHUNK_ID_COLNAME: chunk[CHUNK_ID_COLNAME],
+                ROW_IDX_COLNAME: int(positions.get_positions([chunk["call_id"]])[0]),
+                "Annotator": chunk["annotator"],
+                "new_id": chunk["call_id"],
+            }
         )
+        if not annotation.empty:
+            row = pd.concat([row, annotation.iloc[0]])
 
-        if df.empty:
-            status = "Pending"
-        else:
-            status = "Reviewed"
+        return row
 
-        return status, df
     except Exception as e:
-        logging.error(f"An error occurred in 'get_already_reviewed_calls': {e}")
+        logging.error(f"An error occurred in 'get_review_row': {e}")
         logging.error(traceback.format_exc())
-        return None, None
+        raise
+
+
+@traced
+def get_call_picker_options(pool, reviewer, current_conn_id):
+    """
+    Get the ConnectionIDs shown in the reviewer's call picker.
+
+    Only one page of calls is sent to the browser: the first calls matching
+    the search prefix, or without a search the calls around the current one.
+    The current call is always part of the options so the selectbox can show
+    it.
+
+    Args:
+        pool (ConnectionPool): The database connection pool.
+        reviewer (str, optional): The reviewer; None for the whole queue.
+        current_conn_id (str): ConnectionID of the chunk on screen.
+
+    Returns:
+        list: The ConnectionIDs to show.
+    """
+    try:
+        prefix = st.session_state.get("conn_id_search", "").strip()
+
+        with pool.reader() as conn:
+            options = list_review_calls(
+                conn,
+                reviewer,
+                prefix=prefix,
+                around=None if prefix else current_conn_id,
+                limit=CALL_PICKER_PAGE_SIZE,
+            )
+        if current_conn_id not in options:
+            options = [current_conn_id] + options
+
+        return options
 
+    except Exception as e:
+        logging.error(f"An error occurred in 'get_call_picker_options': {e}")
+        logging.error(traceback.format_exc())
+        return [current_conn_id]
 
-def reviewer_select_connid(review_df):
+
+@traced
+def get_review_chunk_ids(pool, reviewer, conn_id):
     """
-    Set the current index based on the selected ConnectionID.
+    Get the chunk IDs of a call in the reviewer's queue.
 
     Args:
-        review_df (pandas.DataFrame): DataFrame containing the review data.
+        pool (ConnectionPool): The database connection pool.
+        reviewer (str, optional): The reviewer; None for the whole queue.
+        conn_id (str): Connection ID.
+
+    Returns:
+        list: The chunk IDs, sorted.
+    """
+    try:
+        with pool.reader() as conn:
+            return list_review_chunks(conn, reviewer, conn_id)
+
+    except Exception as e:
+        logging.error(f"An error occurred in 'get_review_chunk_ids': {e}")
+        logging.error(traceback.format_exc())
+        return []
+
+
+@traced
+def reviewer_select_connid():
+    """
+    Go to the first chunk of the selected ConnectionID.
 
     Returns:
         None
@@ -673,19 +1195,16 @@ def reviewer_select_connid(review_df):
         conn_id_select = st.session_state.get("conn_id_select")
 
         if conn_id_select is not None:
-            idx = review_df[review_df[CONN_ID_COLNAME] == conn_id_select].index[0]
-            st.session_state["current_idx"] = idx
+            st.session_state["review_key"] = (conn_id_select, None)
     except Exception as e:
         logging.error(f"An error occurred in 'reviewer_select_connid': {e}")
         logging.error(traceback.format_exc())
 
 
-def reviewer_select_chunkid(review_df):
+@traced
+def reviewer_select_chunkid():
     """
-    Set the current index based on the selected ConnectionID and chunk ID.
-
-    Args:
-        review_df (pandas.DataFrame): DataFrame containing the review data.
+    Go to the selected chunk of the selected ConnectionID.
 
     Returns:
         None
@@ -695,17 +1214,14 @@ def reviewer_select_chunkid(review_df):
         chunk_id_select = st.session_state.get("chunk_id_select")
 
         if conn_id_select is not None and chunk_id_select is not None:
-            idx = review_df[
-                (review_df[CONN_ID_COLNAME] == conn_id_select)
-                & (review_df[CHUNK_ID_COLNAME] == chunk_id_select)
-            ].index[0]
-            st.session_state["current_idx"] = idx
+            st.session_state["review_key"] = (conn_id_select, int(chunk_id_select))
 
     except Exception as e:
         logging.error(f"An error occurred in 'reviewer_select_chunkid': {e}")
         logging.error(traceback.format_exc())
 
 
+@traced
 def display_annotation_details(current_row):
     """
     Display the annotation details for the current row in the webapp.
@@ -745,6 +1261,7 @@ def display_annotation_details(current_row):
         logging.error(traceback.format_exc())
 
 
+@traced
 def display_name_and_role():
     """
     Display the name and role of the user.
@@ -767,3 +1284,15 @@ def display_name_and_role():
     except Exception as e:
         logging.error(f"An error occurred in 'display_name_and_role': {e}")
         logging.error(traceback.format_exc())
+
+
+def show_save_error():
+    """
+    Display the error of the last save, if it failed.
+
+    Returns:
+        None
+    """
+    message = st.session_state.pop("save_error", None)
+    if message:
+        st.error(message)
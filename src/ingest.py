@@ -0,0 +1,423 @@
+import argparse
+import logging
+import os
+import sqlite3
+import threading
+import time
+import traceback
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from config import (
+    CHUNK_ID_COLNAME,
+    CONN_ID_COLNAME,
+    DB_BUSY_TIMEOUT_MS,
+    DB_PATH,
+    FULL_TEXT_COLNAME,
+    INGEST_DIR,
+    INTENT_COLNAME,
+    MAPPING_PATH,
+    ROW_GROUP_SIZE,
+    ROW_IDX_COLNAME,
+    SUB_INTENT_COLNAME,
+    TEXT_COLNAME,
+)
+from data_store import (
+    CallDataStore,
+    ChunkDataStore,
+    ChunkPositionIndex,
+    PartitionedChunkStore,
+    open_chunk_data_store,
+)
+from db_pool import ConnectionPool
+from migrations import apply_migrations
+from shared_cache import SharedCallData
+from work_queue import sync_assignments
+
+BATCH_TABLE = "call_data_batches"
+BATCH_DATA_FILE = "data.parquet"
+BATCH_MAPPING_FILE = "mapping.parquet"
+
+# schemas of data.parquet and mapping.parquet; every batch is checked against
+# and cast to them, so the partitions line up with the base inputs
+DATA_SCHEMA = pa.schema(
+    [
+        (CHUNK_ID_COLNAME, pa.int64()),
+        (TEXT_COLNAME, pa.string()),
+        (CONN_ID_COLNAME, pa.string()),
+        (FULL_TEXT_COLNAME, pa.string()),
+        (INTENT_COLNAME, pa.string()),
+        (SUB_INTENT_COLNAME, pa.string()),
+    ]
+)
+MAPPING_SCHEMA = pa.schema(
+    [
+        (CONN_ID_COLNAME, pa.string()),
+        ("Annotator", pa.string()),
+        ("Reviewer", pa.string()),
+    ]
+)
+
+# columns that identify a chunk and may not be null
+KEY_COLUMNS = [CONN_ID_COLNAME, CHUNK_ID_COLNAME]
+
+
+def _check_schema(table: pa.Table, schema: pa.Schema, name: str) -> List[str]:
+    problems = []
+    for field in schema:
+        if field.name not in table.column_names:
+            problems.append(f"{name} is missing the column {field.name!r}")
+            continue
+
+        actual = table.schema.field(field.name).type
+        if pa.types.is_integer(field.type):
+            compatible = pa.types.is_integer(actual)
+        else:
+            compatible = pa.types.is_string(actual) or pa.types.is_large_string(actual)
+        if not (compatible or pa.types.is_null(actual)):
+            problems.append(
+                f"{name} column {field.name!r} has type {actual}, expected {field.type}"
+            )
+    return problems
+
+
+def validate_batch(
+    data: pa.Table, mapping: pa.Table
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Check a call batch against the column names and types of the base inputs.
+
+    Args:
+        data (pa.Table): Chunks of the batch, laid out like data.parquet.
+        mapping (pa.Table): User-call mapping of the batch, laid out like
+            mapping.parquet.
+
+    Returns:
+        Tuple[pd.DataFrame, pd.DataFrame]: The (data, mapping) frames with only
+            the known columns, cast to their expected types.
+
+    Raises:
+        ValueError: If a column is missing or has the wrong type, or a chunk
+            has no ConnectionID or chunk_id.
+    """
+    problems = _check_schema(data, DATA_SCHEMA, "data")
+    problems += _check_schema(mapping, MAPPING_SCHEMA, "mapping")
+
+    if not problems:
+        for col in KEY_COLUMNS:
+            n_null = data.column(col).null_count
+            if n_null:
+                problems.append(f"data has {n_null} rows without a {col}")
+        if mapping.column(CONN_ID_COLNAME).null_count:
+            problems.append(f"mapping has rows without a {CONN_ID_COLNAME}")
+
+    if problems:
+        raise ValueError("Invalid call batch:\n- " + "\n- ".join(problems))
+
+    data = data.select(DATA_SCHEMA.names).cast(DATA_SCHEMA)
+    mapping = mapping.select(MAPPING_SCHEMA.names).cast(MAPPING_SCHEMA)
+    return data.to_pandas(), mapping.to_pandas()
+
+
+def list_batches(conn: sqlite3.Connection, after: int = 0) -> List[Tuple[int, str]]:
+    """
+    List the ingested call batches.
+
+    Args:
+        conn (sqlite3.Connection): Connection object to the database.
+        after (int): Only list batches with a larger batch_id.
+
+    Returns:
+        List[Tuple[int, str]]: The (batch_id, partition directory) of every
+            batch, in ingestion order.
+    """
+    query = (
+        f"SELECT batch_id, path FROM {BATCH_TABLE} WHERE batch_id > ? ORDER BY batch_id"
+    )
+    return conn.execute(query, (after,)).fetchall()
+
+
+def open_call_data_store(
+    conn: sqlite3.Connection, base: Optional[CallDataStore] = None
+) -> PartitionedChunkStore:
+    """
+    Open the base call data together with the partitions of every batch.
+
+    Args:
+        conn (sqlite3.Connection): Connection object to the database.
+        base (CallDataStore, optional): The base call data; opened from the
+            default paths when None.
+
+    Returns:
+        PartitionedChunkStore: The call data of the base inputs and the batches.
+    """
+    store = PartitionedChunkStore(base or open_chunk_data_store())
+    for _, path in list_batches(conn):
+        store.add_partition(ChunkDataStore(os.path.join(path, BATCH_DATA_FILE)))
+    return store
+
+
+def read_mapping(
+    conn: sqlite3.Connection, mapping_path: str = MAPPING_PATH
+) -> pd.DataFrame:
+    """
+    Read the user-call mapping of the base inputs and every batch.
+
+    Args:
+        conn (sqlite3.Connection): Connection object to the database.
+        mapping_path (str): Path to the base mapping.parquet.
+
+    Returns:
+        pd.DataFrame: One row per ConnectionID; a later batch overrides the
+            assignment of a call given by the inputs or an earlier batch.
+    """
+    frames = [pd.read_parquet(mapping_path)]
+    for _, path in list_batches(conn):
+        frames.append(pd.read_parquet(os.path.join(path, BATCH_MAPPING_FILE)))
+    return _merge_mappings(frames)
+
+
+def _merge_mappings(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    return (
+        pd.concat(frames, ignore_index=True)
+        .drop_duplicates(subset=CONN_ID_COLNAME, keep="last")
+        .reset_index(drop=True)
+    )
+
+
+def ingest_batch(
+    conn: sqlite3.Connection,
+    data_path: str,
+    mapping_path: Optional[str] = None,
+    ingest_dir: str = INGEST_DIR,
+    base: Optional[CallDataStore] = None,
+    row_group_size: int = ROW_GROUP_SIZE,
+) -> int:
+    """
+    Add a batch of new calls/chunks and their assignments to the inputs.
+
+    The chunks already in the call data are dropped on (ConnectionID,
+    chunk_id), as are repeats inside the batch. The rest is written as a new
+    partition directory under `ingest_dir`, its chunks are added to the work
+    queue, and the batch is registered in the call_data_batches table, which
+    running apps poll to load just the new partition. Re-running a batch that
+    was ingested before adds nothing.
+
+    Run one ingest at a time; two concurrent ingests of the same chunks can
+    both add them.
+
+    Args:
+        conn (sqlite3.Connection): Connection object to the migrated database.
+        data_path (str): Parquet file of chunks laid out like data.parquet.
+        mapping_path (str, optional): Parquet file laid out like mapping.parquet.
+            Chunks of calls missing from it keep the call's current
+            assignment, or stay unassigned for new calls.
+        ingest_dir (str): Directory the partitions are written to.
+        base (CallDataStore, optional): The base call data; opened from the
+            default paths when None.
+        row_group_size (int): Number of rows per parquet row group.
+
+    Returns:
+        int: Number of chunks added.
+    """
+    try:
+        data = pq.read_table(data_path)
+        mapping = (
+            pq.read_table(mapping_path)
+            if mapping_path
+            else MAPPING_SCHEMA.empty_table()
+        )
+        data, mapping = validate_batch(data, mapping)
+        n_rows = len(data)
+
+        data = data.drop_duplicates(subset=KEY_COLUMNS, keep="first")
+        call_ids = (
+            data[CONN_ID_COLNAME] + "_chunk_" + data[CHUNK_ID_COLNAME].astype(str)
+        )
+        positions = ChunkPositionIndex(open_call_data_store(conn, base))
+        data = data[positions.get_positions(call_ids.to_numpy()) < 0]
+
+        if data.empty:
+            logging.info(
+                f"No new chunks in {data_path}; {n_rows} rows already ingested."
+            )
+            return 0
+
+        data = data.sort_values(KEY_COLUMNS, kind="stable").reset_index(drop=True)
+        conn_ids = data[CONN_ID_COLNAME].unique()
+
+        # assignments of the batch's calls: the batch mapping first, then the
+        # current one for calls it doesn't mention
+        current = read_mapping(conn)
+        mapping = _merge_mappings(
+            [current[current[CONN_ID_COLNAME].isin(conn_ids)], mapping]
+        )
+        mapping = mapping[mapping[CONN_ID_COLNAME].isin(conn_ids)].reset_index(
+            drop=True
+        )
+
+        path = os.path.join(ingest_dir, f"batch_{datetime.now():%Y%m%d_%H%M%S_%f}")
+        os.makedirs(path)
+        pq.write_table(
+            pa.Table.from_pandas(data, schema=DATA_SCHEMA, preserve_index=False),
+            os.path.join(path, BATCH_DATA_FILE),
+            row_group_size=row_group_size,
+        )
+        pq.write_table(
+            pa.Table.from_pandas(mapping, schema=MAPPING_SCHEMA, preserve_index=False),
+            os.path.join(path, BATCH_MAPPING_FILE),
+        )
+
+        # the assignments are committed before the batch is registered, so an
+        # app never loads a partition whose chunks are missing from the work
+        # queue; if the ingest stops in between, re-running it redoes both
+        sync_assignments(conn, data, mapping)
+        with conn:
+            conn.execute(
+                f"INSERT INTO {BATCH_TABLE} (path, source, n_chunks, n_calls, ingested_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (path, data_path, len(data), len(conn_ids), int(time.time())),
+            )
+
+        logging.info(
+            f"Ingested {len(data)} new chunks of {len(conn_ids)} calls from "
+            f"{data_path} into {path}; {n_rows - len(data)} rows were duplicates."
+        )
+        return len(data)
+
+    except Exception as e:
+        logging.error(f"An error occurred in 'ingest_batch': {e}")
+        logging.error(traceback.format_exc())
+        raise
+
+
+class CallDataCatalog:
+    """
+    The queue columns and user-call mapping of the inputs and every batch.
+
+    The base inputs are read once; afterwards the call_data_batches table is
+    polled past a batch_id high-water mark and only the partitions of new
+    batches are read.
+
+    With `shared`, the frames are the ones the loader published instead (see
+    shared_cache.py) and only the text partitions are opened here, up to the
+    last batch in the published frames, so their row_idx line up.
+    """
+
+    def __init__(
+        self,
+        pool: ConnectionPool,
+        base: Optional[CallDataStore] = None,
+        mapping_path: str = MAPPING_PATH,
+        shared: Optional[SharedCallData] = None,
+    ):
+        self._pool = pool
+        self._lock = threading.Lock()
+        self._high_water = 0
+        self._shared = shared
+        self.store = PartitionedChunkStore(base or open_chunk_data_store())
+        if shared is None:
+            self._data = self.store.read_queue_frame()
+            self._mapping = pd.read_parquet(mapping_path)
+            self.refresh()
+
+    def refresh(self, until: Optional[int] = None) -> int:
+        """
+        Load the partitions of the batches ingested since the last refresh.
+
+        Args:
+            until (int, optional): Last batch_id to load. In shared mode only
+                the text partitions are opened, not the queue frames.
+
+        Returns:
+            int: Number of new batches loaded.
+        """
+        try:
+            with self._lock:
+                with self._pool.reader() as conn:
+                    batches = list_batches(conn, after=self._high_water)
+                if until is not None:
+                    batches = [b for b in batches if b[0] <= until]
+                if not batches:
+                    return 0
+
+                if self._shared is not None:
+                    for batch_id, path in batches:
+                        self.store.add_partition(
+                            ChunkDataStore(os.path.join(path, BATCH_DATA_FILE))
+                        )
+                        self._high_water = batch_id
+                    return len(batches)
+
+                data_frames, mapping_frames = [self._data], [self._mapping]
+                for batch_id, path in batches:
+                    partition = ChunkDataStore(os.path.join(path, BATCH_DATA_FILE))
+                    chunks = partition.read_queue_frame()
+                    chunks[ROW_IDX_COLNAME] += self.store.add_partition(partition)
+                    data_frames.append(chunks)
+                    mapping_frames.append(
+                        pd.read_parquet(os.path.join(path, BATCH_MAPPING_FILE))
+                    )
+                    self._high_water = batch_id
+
+                self._data = pd.concat(data_frames, ignore_index=True)
+                self._mapping = _merge_mappings(mapping_frames)
+                logging.info(
+                    f"Loaded {len(batches)} new call batches; "
+                    f"{len(self._data)} chunks in total."
+                )
+                return len(batches)
+
+        except Exception as e:
+            logging.error(f"An error occurred in 'CallDataCatalog.refresh': {e}")
+            logging.error(traceback.format_exc())
+            raise
+
+    @property
+    def version(self) -> int:
+        """batch_id of the last batch loaded, 0 before any batch."""
+        return self._high_water
+
+    def snapshot(self) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Get the current call data and mapping after polling for new batches.
+
+        The returned frames are shared between callers and must not be modified.
+
+        Returns:
+            Tuple[pd.DataFrame, pd.DataFrame]: The (data, mapping) frames.
+        """
+        if self._shared is not None:
+            batch_id, data, mapping = self._shared.snapshot()
+            if batch_id > self._high_water:
+                self.refresh(until=batch_id)
+            return data, mapping
+
+        self.refresh()
+        with self._lock:
+            return self._data, self._mapping
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Add a batch of new calls and their assignments to the inputs."
+    )
+    parser.add_argument(
+        "data", help="Parquet file of chunks laid out like data.parquet."
+    )
+    parser.add_argument(
+        "--mapping", help="Parquet file of assignments laid out like mapping.parquet."
+    )
+    parser.add_argument("--db", default=DB_PATH, help="Path to the SQLite database.")
+    parser.add_argument("--ingest-dir", default=INGEST_DIR)
+    args = parser.parse_args()
+
+    connection = sqlite3.connect(args.db, timeout=DB_BUSY_TIMEOUT_MS / 1000)
+    apply_migrations(connection)
+    added = ingest_batch(connection, args.data, args.mapping, args.ingest_dir)
+    connection.close()
+    print(f"Added {added} new chunks from {args.data}.")
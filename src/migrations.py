@@ -0,0 +1,237 @@
+import argparse
+import logging
+import sqlite3
+import traceback
+from typing import Callable, List, Optional
+
+from annotation_schema import (
+    INTENT_LABEL,
+    SUBINTENT_LABEL,
+    V2_TABLES,
+    V2_VIEWS,
+    LabelDictionary,
+    split_labels,
+)
+from config import DB_PATH
+from progress import PROGRESS_TABLES, PROGRESS_TRIGGERS, rebuild_progress
+from review_queue import (
+    REVIEW_QUEUE_TABLES,
+    REVIEW_QUEUE_TRIGGERS,
+    rebuild_review_queue,
+)
+from work_queue import ASSIGNMENT_TABLES
+
+
+def _execute_statements(conn: sqlite3.Connection, script: str) -> None:
+    # executescript() would commit the migration's transaction, so run the
+    # statements one by one instead; a trigger's body holds several ";"
+    statement = ""
+    for part in script.split(";"):
+        statement += part + ";"
+        if sqlite3.complete_statement(statement):
+            if statement.strip(" \n;"):
+                conn.execute(statement)
+            statement = ""
+
+
+def _object_type(conn: sqlite3.Connection, name: str) -> Optional[str]:
+    # "table", "view", ... or None when the schema has no such object
+    row = conn.execute(
+        "SELECT type FROM sqlite_master WHERE name = ?", (name,)
+    ).fetchone()
+    return row[0] if row else None
+
+
+def _create_annotation_table(conn: sqlite3.Connection) -> None:
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS call_annotation_table (
+            call_id TEXT,
+            username TEXT,
+            role TEXT,
+            date DATE,
+            time TIME,
+            case_type TEXT,
+            subcase_type TEXT,
+            confidence TEXT,
+            comments TEXT,
+            PRIMARY KEY (call_id, date, time)
+        )
+        """)
+
+
+def _add_review_lookup_index(conn: sqlite3.Connection) -> None:
+    # serves "latest row of this user for this chunk" without a table scan;
+    # the v2 schema indexes the annotations table instead
+    if _object_type(conn, "call_annotation_table") == "view":
+        return
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_annotation_call_user_ts
+            ON call_annotation_table (call_id, username, date, time)
+        """)
+
+
+def _upgrade_to_v2_schema(conn: sqlite3.Connection) -> None:
+    # typed timestamp + normalized labels; call_annotation_table becomes a
+    # view with the documented columns so existing readers keep working; a
+    # schema where it already is a view was upgraded before
+    if _object_type(conn, "call_annotation_table") == "view":
+        return
+    conn.execute("ALTER TABLE call_annotation_table RENAME TO call_annotation_table_v1")
+    _execute_statements(conn, V2_TABLES)
+    _execute_statements(conn, V2_VIEWS)
+
+    conn.execute("""
+        INSERT INTO annotations
+            (annotation_id, call_id, username, role, created_at, confidence, comments)
+        SELECT
+            rowid, call_id, username, role,
+            COALESCE(CAST(strftime('%s', date || ' ' || time, 'utc') AS INTEGER), 0),
+            confidence, comments
+        FROM call_annotation_table_v1
+        """)
+
+    labels = LabelDictionary()
+    rows = conn.cursor().execute(
+        "SELECT rowid, case_type, subcase_type FROM call_annotation_table_v1"
+    )
+    while True:
+        batch = rows.fetchmany(10_000)
+        if not batch:
+            break
+
+        label_rows = []
+        for annotation_id, intents, subintents in batch:
+            for kind, values in [
+                (INTENT_LABEL, intents),
+                (SUBINTENT_LABEL, subintents),
+            ]:
+                for position, name in enumerate(dict.fromkeys(split_labels(values))):
+                    label_id = labels.get_id(conn, kind, name)
+                    label_rows.append((annotation_id, label_id, position))
+        conn.executemany(
+            "INSERT INTO annotation_labels (annotation_id, label_id, position) VALUES (?, ?, ?)",
+            label_rows,
+        )
+
+    conn.execute("DROP TABLE call_annotation_table_v1")
+
+
+def _create_call_data_batch_table(conn: sqlite3.Connection) -> None:
+    # one row per call batch added by ingest.py; running apps poll it past the
+    # last batch_id they loaded
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS call_data_batches (
+            batch_id INTEGER PRIMARY KEY,
+            path TEXT NOT NULL,
+            source TEXT,
+            n_chunks INTEGER NOT NULL,
+            n_calls INTEGER NOT NULL,
+            ingested_at INTEGER NOT NULL
+        )
+        """)
+
+
+def _create_progress_tables(conn: sqlite3.Connection) -> None:
+    # summary tables of the admin progress page, maintained by triggers; the
+    # triggers read the chunk assignments, so their table is created first
+    _execute_statements(conn, ASSIGNMENT_TABLES)
+    _execute_statements(conn, PROGRESS_TABLES)
+    _execute_statements(conn, PROGRESS_TRIGGERS)
+    rebuild_progress(conn)
+
+
+def _add_taxonomy_version(conn: sqlite3.Connection) -> None:
+    # content hash of the intents file a save's labels were chosen from; NULL
+    # for the annotations saved before
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(annotations)")]
+    if "taxonomy_version" not in columns:
+        conn.execute("ALTER TABLE annotations ADD COLUMN taxonomy_version TEXT")
+
+
+def _create_review_queue(conn: sqlite3.Connection) -> None:
+    # annotated chunks in review order, maintained by triggers, for the
+    # keyset-paginated reviewer page
+    _execute_statements(conn, REVIEW_QUEUE_TABLES)
+    _execute_statements(conn, REVIEW_QUEUE_TRIGGERS)
+    rebuild_review_queue(conn)
+
+
+def _add_progress_totals(conn: sqlite3.Connection) -> None:
+    # the admin's review queue length, kept by the triggers that maintain the
+    # annotated chunks per reviewer; those are recreated to update it too
+    _execute_statements(conn, PROGRESS_TABLES)
+    for trigger in [
+        "progress_chunk_annotated",
+        "progress_assignment_insert",
+        "progress_assignment_delete",
+    ]:
+        conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    _execute_statements(conn, PROGRESS_TRIGGERS)
+    rebuild_progress(conn)
+
+
+# Append new migrations to the end of this list; never reorder or remove one.
+# The position in the list (starting at 1) is the schema version it produces.
+MIGRATIONS: List[Callable[[sqlite3.Connection], None]] = [
+    _create_annotation_table,
+    _add_review_lookup_index,
+    _upgrade_to_v2_schema,
+    _create_call_data_batch_table,
+    _create_progress_tables,
+    _add_taxonomy_version,
+    _create_review_queue,
+    _add_progress_totals,
+]
+
+
+def apply_migrations(conn: sqlite3.Connection) -> int:
+    """
+    Bring the database schema up to date.
+
+    The current version is tracked in `PRAGMA user_version`, so each migration
+    runs exactly once per database file. Each migration runs in its own
+    transaction and is rolled back as a whole if it fails. The version is
+    read again once that transaction holds the write lock, so processes that
+    start together (app replicas, the shared cache loader) skip the
+    migrations another one applied in the meantime.
+
+    Args:
+        conn (sqlite3.Connection): Connection object to the database.
+
+    Returns:
+        int: The schema version after applying the migrations.
+    """
+    try:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+
+        for target, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                version = conn.execute("PRAGMA user_version").fetchone()[0]
+                if version >= target:
+                    conn.commit()
+                    continue
+                migration(conn)
+                conn.execute(f"PRAGMA user_version = {target}")
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            logging.info(f"Applied database migration {target}: {migration.__name__}")
+
+        return max(version, len(MIGRATIONS))
+
+    except Exception as e:
+        logging.error(f"An error occurred in 'apply_migrations': {e}")
+        logging.error(traceback.format_exc())
+        raise
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate the annotations database.")
+    parser.add_argument("--db", default=DB_PATH, help="Path to the SQLite database.")
+    args = parser.parse_args()
+
+    connection = sqlite3.connect(args.db)
+    print(f"Schema version: {apply_migrations(connection)}")
+    connection.close()
@@ -0,0 +1,81 @@
+from typing import Optional
+
+
+class ChunkNavigator:
+    """
+    Circular doubly linked list over the positions of an annotator's queue
+    that still have to be annotated.
+
+    Annotated positions are unlinked, so moving to the next or previous pending
+    chunk and marking a chunk as done are O(1) no matter how many chunks of
+    the queue have already been annotated.
+    """
+
+    def __init__(self, n_chunks: int):
+        self.n_chunks = n_chunks
+        self._next = list(range(1, n_chunks)) + [0] if n_chunks else []
+        self._prev = [n_chunks - 1] + list(range(n_chunks - 1)) if n_chunks else []
+        self._done = bytearray(n_chunks)
+        self._remaining = n_chunks
+
+    def __len__(self) -> int:
+        """Number of chunks still to be annotated."""
+        return self._remaining
+
+    def __contains__(self, idx: int) -> bool:
+        """Whether the chunk at `idx` is still to be annotated."""
+        return 0 <= idx < self.n_chunks and not self._done[idx]
+
+    @property
+    def n_done(self) -> int:
+        return self.n_chunks - self._remaining
+
+    def next(self, idx: int) -> int:
+        """
+        Get the next pending position after a pending position, wrapping
+        around to the start of the queue.
+
+        Args:
+            idx (int): A pending position.
+
+        Returns:
+            int: The next pending position (`idx` itself if it is the only one).
+        """
+        return self._next[idx]
+
+    def prev(self, idx: int) -> Optional[int]:
+        """
+        Get the previous pending position before a pending position, without
+        wrapping around.
+
+        Args:
+            idx (int): A pending position.
+
+        Returns:
+            Optional[int]: The previous pending position, or None if there is
+                none before `idx`.
+        """
+        prev_idx = self._prev[idx]
+        return prev_idx if prev_idx < idx else None
+
+    def remove(self, idx: int) -> Optional[int]:
+        """
+        Mark a pending position as annotated.
+
+        Args:
+            idx (int): A pending position.
+
+        Returns:
+            Optional[int]: The next pending position after `idx`, or None if
+                the queue is now empty.
+        """
+        if self._done[idx]:
+            raise ValueError(f"Position {idx} is already annotated.")
+
+        prev_idx, next_idx = self._prev[idx], self._next[idx]
+        self._next[prev_idx] = next_idx
+        self._prev[next_idx] = prev_idx
+        self._done[idx] = 1
+        self._remaining -= 1
+
+        return next_idx if self._remaining else None
@@ -0,0 +1,189 @@
+import logging
+import threading
+import traceback
+from concurrent.futures import Executor, Future
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import pandas as pd
+
+from config import INTENT_COLNAME, ROW_IDX_COLNAME, SUB_INTENT_COLNAME, TEXT_COLNAME
+from data_store import TEXT_COLUMNS, CallDataStore
+from navigation import ChunkNavigator
+from taxonomy import Taxonomy
+
+
+def chunk_text_html(text: str) -> str:
+    """
+    Build the HTML block showing the text of the chunk being annotated.
+
+    Args:
+        text (str): The chunk text.
+
+    Returns:
+        str: The HTML markup.
+    """
+    return f"<p style='text-align: justify; padding: 10px; border: 1px solid black; border-radius: 5px; background-color: #D8D8D8; -webkit-user-select: none; -moz-user-select: none; -ms-user-select: none; user-select: none;'>{text}</p>"
+
+
+class PreparedChunk(NamedTuple):
+    """Everything the annotator page shows for one chunk of the queue."""
+
+    texts: Dict[str, str]
+    chunk_html: str
+    default_intents: List[str]
+    default_subintents: List[str]
+    valid_subintents: List[str]
+    final_default_subintents: List[str]
+    taxonomy_version: str
+
+    def subintent_options(
+        self, intent_list: List[str], taxonomy: Taxonomy
+    ) -> Tuple[List[str], List[str]]:
+        """
+        Get the sub intent options and their defaults for the selected intents.
+
+        The prepared lists are reused while the selection is still the default
+        one, which is the case on every first render of a chunk, unless the
+        taxonomy changed since the chunk was prepared.
+
+        Args:
+            intent_list (List[str]): The selected intents.
+            taxonomy (Taxonomy): The intent taxonomy.
+
+        Returns:
+            Tuple[List[str], List[str]]: The valid sub intents and the default
+                sub intents among them.
+        """
+        if (
+            intent_list == self.default_intents
+            and taxonomy.version == self.taxonomy_version
+        ):
+            return self.valid_subintents, self.final_default_subintents
+
+        return taxonomy.subintent_options(intent_list, self.default_subintents)
+
+
+def prepare_chunk(
+    store: CallDataStore,
+    row: pd.Series,
+    get_defaults: Callable[[Optional[str]], List[str]],
+    taxonomy: Taxonomy,
+) -> PreparedChunk:
+    """
+    Read and compute what the annotator page shows for one chunk.
+
+    Must not call Streamlit, as it also runs on the prefetch threads.
+
+    Args:
+        store (CallDataStore): The call data.
+        row (pd.Series): The chunk's row of the annotator's queue.
+        get_defaults (Callable): Splits a stored label string into labels.
+        taxonomy (Taxonomy): The intent taxonomy.
+
+    Returns:
+        PreparedChunk: The chunk's texts, HTML and dropdown defaults.
+    """
+    texts = store.get_texts(int(row[ROW_IDX_COLNAME]), TEXT_COLUMNS)
+    default_intents = get_defaults(row[INTENT_COLNAME])
+    default_subintents = get_defaults(row[SUB_INTENT_COLNAME])
+    valid_subintents, final_default_subintents = taxonomy.subintent_options(
+        default_intents, default_subintents
+    )
+
+    return PreparedChunk(
+        texts=texts,
+        chunk_html=chunk_text_html(texts[TEXT_COLNAME]),
+        default_intents=default_intents,
+        default_subintents=default_subintents,
+        valid_subintents=valid_subintents,
+        final_default_subintents=final_default_subintents,
+        taxonomy_version=taxonomy.version,
+    )
+
+
+class ChunkPrefetcher:
+    """
+    Prepares the next pending chunks of an annotator's queue in the background.
+
+    While a chunk is on screen, the next `depth` pending chunks after it are
+    prepared on a shared thread pool, so moving forward only swaps in
+    content that is already computed. A chunk that isn't ready yet is
+    prepared on the spot. One prefetcher belongs to one session's queue.
+    """
+
+    def __init__(
+        self,
+        executor: Executor,
+        queue: pd.DataFrame,
+        prepare: Callable[[pd.Series], PreparedChunk],
+        depth: int,
+    ):
+        self._executor = executor
+        self._queue = queue
+        self._prepare = prepare
+        self._depth = depth
+        self._futures: Dict[int, Future] = {}
+        self._lock = threading.Lock()
+
+    def get(self, idx: int) -> PreparedChunk:
+        """
+        Get the prepared content of a position of the queue.
+
+        Args:
+            idx (int): Position in the queue.
+
+        Returns:
+            PreparedChunk: The chunk's prepared content.
+        """
+        with self._lock:
+            future = self._futures.get(idx)
+
+        if future is not None and not future.cancelled():
+            try:
+                return future.result()
+            except Exception as e:
+                logging.error(f"Prefetching chunk {idx} failed: {e}")
+                with self._lock:
+                    self._futures.pop(idx, None)
+
+        prepared = self._prepare(self._queue.iloc[idx])
+        done = Future()
+        done.set_result(prepared)
+        with self._lock:
+            self._futures[idx] = done
+        return prepared
+
+    def prefetch(self, navigator: ChunkNavigator, idx: int) -> None:
+        """
+        Prepare the pending chunks after a position and forget the others.
+
+        Args:
+            navigator (ChunkNavigator): The queue's navigator.
+            idx (int): The position on screen.
+
+        Returns:
+            None
+        """
+        try:
+            window = [idx] if idx in navigator else []
+            next_idx = idx
+            while len(window) < self._depth + 1 and idx in navigator:
+                next_idx = navigator.next(next_idx)
+                if next_idx == idx:
+                    break
+                window.append(next_idx)
+
+            with self._lock:
+                for position in list(self._futures):
+                    if position not in window:
+                        self._futures.pop(position).cancel()
+
+                for position in window:
+                    if position not in self._futures:
+                        self._futures[position] = self._executor.submit(
+                            self._prepare, self._queue.iloc[position]
+                        )
+
+        except Exception as e:
+            logging.error(f"An error occurred in 'ChunkPrefetcher.prefetch': {e}")
+            logging.error(traceback.format_exc())
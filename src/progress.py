@@ -0,0 +1,293 @@
+import logging
+import sqlite3
+import traceback
+from typing import Dict, Optional
+
+import pandas as pd
+
+from analytics import REVIEWER_ROLES
+from work_queue import ASSIGNMENT_TABLE
+
+_REVIEWER_ROLES_SQL = ", ".join(f"'{role}'" for role in REVIEWER_ROLES)
+_DAY_SQL = "date({}.created_at, 'unixepoch', 'localtime')"
+
+# Summary tables of the admin progress page. Triggers keep them up to date on
+# every insert into annotations / annotation_labels (whatever the write path)
+# and on every change of a chunk's reviewer in the assignment table, so the
+# page reads a few thousand aggregate rows however many annotations exist.
+#
+# progress_chunks holds whether a chunk has been annotated / reviewed at all,
+# so that only the first save of each counts towards progress_reviewers.
+# There, n_reviewed counts the chunks that are both annotated and reviewed;
+# n_annotated - n_reviewed are the reviews still pending. The single row of
+# progress_totals counts the annotated chunks of the assignment table
+# whatever their reviewer, i.e. the length of the admin's review queue.
+PROGRESS_TABLES = """
+CREATE TABLE IF NOT EXISTS progress_daily (
+    day TEXT NOT NULL,
+    username TEXT NOT NULL,
+    role TEXT NOT NULL,
+    n_annotations INTEGER NOT NULL,
+    PRIMARY KEY (day, username, role)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS progress_labels (
+    day TEXT NOT NULL,
+    username TEXT NOT NULL,
+    role TEXT NOT NULL,
+    label_id INTEGER NOT NULL,
+    n_annotations INTEGER NOT NULL,
+    PRIMARY KEY (day, username, role, label_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS progress_chunks (
+    call_id TEXT PRIMARY KEY,
+    annotated INTEGER NOT NULL DEFAULT 0,
+    reviewed INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS progress_reviewers (
+    reviewer TEXT PRIMARY KEY,
+    n_annotated INTEGER NOT NULL DEFAULT 0,
+    n_reviewed INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS progress_totals (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    n_annotated INTEGER NOT NULL DEFAULT 0
+);
+INSERT OR IGNORE INTO progress_totals (id) VALUES (0);
+"""
+
+_ADD_CHUNK_TO_REVIEWER = """
+    INSERT INTO progress_reviewers (reviewer, n_annotated, n_reviewed)
+    SELECT NEW.reviewer, 1, c.reviewed FROM progress_chunks AS c
+    WHERE c.call_id = NEW.call_id AND c.annotated AND NEW.reviewer IS NOT NULL
+    ON CONFLICT (reviewer) DO UPDATE SET
+        n_annotated = n_annotated + 1,
+        n_reviewed = n_reviewed + excluded.n_reviewed;
+"""
+
+_REMOVE_CHUNK_FROM_REVIEWER = """
+    UPDATE progress_reviewers SET
+        n_annotated = n_annotated - 1,
+        n_reviewed = n_reviewed - (
+            SELECT c.reviewed FROM progress_chunks AS c WHERE c.call_id = OLD.call_id
+        )
+    WHERE reviewer = OLD.reviewer AND EXISTS (
+        SELECT 1 FROM progress_chunks AS c WHERE c.call_id = OLD.call_id AND c.annotated
+    );
+"""
+
+_ADD_CHUNK_TO_TOTAL = """
+    UPDATE progress_totals SET n_annotated = n_annotated + 1
+    WHERE EXISTS (
+        SELECT 1 FROM progress_chunks AS c WHERE c.call_id = NEW.call_id AND c.annotated
+    );
+"""
+
+_REMOVE_CHUNK_FROM_TOTAL = """
+    UPDATE progress_totals SET n_annotated = n_annotated - 1
+    WHERE EXISTS (
+        SELECT 1 FROM progress_chunks AS c WHERE c.call_id = OLD.call_id AND c.annotated
+    );
+"""
+
+PROGRESS_TRIGGERS = f"""
+CREATE TRIGGER IF NOT EXISTS progress_annotation_insert
+AFTER INSERT ON annotations
+BEGIN
+    INSERT INTO progress_daily (day, username, role, n_annotations)
+    VALUES ({_DAY_SQL.format("NEW")}, ifnull(NEW.username, ''), ifnull(NEW.role, ''), 1)
+    ON CONFLICT (day, username, role) DO UPDATE SET n_annotations = n_annotations + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS progress_chunk_annotated
+AFTER INSERT ON annotations
+WHEN NEW.role = 'annotator' AND NOT EXISTS (
+    SELECT 1 FROM progress_chunks WHERE call_id = NEW.call_id AND annotated
+)
+BEGIN
+    INSERT INTO progress_reviewers (reviewer, n_annotated, n_reviewed)
+    SELECT a.reviewer, 1, ifnull((
+        SELECT c.reviewed FROM progress_chunks AS c WHERE c.call_id = NEW.call_id
+    ), 0)
+    FROM {ASSIGNMENT_TABLE} AS a
+    WHERE a.call_id = NEW.call_id AND a.reviewer IS NOT NULL
+    ON CONFLICT (reviewer) DO UPDATE SET
+        n_annotated = n_annotated + 1,
+        n_reviewed = n_reviewed + excluded.n_reviewed;
+    UPDATE progress_totals SET n_annotated = n_annotated + 1
+    WHERE EXISTS (SELECT 1 FROM {ASSIGNMENT_TABLE} AS a WHERE a.call_id = NEW.call_id);
+    INSERT INTO progress_chunks (call_id, annotated) VALUES (NEW.call_id, 1)
+    ON CONFLICT (call_id) DO UPDATE SET annotated = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS progress_chunk_reviewed
+AFTER INSERT ON annotations
+WHEN NEW.role IN ({_REVIEWER_ROLES_SQL}) AND NOT EXISTS (
+    SELECT 1 FROM progress_chunks WHERE call_id = NEW.call_id AND reviewed
+)
+BEGIN
+    UPDATE progress_reviewers SET n_reviewed = n_reviewed + 1
+    WHERE reviewer = (
+        SELECT a.reviewer FROM {ASSIGNMENT_TABLE} AS a WHERE a.call_id = NEW.call_id
+    ) AND EXISTS (
+        SELECT 1 FROM progress_chunks AS c WHERE c.call_id = NEW.call_id AND c.annotated
+    );
+    INSERT INTO progress_chunks (call_id, reviewed) VALUES (NEW.call_id, 1)
+    ON CONFLICT (call_id) DO UPDATE SET reviewed = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS progress_label_insert
+AFTER INSERT ON annotation_labels
+BEGIN
+    INSERT INTO progress_labels (day, username, role, label_id, n_annotations)
+    SELECT {_DAY_SQL.format("a")}, ifnull(a.username, ''), ifnull(a.role, ''),
+        NEW.label_id, 1
+    FROM annotations AS a WHERE a.annotation_id = NEW.annotation_id
+    ON CONFLICT (day, username, role, label_id) DO UPDATE SET
+        n_annotations = n_annotations + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS progress_assignment_insert
+AFTER INSERT ON {ASSIGNMENT_TABLE}
+BEGIN
+    {_ADD_CHUNK_TO_REVIEWER}
+    {_ADD_CHUNK_TO_TOTAL}
+END;
+
+CREATE TRIGGER IF NOT EXISTS progress_assignment_update
+AFTER UPDATE OF reviewer ON {ASSIGNMENT_TABLE}
+WHEN OLD.reviewer IS NOT NEW.reviewer
+BEGIN
+    {_REMOVE_CHUNK_FROM_REVIEWER}
+    {_ADD_CHUNK_TO_REVIEWER}
+END;
+
+CREATE TRIGGER IF NOT EXISTS progress_assignment_delete
+AFTER DELETE ON {ASSIGNMENT_TABLE}
+BEGIN
+    {_REMOVE_CHUNK_FROM_REVIEWER}
+    {_REMOVE_CHUNK_FROM_TOTAL}
+END;
+"""
+
+
+def rebuild_progress(conn: sqlite3.Connection) -> None:
+    """
+    Recompute the progress tables from the annotations and assignments.
+
+    The triggers keep the tables up to date afterwards; this is only needed
+    once for the existing rows, or to repair the tables. Runs in the caller's
+    transaction; nothing is committed here.
+
+    Args:
+        conn (sqlite3.Connection): Connection object to the database.
+
+    Returns:
+        None
+    """
+    try:
+        for table in [
+            "progress_daily",
+            "progress_labels",
+            "progress_chunks",
+            "progress_reviewers",
+            "progress_totals",
+        ]:
+            conn.execute(f"DELETE FROM {table}")
+
+        conn.execute(f"""
+            INSERT INTO progress_daily (day, username, role, n_annotations)
+            SELECT {_DAY_SQL.format("a")}, ifnull(a.username, ''), ifnull(a.role, ''),
+                COUNT(*)
+            FROM annotations AS a
+            GROUP BY 1, 2, 3
+            """)
+        conn.execute(f"""
+            INSERT INTO progress_labels (day, username, role, label_id, n_annotations)
+            SELECT {_DAY_SQL.format("a")}, ifnull(a.username, ''), ifnull(a.role, ''),
+                al.label_id, COUNT(*)
+            FROM annotation_labels AS al
+            JOIN annotations AS a ON a.annotation_id = al.annotation_id
+            GROUP BY 1, 2, 3, 4
+            """)
+        conn.execute(f"""
+            INSERT INTO progress_chunks (call_id, annotated, reviewed)
+            SELECT call_id, MAX(role = 'annotator'),
+                MAX(role IN ({_REVIEWER_ROLES_SQL}))
+            FROM annotations
+            GROUP BY call_id
+            """)
+        conn.execute(f"""
+            INSERT INTO progress_reviewers (reviewer, n_annotated, n_reviewed)
+            SELECT a.reviewer, COUNT(*), SUM(c.reviewed)
+            FROM progress_chunks AS c
+            JOIN {ASSIGNMENT_TABLE} AS a ON a.call_id = c.call_id
+            WHERE c.annotated AND a.reviewer IS NOT NULL
+            GROUP BY a.reviewer
+            """)
+        conn.execute(f"""
+            INSERT INTO progress_totals (id, n_annotated)
+            SELECT 0, COUNT(*)
+            FROM progress_chunks AS c
+            JOIN {ASSIGNMENT_TABLE} AS a ON a.call_id = c.call_id
+            WHERE c.annotated
+            """)
+
+    except Exception as e:
+        logging.error(f"An error occurred in 'rebuild_progress': {e}")
+        logging.error(traceback.format_exc())
+        raise
+
+
+def read_progress(
+    conn: sqlite3.Connection,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+) -> Dict[str, pd.DataFrame]:
+    """
+    Read the progress tables for the admin dashboard.
+
+    Only the summary tables are read: the day range is a seek on their
+    primary keys, and progress_reviewers has a row per reviewer.
+
+    Args:
+        conn (sqlite3.Connection): Connection object to the database.
+        start_date (str, optional): First day, "YYYY-mm-dd", inclusive.
+        end_date (str, optional): Last day, "YYYY-mm-dd", inclusive.
+
+    Returns:
+        Dict[str, pd.DataFrame]: "daily" (day, username, role, n_annotations),
+            "labels" (day, username, role, kind, name, n_annotations) and
+            "reviewers" (reviewer, n_annotated, n_reviewed, n_pending).
+    """
+    try:
+        params = {"start": start_date or "0000-00-00", "end": end_date or "9999-99-99"}
+        daily = pd.read_sql_query(
+            "SELECT day, username, role, n_annotations FROM progress_daily "
+            "WHERE day BETWEEN :start AND :end ORDER BY day, username, role",
+            conn,
+            params=params,
+        )
+        labels = pd.read_sql_query(
+            "SELECT p.day, p.username, p.role, l.kind, l.name, p.n_annotations "
+            "FROM progress_labels AS p JOIN labels AS l ON l.label_id = p.label_id "
+            "WHERE p.day BETWEEN :start AND :end "
+            "ORDER BY p.day, p.username, p.role, l.kind, l.name",
+            conn,
+            params=params,
+        )
+        reviewers = pd.read_sql_query(
+            "SELECT reviewer, n_annotated, n_reviewed, "
+            "n_annotated - n_reviewed AS n_pending "
+            "FROM progress_reviewers ORDER BY n_pending DESC, reviewer",
+            conn,
+        )
+        return {"daily": daily, "labels": labels, "reviewers": reviewers}
+
+    except Exception as e:
+        logging.error(f"An error occurred in 'read_progress': {e}")
+        logging.error(traceback.format_exc())
+        raise
@@ -1,45 +1,54 @@
+import os
+from datetime import date, timedelta
+
+import numpy as np
 import streamlit as st
 
+from analytics import REVIEWER_ROLES
+from annotation_schema import INTENT_LABEL, SUBINTENT_LABEL
+from config import GUIDELINES_PATH, ROW_IDX_COLNAME
+from export import EXPORT_FORMATS
 from helper_functions import *
+from tracing import traced
 
 
-def get_reviewer_page(conn, cursor):
+@traced(ends_rerun=True)
+def get_reviewer_page(pool):
     st.markdown(
         "<h1 style='text-align: center;'>Sunlife Annotation Tool</h1>",
         unsafe_allow_html=True,
     )
 
     display_name_and_role()
+    show_save_error()
 
-    data, intents, mapping = read_dataframes()
-    all_intents = get_all_intent_options(intent_df=intents)
-    all_subintents = get_all_subintent_options(intent_df=intents)
-
-    already_annotated_df = read_annotated_data(_conn=conn)
+    data, _, mapping = read_dataframes()
+    taxonomy = get_taxonomy()
+    init_work_queue(_pool=pool, _call_data=data, _user_call_mapping=mapping)
 
-    # this can be some chunk of a call too...not necessarily the starting from a new call
-    review_call_ids = get_call_ids_to_be_reviewed(
-        call_data=data,
-        user_call_mapping=mapping,
-        annot_data=already_annotated_df,
-        rev_username=st.session_state.get("name"),
+    # only a window of the queue around the current chunk is read, by key
+    reviewer = get_review_queue_owner()
+    window, current, n_chunks = get_review_window(
+        pool, reviewer, st.session_state.get("review_key")
     )
 
-    # st.write(annot_data)
-    # st.write(review_call_ids)
-
-    if review_call_ids.empty:
+    if window.empty:
         st.success("You don't have any texts to review!")
         st.balloons()
     else:
-        if "current_idx" not in st.session_state:
-            st.session_state["current_idx"] = 0
-            st.session_state["n_chunks"] = review_call_ids.shape[0]
-            st.session_state["annotated_idx"] = set()
-
-        current_row = review_call_ids.iloc[st.session_state["current_idx"]]
+        current_row = get_review_row(pool, window.iloc[current])
         current_conn_id = current_row[CONN_ID_COLNAME]
-        current_chunk_id = current_row[CHUNK_ID_COLNAME]
+        current_chunk_id = int(current_row[CHUNK_ID_COLNAME])
+        st.session_state["review_key"] = (current_conn_id, current_chunk_id)
+
+        # Previous stops at the start of the queue, Next wraps around to it
+        previous_key = next_key = None
+        if current > 0:
+            previous = window.iloc[current - 1]
+            previous_key = (previous[CONN_ID_COLNAME], int(previous[CHUNK_ID_COLNAME]))
+        if current + 1 < len(window):
+            following = window.iloc[current + 1]
+            next_key = (following[CONN_ID_COLNAME], int(following[CHUNK_ID_COLNAME]))
 
         if "conn_id_select" in st.session_state:
             st.session_state["conn_id_select"] = current_conn_id
@@ -47,14 +56,12 @@ def get_reviewer_page(conn, cursor):
         if "chunk_id_select" in st.session_state:
             st.session_state["chunk_id_select"] = current_chunk_id
 
-        conn_id_list = review_call_ids[CONN_ID_COLNAME].unique().tolist()
-        chunk_id_list = (
-            review_call_ids[review_call_ids[CONN_ID_COLNAME] == current_conn_id][
-                CHUNK_ID_COLNAME
-            ]
-            .unique()
-            .tolist()
-        )
+        # the search box has to be read before the options are computed
+        _, pcol1, pcol2, _ = st.columns([1, 2, 2, 1])
+        pcol1.text_input("Search Connection ID", key="conn_id_search")
+        pcol2.metric("Chunks to review", n_chunks)
+        conn_id_list = get_call_picker_options(pool, reviewer, current_conn_id)
+        chunk_id_list = get_review_chunk_ids(pool, reviewer, current_conn_id)
 
         _, fcol1, fcol2, _ = st.columns([1, 2, 2, 1])
         fcol1.selectbox(
@@ -62,20 +69,24 @@ def get_reviewer_page(conn, cursor):
             options=conn_id_list,
             key="conn_id_select",
             on_change=reviewer_select_connid,
-            args=(review_call_ids,),
         )
         fcol2.selectbox(
             "Chunk ID",
             options=chunk_id_list,
             key="chunk_id_select",
             on_change=reviewer_select_chunkid,
-            args=(review_call_ids,),
         )
 
+        if current_row[ROW_IDX_COLNAME] < 0:
+            # a batch this process hasn't loaded yet
+            texts = {TEXT_COLNAME: "", FULL_TEXT_COLNAME: ""}
+        else:
+            texts = get_chunk_texts(row_idx=current_row[ROW_IDX_COLNAME])
+
         with st.expander(
             label=f"Expand to see full conversation (ConnectionID: {current_conn_id})"
         ):
-            full_text = current_row[FULL_TEXT_COLNAME]
+            full_text = texts[FULL_TEXT_COLNAME]
             st.text(full_text)
 
             st.markdown(
@@ -98,7 +109,7 @@ def get_reviewer_page(conn, cursor):
         # Text display
         _, chunk_col, _ = st.columns([1, 2, 1])
         chunk_col.markdown(
-            f"<p style='text-align: justify; padding: 10px; border: 1px solid black; border-radius: 5px; background-color: #D8D8D8; -webkit-user-select: none; -moz-user-select: none; -ms-user-select: none; user-select: none;'>{current_row[TEXT_COLNAME]}</p>",
+            f"<p style='text-align: justify; padding: 10px; border: 1px solid black; border-radius: 5px; background-color: #D8D8D8; -webkit-user-select: none; -moz-user-select: none; -ms-user-select: none; user-select: none;'>{texts[TEXT_COLNAME]}</p>",
             unsafe_allow_html=True,
         )
         # st.write(f"ConnectionID: {current_conn_id} ChunkID: {current_row[CHUNK_ID_COLNAME]}", )
@@ -109,7 +120,7 @@ def get_reviewer_page(conn, cursor):
         display_annotation_details(current_row=current_row)
 
         review_status, reviewed_df = get_already_reviewed_calls(
-            _conn=conn, connection_id=current_conn_id, chunk_id=current_chunk_id
+            pool=pool, connection_id=current_conn_id, chunk_id=current_chunk_id
         )
 
         _, scol, _ = st.columns([1, 2, 1])
@@ -128,15 +139,11 @@ def get_reviewer_page(conn, cursor):
         # default_intents = get_default_options(current_row["case_type"])
         intent_list = scol1.multiselect(
             label="Intent",
-            options=all_intents,
+            options=taxonomy.intents,
             default=default_intents,
             key=f"intent_dropdown_{current_row['new_id']}",
         )
 
-        valid_subintents = get_valid_subintent_options(
-            intent_list=intent_list, subintent_map=all_subintents
-        )
-
         if review_status == "Pending":
             default_subintents = get_default_options(current_row["subcase_type"])
             conf_idx = 0
@@ -157,8 +164,8 @@ def get_reviewer_page(conn, cursor):
 
             reviewer_comments = reviewed_df.iloc[0]["comments"]
 
-        final_default_subintents = list(
-            set(valid_subintents).intersection(set(default_subintents))
+        valid_subintents, final_default_subintents = taxonomy.subintent_options(
+            intent_list, default_subintents
         )
 
         # st.write(f"Valid Subintents: {valid_subintents} || Default Subintents: {default_subintents} Final Default: {final_default_subintents}")
@@ -199,24 +206,28 @@ def get_reviewer_page(conn, cursor):
         st.title("")
         _, bcol1, bcol2, bcol3, _ = st.columns([1.5, 1, 1, 1, 1])
 
-        if st.session_state["current_idx"] > 0:
-            bcol1.button("Previous", on_click=previous_button_clicked_reviewer)
+        if previous_key is not None:
+            bcol1.button(
+                "Previous",
+                on_click=previous_button_clicked_reviewer,
+                args=(previous_key,),
+            )
 
         # if done with all the chunks for the user, don't show the save and next button
         # if st.session_state["current_idx"] + 1 < len(call_ids):
-        bcol2.button("Next", on_click=next_button_clicked_reviewer)
+        bcol2.button("Next", on_click=next_button_clicked_reviewer, args=(next_key,))
 
         bcol3.button(
             "Save and Next",
             on_click=save_next_button_clicked_reviewer,
             args=(
-                conn,
-                cursor,
+                pool,
                 current_row["new_id"],
                 intent_list,
                 subintent_list,
                 confidence_level,
                 reviewer_comments,
+                next_key,
             ),
         )
 
@@ -227,5 +238,209 @@ def get_reviewer_page(conn, cursor):
         #     st.write(df)
         st.divider()
 
-        with st.expander(label="Guidelines to use the dashboard"):
-            show_pdf(file_path="../sample.pdf")
+        show_guidelines(file_path=GUIDELINES_PATH)
+
+
+@traced(ends_rerun=True)
+def get_progress_page(pool):
+    st.markdown(
+        "<h1 style='text-align: center;'>Annotation Progress</h1>",
+        unsafe_allow_html=True,
+    )
+
+    display_name_and_role()
+
+    _, dcol, rcol, _ = st.columns([1, 2, 2, 1])
+    today = date.today()
+    dates = dcol.date_input("Date range", value=[today - timedelta(days=6), today])
+    if rcol.button("Refresh"):
+        get_progress_report.clear()
+
+    # only the summary tables kept up to date by the database triggers are read
+    report = get_progress_report(
+        pool,
+        start_date=str(dates[0]) if len(dates) > 0 else None,
+        end_date=str(dates[-1]) if len(dates) > 0 else None,
+    )
+    daily, labels, reviewers = report["daily"], report["labels"], report["reviewers"]
+
+    is_review = daily["role"].isin(REVIEWER_ROLES)
+    _, mcol1, mcol2, mcol3, _ = st.columns([1, 1, 1, 1, 1])
+    mcol1.metric("Annotations", int(daily.loc[~is_review, "n_annotations"].sum()))
+    mcol2.metric("Reviews", int(daily.loc[is_review, "n_annotations"].sum()))
+    mcol3.metric("Pending reviews", int(reviewers["n_pending"].sum()))
+
+    tabs = st.tabs(
+        [
+            "Annotators per day",
+            "Reviewers per day",
+            "Pending reviews",
+            "Per intent",
+            "Per sub intent",
+        ]
+    )
+    for tab, rows in [(tabs[0], daily[~is_review]), (tabs[1], daily[is_review])]:
+        if rows.empty:
+            tab.info("No annotations in this date range.")
+            continue
+        tab.dataframe(
+            rows.pivot_table(
+                index="username",
+                columns="day",
+                values="n_annotations",
+                aggfunc="sum",
+                fill_value=0,
+            ),
+            use_container_width=True,
+        )
+
+    tabs[2].caption("Chunks annotated, of those reviewed, and still to review.")
+    tabs[2].dataframe(reviewers, use_container_width=True)
+
+    for tab, kind in [(tabs[3], INTENT_LABEL), (tabs[4], SUBINTENT_LABEL)]:
+        rows = labels[labels["kind"] == kind]
+        if rows.empty:
+            tab.info("No annotations in this date range.")
+            continue
+        tab.dataframe(
+            rows.pivot_table(
+                index="name",
+                columns="role",
+                values="n_annotations",
+                aggfunc="sum",
+                fill_value=0,
+            ),
+            use_container_width=True,
+        )
+
+
+@traced(ends_rerun=True)
+def get_agreement_page(pool):
+    st.markdown(
+        "<h1 style='text-align: center;'>Annotation Agreement</h1>",
+        unsafe_allow_html=True,
+    )
+
+    display_name_and_role()
+
+    _, intents, _ = read_dataframes()
+
+    _, kcol, rcol, _ = st.columns([1, 2, 2, 1])
+    kind = kcol.radio(
+        "Labels",
+        options=[INTENT_LABEL, SUBINTENT_LABEL],
+        format_func=lambda k: "Intent" if k == INTENT_LABEL else "Sub Intent",
+        horizontal=True,
+    )
+    if rcol.button("Recompute"):
+        get_agreement_report.clear()
+
+    report = get_agreement_report(pool, intents, kind)
+
+    cohen = report["cohen_kappa"]
+    if cohen.empty:
+        st.info("No chunk has been both annotated and reviewed yet.")
+        return
+
+    _, mcol1, mcol2, mcol3, _ = st.columns([1, 1, 1, 1, 1])
+    mcol1.metric("Reviewed chunks", int(cohen["n_chunks"].sum()))
+    mcol2.metric(
+        "Mean Cohen's kappa",
+        f"{np.average(cohen['kappa'].fillna(0), weights=cohen['n_chunks']):.3f}",
+    )
+    mcol3.metric("Mean Fleiss' kappa", f"{report['fleiss_kappa']['kappa'].mean():.3f}")
+
+    tabs = st.tabs(
+        ["Per label", "Per annotator", "Cohen's kappa", "Fleiss' kappa", "Confusion"]
+    )
+    tabs[0].dataframe(report["label_scores"], use_container_width=True)
+    tabs[1].dataframe(report["annotator_scores"], use_container_width=True)
+    tabs[2].dataframe(cohen, use_container_width=True)
+    tabs[3].dataframe(report["fleiss_kappa"], use_container_width=True)
+    tabs[4].caption("Rows: annotator labels, columns: reviewer labels.")
+    tabs[4].dataframe(report["confusion_matrix"], use_container_width=True)
+
+
+@traced(ends_rerun=True)
+def get_export_page(pool):
+    st.markdown(
+        "<h1 style='text-align: center;'>Export Annotations</h1>",
+        unsafe_allow_html=True,
+    )
+
+    display_name_and_role()
+
+    _, fcol1, fcol2, _ = st.columns([1, 2, 2, 1])
+    fmt = fcol1.selectbox("Format", options=EXPORT_FORMATS)
+    role = fcol2.selectbox("Role", options=["All", "annotator", "reviewer", "admin"])
+
+    _, fcol3, fcol4, _ = st.columns([1, 2, 2, 1])
+    username = fcol3.text_input("Username")
+    dates = fcol4.date_input("Date range", value=[])
+
+    _, ccol, bcol, _ = st.columns([1, 2, 2, 1])
+    latest_only = ccol.checkbox("Only the latest annotation of every user on a chunk")
+
+    if bcol.button("Prepare export"):
+        path, n_rows = export_annotations_to_file(
+            pool,
+            fmt,
+            start_date=dates[0] if len(dates) > 0 else None,
+            end_date=dates[-1] if len(dates) > 0 else None,
+            role=None if role == "All" else role,
+            username=username or None,
+            latest_only=latest_only,
+        )
+        st.session_state["export_file"] = (path, n_rows)
+
+    if "export_file" in st.session_state:
+        path, n_rows = st.session_state["export_file"]
+        _, dcol, _ = st.columns([1, 2, 1])
+        dcol.success(f"Exported {n_rows} annotations.")
+        with open(path, "rb") as f:
+            dcol.download_button("Download", data=f, file_name=os.path.basename(path))
+
+
+TRACE_WINDOWS = {
+    "Last 15 minutes": 15 * 60,
+    "Last hour": 3600,
+    "Last 24 hours": 24 * 3600,
+    "Last 7 days": 7 * 24 * 3600,
+}
+
+
+@traced(ends_rerun=True)
+def get_performance_page(pool):
+    st.markdown(
+        "<h1 style='text-align: center;'>Performance</h1>",
+        unsafe_allow_html=True,
+    )
+
+    display_name_and_role()
+
+    _, wcol, rcol, _ = st.columns([1, 2, 2, 1])
+    window = wcol.selectbox("Time window", options=list(TRACE_WINDOWS))
+    if rcol.button("Refresh"):
+        get_trace_summary.clear()
+
+    summary, reruns = get_trace_summary(TRACE_WINDOWS[window])
+    if summary.empty:
+        st.info("No timings were recorded in this time window.")
+        return
+
+    _, mcol1, mcol2, mcol3, mcol4, _ = st.columns([1, 1, 1, 1, 1, 1])
+    mcol1.metric("Reruns", len(reruns))
+    for col, q in zip([mcol2, mcol3, mcol4], [50, 95, 99]):
+        value = f"{np.percentile(reruns, q):.0f} ms" if len(reruns) else "-"
+        col.metric(f"Rerun p{q}", value)
+
+    st.caption(
+        "Durations per function call, slowest p95 first. Rows is the median "
+        "row count of the results; the cache hit rate is for cached functions."
+    )
+    st.dataframe(
+        summary.round(
+            {"p50_ms": 1, "p95_ms": 1, "p99_ms": 1, "max_ms": 1, "cache_hit_rate": 2}
+        ),
+        use_container_width=True,
+    )
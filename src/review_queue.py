@@ -0,0 +1,300 @@
+import logging
+import sqlite3
+import traceback
+from typing import List, Optional, Tuple
+
+import pandas as pd
+
+from config import CHUNK_ID_COLNAME, CONN_ID_COLNAME
+from work_queue import ASSIGNMENT_TABLE
+
+REVIEW_QUEUE_TABLE = "review_queue"
+
+# The chunks an annotator has annotated, with their assignment, in the
+# (connection_id, chunk_id) order the reviewers work through them. Triggers
+# add a chunk on its first annotator save (or when it is assigned after
+# that) and follow changes of its assignment, so the reviewer page reads a
+# window of its queue with a seek on the primary key or the reviewer index
+# instead of joining the call data with every annotation. The number of
+# chunks in a reviewer's queue is n_annotated in progress_reviewers, and in
+# the whole queue n_annotated in progress_totals.
+REVIEW_QUEUE_TABLES = f"""
+CREATE TABLE IF NOT EXISTS {REVIEW_QUEUE_TABLE} (
+    connection_id TEXT NOT NULL,
+    chunk_id INTEGER NOT NULL,
+    call_id TEXT NOT NULL UNIQUE,
+    annotator TEXT,
+    reviewer TEXT,
+    PRIMARY KEY (connection_id, chunk_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_review_queue_reviewer
+    ON {REVIEW_QUEUE_TABLE} (reviewer, connection_id, chunk_id, call_id, annotator);
+"""
+
+REVIEW_QUEUE_TRIGGERS = f"""
+CREATE TRIGGER IF NOT EXISTS review_queue_annotation_insert
+AFTER INSERT ON annotations
+WHEN NEW.role = 'annotator'
+BEGIN
+    INSERT OR IGNORE INTO {REVIEW_QUEUE_TABLE}
+        (connection_id, chunk_id, call_id, annotator, reviewer)
+    SELECT a.connection_id, a.chunk_id, a.call_id, a.annotator, a.reviewer
+    FROM {ASSIGNMENT_TABLE} AS a WHERE a.call_id = NEW.call_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS review_queue_assignment_insert
+AFTER INSERT ON {ASSIGNMENT_TABLE}
+WHEN EXISTS (
+    SELECT 1 FROM annotations WHERE role = 'annotator' AND call_id = NEW.call_id
+)
+BEGIN
+    INSERT OR IGNORE INTO {REVIEW_QUEUE_TABLE}
+        (connection_id, chunk_id, call_id, annotator, reviewer)
+    VALUES (NEW.connection_id, NEW.chunk_id, NEW.call_id, NEW.annotator, NEW.reviewer);
+END;
+
+CREATE TRIGGER IF NOT EXISTS review_queue_assignment_update
+AFTER UPDATE OF annotator, reviewer ON {ASSIGNMENT_TABLE}
+BEGIN
+    UPDATE {REVIEW_QUEUE_TABLE} SET annotator = NEW.annotator, reviewer = NEW.reviewer
+    WHERE call_id = NEW.call_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS review_queue_assignment_delete
+AFTER DELETE ON {ASSIGNMENT_TABLE}
+BEGIN
+    DELETE FROM {REVIEW_QUEUE_TABLE} WHERE call_id = OLD.call_id;
+END;
+"""
+
+_WINDOW_COLUMNS = ["connection_id", "chunk_id", "call_id", "annotator"]
+
+
+def _reviewer_filter(reviewer: Optional[str]) -> str:
+    # None is the whole queue, for the admin
+    return "reviewer = :reviewer AND" if reviewer is not None else ""
+
+
+def rebuild_review_queue(conn: sqlite3.Connection) -> None:
+    """
+    Recompute the review queue from the annotations and assignments.
+
+    The triggers keep the table up to date afterwards; this is only needed
+    once for the existing rows, or to repair the table. Runs in the caller's
+    transaction; nothing is committed here.
+
+    Args:
+        conn (sqlite3.Connection): Connection object to the database.
+
+    Returns:
+        None
+    """
+    try:
+        conn.execute(f"DELETE FROM {REVIEW_QUEUE_TABLE}")
+        conn.execute(f"""
+            INSERT INTO {REVIEW_QUEUE_TABLE}
+                (connection_id, chunk_id, call_id, annotator, reviewer)
+            SELECT a.connection_id, a.chunk_id, a.call_id, a.annotator, a.reviewer
+            FROM {ASSIGNMENT_TABLE} AS a
+            WHERE EXISTS (
+                SELECT 1 FROM annotations AS n
+                WHERE n.role = 'annotator' AND n.call_id = a.call_id
+            )
+            """)
+
+    except Exception as e:
+        logging.error(f"An error occurred in 'rebuild_review_queue': {e}")
+        logging.error(traceback.format_exc())
+        raise
+
+
+def count_review_queue(conn: sqlite3.Connection, reviewer: Optional[str]) -> int:
+    """
+    Count the chunks in a reviewer's queue.
+
+    A single row is read: the reviewer's from progress_reviewers, or for the
+    whole queue the one of progress_totals, which the progress triggers keep
+    up to date.
+
+    Args:
+        conn (sqlite3.Connection): Connection object to the database.
+        reviewer (str, optional): The reviewer; None for the whole queue.
+
+    Returns:
+        int: The number of annotated chunks to review.
+    """
+    try:
+        if reviewer is None:
+            query, params = "SELECT n_annotated FROM progress_totals", ()
+        else:
+            query = "SELECT n_annotated FROM progress_reviewers WHERE reviewer = ?"
+            params = (reviewer,)
+        row = conn.execute(query, params).fetchone()
+        return row[0] if row else 0
+
+    except Exception as e:
+        logging.error(f"An error occurred in 'count_review_queue': {e}")
+        logging.error(traceback.format_exc())
+        raise
+
+
+def read_review_window(
+    conn: sqlite3.Connection,
+    reviewer: Optional[str],
+    key: Optional[Tuple[str, Optional[int]]],
+    size: int,
+) -> Tuple[pd.DataFrame, int]:
+    """
+    Read the chunks of a reviewer's queue around a position.
+
+    Keyset pagination on (connection_id, chunk_id): up to `size` chunks
+    before the key and the chunk at or after it with up to `size` chunks
+    after it are read with two seeks on the index, so the cost depends on
+    `size` and not on the length of the queue. Past the end of the queue
+    the window wraps around to its start.
+
+    Args:
+        conn (sqlite3.Connection): Connection object to the database.
+        reviewer (str, optional): The reviewer; None for the whole queue.
+        key (Tuple[str, Optional[int]], optional): (ConnectionID, chunk_id)
+            of the current chunk; a None chunk_id is the first chunk of the
+            call and a None key the start of the queue.
+        size (int): Number of chunks to read on each side of the current one.
+
+    Returns:
+        Tuple[pd.DataFrame, int]: The chunks (ConnectionID, chunk_id, call_id,
+            annotator) in queue order and the position of the current chunk
+            among them; the frame is empty when the queue is.
+    """
+    try:
+        reviewer_filter = _reviewer_filter(reviewer)
+        if key is None:
+            conn_id, chunk_id = "", None
+        else:
+            conn_id, chunk_id = key
+        # the smallest integer sqlite stores, before any chunk_id
+        params = {
+            "reviewer": reviewer,
+            "conn_id": conn_id,
+            "chunk_id": -(2**63) if chunk_id is None else int(chunk_id),
+            "size": size,
+        }
+        columns = ", ".join(_WINDOW_COLUMNS)
+
+        before = conn.execute(
+            f"SELECT {columns} FROM {REVIEW_QUEUE_TABLE} "
+            f"WHERE {reviewer_filter} "
+            "(connection_id, chunk_id) < (:conn_id, :chunk_id) "
+            "ORDER BY connection_id DESC, chunk_id DESC LIMIT :size",
+            params,
+        ).fetchall()
+        after = conn.execute(
+            f"SELECT {columns} FROM {REVIEW_QUEUE_TABLE} "
+            f"WHERE {reviewer_filter} "
+            "(connection_id, chunk_id) >= (:conn_id, :chunk_id) "
+            "ORDER BY connection_id, chunk_id LIMIT :size + 1",
+            params,
+        ).fetchall()
+
+        if not after and before:
+            return read_review_window(conn, reviewer, None, size)
+
+        window = pd.DataFrame(before[::-1] + after, columns=_WINDOW_COLUMNS).rename(
+            columns={"connection_id": CONN_ID_COLNAME, "chunk_id": CHUNK_ID_COLNAME}
+        )
+        return window, len(before)
+
+    except Exception as e:
+        logging.error(f"An error occurred in 'read_review_window': {e}")
+        logging.error(traceback.format_exc())
+        raise
+
+
+def list_review_calls(
+    conn: sqlite3.Connection,
+    reviewer: Optional[str],
+    prefix: str = "",
+    around: Optional[str] = None,
+    limit: int = 50,
+) -> List[str]:
+    """
+    List the ConnectionIDs of a reviewer's queue, a page at a time.
+
+    With `around`, the calls before and after that call; otherwise the first
+    calls starting with `prefix`. Either way a range seek on the index that
+    stops after `limit` calls.
+
+    Args:
+        conn (sqlite3.Connection): Connection object to the database.
+        reviewer (str, optional): The reviewer; None for the whole queue.
+        prefix (str): Prefix the ConnectionIDs start with.
+        around (str, optional): ConnectionID to center the page on.
+        limit (int): Maximum number of ConnectionIDs.
+
+    Returns:
+        List[str]: The ConnectionIDs, sorted.
+    """
+    try:
+        reviewer_filter = _reviewer_filter(reviewer)
+        params = {"reviewer": reviewer, "limit": limit}
+
+        if around is not None:
+            params.update(conn_id=around, n_before=limit // 2)
+            before = conn.execute(
+                f"SELECT DISTINCT connection_id FROM {REVIEW_QUEUE_TABLE} "
+                f"WHERE {reviewer_filter} connection_id < :conn_id "
+                "ORDER BY connection_id DESC LIMIT :n_before",
+                params,
+            ).fetchall()
+            after = conn.execute(
+                f"SELECT DISTINCT connection_id FROM {REVIEW_QUEUE_TABLE} "
+                f"WHERE {reviewer_filter} connection_id >= :conn_id "
+                "ORDER BY connection_id LIMIT :limit - :n_before",
+                params,
+            ).fetchall()
+            rows = before[::-1] + after
+        else:
+            params.update(start=prefix, end=prefix + "\U0010ffff")
+            rows = conn.execute(
+                f"SELECT DISTINCT connection_id FROM {REVIEW_QUEUE_TABLE} "
+                f"WHERE {reviewer_filter} "
+                "connection_id >= :start AND connection_id < :end "
+                "ORDER BY connection_id LIMIT :limit",
+                params,
+            ).fetchall()
+
+        return [row[0] for row in rows]
+
+    except Exception as e:
+        logging.error(f"An error occurred in 'list_review_calls': {e}")
+        logging.error(traceback.format_exc())
+        raise
+
+
+def list_review_chunks(
+    conn: sqlite3.Connection, reviewer: Optional[str], connection_id: str
+) -> List[int]:
+    """
+    List the chunk IDs of a call in a reviewer's queue.
+
+    Args:
+        conn (sqlite3.Connection): Connection object to the database.
+        reviewer (str, optional): The reviewer; None for the whole queue.
+        connection_id (str): Connection ID.
+
+    Returns:
+        List[int]: The chunk IDs, sorted.
+    """
+    try:
+        rows = conn.execute(
+            f"SELECT chunk_id FROM {REVIEW_QUEUE_TABLE} "
+            f"WHERE {_reviewer_filter(reviewer)} connection_id = :conn_id "
+            "ORDER BY chunk_id",
+            {"reviewer": reviewer, "conn_id": connection_id},
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    except Exception as e:
+        logging.error(f"An error occurred in 'list_review_chunks': {e}")
+        logging.error(traceback.format_exc())
+        raise
@@ -0,0 +1,208 @@
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+import traceback
+from typing import Optional, Tuple
+
+import pandas as pd
+import pyarrow as pa
+
+from config import (
+    DB_PATH,
+    INTENT_COLNAME,
+    SHARED_CACHE_DIR,
+    SHARED_CACHE_POLL_S,
+    SUB_INTENT_COLNAME,
+)
+
+MANIFEST_FILE = "current.json"
+
+# Label columns repeat a few values across all chunks; they are stored
+# dictionary-encoded and come back as categoricals
+_DICTIONARY_COLUMNS = [INTENT_COLNAME, SUB_INTENT_COLNAME]
+
+# Strings stay in the mapped Arrow buffers instead of becoming Python objects
+_STRING_TYPES = {
+    pa.string(): pd.StringDtype("pyarrow"),
+    pa.large_string(): pd.StringDtype("pyarrow"),
+}
+
+
+def _write_table(path: str, table: pa.Table) -> None:
+    tmp_path = f"{path}.tmp"
+    with pa.OSFile(tmp_path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+
+
+def _map_table(path: str) -> pd.DataFrame:
+    # the buffers keep the mapping alive; nothing is read until it is used
+    table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+    return table.to_pandas(split_blocks=True, types_mapper=_STRING_TYPES.get)
+
+
+def publish_call_data(
+    directory: str, data: pd.DataFrame, mapping: pd.DataFrame, batch_id: int
+) -> str:
+    """
+    Write the call data and mapping frames for the app's processes to map.
+
+    Both frames are written as uncompressed Arrow IPC files under a new
+    version stamp, then the manifest is replaced to point at them, so a
+    reader sees either the previous or the new version as a whole. Files of
+    older versions are removed; processes that still map them keep their
+    pages until they move to the new version.
+
+    Args:
+        directory (str): Directory of the cache, ideally on a tmpfs (/dev/shm).
+        data (pd.DataFrame): The queue columns of the call data.
+        mapping (pd.DataFrame): The user-call mapping.
+        batch_id (int): batch_id of the last ingested batch in the frames.
+
+    Returns:
+        str: The version stamp of the published frames.
+    """
+    try:
+        os.makedirs(directory, exist_ok=True)
+        version = f"{batch_id}-{time.time_ns():x}"
+        files = {"data": f"data-{version}.arrow", "mapping": f"mapping-{version}.arrow"}
+
+        table = pa.Table.from_pandas(data, preserve_index=False)
+        for column in _DICTIONARY_COLUMNS:
+            if column in table.column_names:
+                i = table.column_names.index(column)
+                table = table.set_column(
+                    i, column, table.column(i).dictionary_encode()
+                )
+        _write_table(os.path.join(directory, files["data"]), table)
+        _write_table(
+            os.path.join(directory, files["mapping"]),
+            pa.Table.from_pandas(mapping, preserve_index=False),
+        )
+
+        manifest = dict(files, version=version, batch_id=batch_id)
+        manifest_path = os.path.join(directory, MANIFEST_FILE)
+        with open(f"{manifest_path}.tmp", "w") as f:
+            json.dump(manifest, f)
+        os.replace(f"{manifest_path}.tmp", manifest_path)
+
+        for name in os.listdir(directory):
+            if name.endswith(".arrow") and name not in files.values():
+                os.remove(os.path.join(directory, name))
+
+        logging.info(f"Published call data {version}: {len(data)} chunks.")
+        return version
+
+    except Exception as e:
+        logging.error(f"An error occurred in 'publish_call_data': {e}")
+        logging.error(traceback.format_exc())
+        raise
+
+
+class SharedCallData:
+    """
+    The call data and mapping published by the loader, mapped zero-copy.
+
+    The Arrow files live in shared memory and are mapped read-only, so the
+    queue frames take the same memory however many app processes use them.
+    Each snapshot stats the manifest; when the loader published a new
+    version, its files are mapped and replace the current frames in a single
+    assignment. The frames are read-only and must not be modified.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._manifest_path = os.path.join(directory, MANIFEST_FILE)
+        self._lock = threading.Lock()
+        self._stat: Optional[Tuple[int, int, int]] = None
+        self._current: Optional[Tuple[str, int, pd.DataFrame, pd.DataFrame]] = None
+        self._reload()
+
+    @property
+    def version(self) -> str:
+        """Version stamp of the mapped frames."""
+        return self._current[0]
+
+    def snapshot(self) -> Tuple[int, pd.DataFrame, pd.DataFrame]:
+        """
+        Get the latest published call data and mapping.
+
+        Returns:
+            Tuple[int, pd.DataFrame, pd.DataFrame]: The batch_id of the last
+                batch in the frames and the (data, mapping) frames.
+        """
+        stat = os.stat(self._manifest_path)
+        if (stat.st_ino, stat.st_mtime_ns, stat.st_size) != self._stat:
+            with self._lock:
+                self._reload()
+        _, batch_id, data, mapping = self._current
+        return batch_id, data, mapping
+
+    def _reload(self) -> None:
+        # callers hold the lock, except the constructor
+        try:
+            stat = os.stat(self._manifest_path)
+            key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            if key == self._stat:
+                return
+            with open(self._manifest_path) as f:
+                manifest = json.load(f)
+            if self._current is None or manifest["version"] != self._current[0]:
+                data = _map_table(os.path.join(self.directory, manifest["data"]))
+                mapping = _map_table(os.path.join(self.directory, manifest["mapping"]))
+                version = manifest["version"]
+                self._current = (version, manifest["batch_id"], data, mapping)
+                logging.info(f"Mapped the shared call data {version}.")
+            self._stat = key
+
+        except Exception as e:
+            if self._current is None:
+                logging.error(
+                    f"No call data published in {self.directory}; "
+                    "start shared_cache.py first."
+                )
+                raise
+            # e.g. a newer version replaced the files between the two reads
+            logging.error(f"Keeping the shared call data {self._current[0]}: {e}")
+            logging.error(traceback.format_exc())
+
+
+if __name__ == "__main__":
+    from db_pool import ConnectionPool
+    from ingest import CallDataCatalog
+    from migrations import apply_migrations
+
+    parser = argparse.ArgumentParser(
+        description="Publish the call data for the app's processes to share."
+    )
+    parser.add_argument(
+        "--dir", default=SHARED_CACHE_DIR, required=not SHARED_CACHE_DIR
+    )
+    parser.add_argument("--db", default=DB_PATH, help="Path to the SQLite database.")
+    parser.add_argument(
+        "--poll",
+        type=float,
+        default=SHARED_CACHE_POLL_S,
+        help="Seconds between checks for new batches; 0 publishes once and exits.",
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    pool = ConnectionPool(args.db)
+    with pool.writer_connection() as conn:
+        apply_migrations(conn)
+    catalog = CallDataCatalog(pool)
+    published = None
+    while True:
+        data, mapping = catalog.snapshot()
+        if catalog.version != published:
+            publish_call_data(args.dir, data, mapping, catalog.version)
+            published = catalog.version
+        if args.poll <= 0:
+            break
+        time.sleep(args.poll)
+    pool.close()
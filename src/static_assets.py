@@ -0,0 +1,207 @@
+import errno
+import hashlib
+import logging
+import os
+import shutil
+import ssl
+import threading
+import traceback
+from functools import partial
+from http import HTTPStatus
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+# Published names change with the content, so browsers may keep them forever
+ASSET_CACHE_MAX_AGE_S = 365 * 24 * 3600
+
+
+def content_hashed_name(file_path: str) -> str:
+    """
+    Name a file after its content, e.g. `sample.3f2a9c0d1e4b5a67.pdf`.
+
+    Args:
+        file_path (str): Path to the file.
+
+    Returns:
+        str: The file name with a digest of its content before the suffix.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+
+    path = Path(file_path)
+    return f"{path.stem}.{digest.hexdigest()[:16]}{path.suffix}"
+
+
+class _AssetRequestHandler(SimpleHTTPRequestHandler):
+    """Serves published assets with long-lived caching headers."""
+
+    def send_response(self, code, message=None):
+        self._status = code
+        super().send_response(code, message)
+
+    def end_headers(self):
+        if getattr(self, "_status", None) in (HTTPStatus.OK, HTTPStatus.NOT_MODIFIED):
+            self.send_header(
+                "Cache-Control", f"public, max-age={ASSET_CACHE_MAX_AGE_S}, immutable"
+            )
+            self.send_header("ETag", self._etag())
+            self.send_header("Access-Control-Allow-Origin", "*")
+        super().end_headers()
+
+    def _etag(self) -> str:
+        return f'"{os.path.basename(urlsplit(self.path).path)}"'
+
+    def send_head(self):
+        # the name is the content hash, so a matching ETag is always current
+        if self.headers.get("If-None-Match") == self._etag() and os.path.isfile(
+            self.translate_path(self.path)
+        ):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.end_headers()
+            return None
+        return super().send_head()
+
+    def list_directory(self, path):
+        self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+        return None
+
+    def log_message(self, format, *args):
+        logging.debug(f"Asset server: {format % args}")
+
+
+class AssetServer:
+    """
+    Serves static files (the guidelines PDF, icons) over HTTP under
+    content-hashed names.
+
+    Pages only send the URL of an asset, and browsers download it once and
+    keep it in their cache, instead of the file being embedded in every
+    rerun. `publish` copies a file into the asset directory under its
+    content-hashed name, so a changed file gets a new URL.
+
+    Several app processes can share one asset directory; only the first one
+    binds the port and the others publish into the directory it serves.
+    """
+
+    def __init__(
+        self,
+        asset_dir: str,
+        host: str,
+        port: int,
+        base_url: Optional[str] = None,
+        cert_file: Optional[str] = None,
+        key_file: Optional[str] = None,
+    ):
+        self.asset_dir = asset_dir
+        self.host = host
+        self.port = port
+        self.cert_file = cert_file
+        self.key_file = key_file
+
+        scheme = "https" if self._use_tls() else "http"
+        self.base_url = (base_url or f"{scheme}://localhost:{port}").rstrip("/")
+
+        self._published: Dict[Tuple[str, int, int], str] = {}
+        self._lock = threading.Lock()
+        self._httpd: Optional[ThreadingHTTPServer] = None
+
+    def _use_tls(self) -> bool:
+        return bool(
+            self.cert_file
+            and self.key_file
+            and os.path.exists(self.cert_file)
+            and os.path.exists(self.key_file)
+        )
+
+    def start(self) -> "AssetServer":
+        """
+        Start serving the asset directory on a background thread.
+
+        Returns:
+            AssetServer: The server itself.
+        """
+        try:
+            os.makedirs(self.asset_dir, exist_ok=True)
+            handler = partial(_AssetRequestHandler, directory=self.asset_dir)
+            try:
+                httpd = ThreadingHTTPServer((self.host, self.port), handler)
+            except OSError as e:
+                if e.errno != errno.EADDRINUSE:
+                    raise
+                logging.info(
+                    f"Asset port {self.port} is in use, assuming another app "
+                    "process serves the asset directory"
+                )
+                return self
+
+            if self._use_tls():
+                context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+                context.load_cert_chain(self.cert_file, self.key_file)
+                httpd.socket = context.wrap_socket(httpd.socket, server_side=True)
+
+            httpd.daemon_threads = True
+            self._httpd = httpd
+            threading.Thread(
+                target=httpd.serve_forever, name="asset-server", daemon=True
+            ).start()
+            logging.info(f"Serving static assets at {self.base_url}")
+            return self
+
+        except Exception as e:
+            logging.error(f"An error occurred in 'AssetServer.start': {e}")
+            logging.error(traceback.format_exc())
+            raise
+
+    def publish(self, file_path: str) -> str:
+        """
+        Publish a file and get its URL.
+
+        The file is hashed again only when its size or modification time
+        changes, so calling this on every rerun costs a `stat`.
+
+        Args:
+            file_path (str): Path to the file.
+
+        Returns:
+            str: The content-hashed URL of the file.
+        """
+        try:
+            stat = os.stat(file_path)
+            key = (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+            with self._lock:
+                name = self._published.get(key)
+
+            if name is None:
+                name = content_hashed_name(file_path)
+                target = os.path.join(self.asset_dir, name)
+                if not os.path.exists(target):
+                    # copy under a temporary name so the file never appears
+                    # half written
+                    tmp = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+                    shutil.copyfile(file_path, tmp)
+                    os.replace(tmp, target)
+                with self._lock:
+                    self._published[key] = name
+
+            return f"{self.base_url}/{name}"
+
+        except Exception as e:
+            logging.error(f"An error occurred in 'AssetServer.publish': {e}")
+            logging.error(traceback.format_exc())
+            raise
+
+    def stop(self) -> None:
+        """
+        Stop serving.
+
+        Returns:
+            None
+        """
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
@@ -0,0 +1,209 @@
+import hashlib
+import io
+import logging
+import os
+import threading
+import time
+import traceback
+from functools import lru_cache
+from typing import Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+INTENT_COL = "Intent"
+SUBINTENT_COL = "Sub Intent"
+
+
+class InvalidLabelsError(ValueError):
+    """Labels of a save that don't fit the taxonomy."""
+
+    def __init__(self, labels: List[str]):
+        super().__init__(f"Labels not valid for the selected intents: {labels}")
+        self.labels = labels
+
+
+class Taxonomy:
+    """
+    The intent / sub intent taxonomy of intents.parquet, compiled once.
+
+    Intents and sub intents get integer ids in the order of the file. Every
+    intent has a bitset (a Python int) of its sub intents and every sub
+    intent a bitset of the intents it belongs to, so the valid options of a
+    selection, their intersection with the defaults and the validation of a
+    save are a few bitwise operations instead of list and set building on
+    every rerun. Instances are immutable and shared between sessions.
+
+    `version` identifies the content of the intents file the taxonomy was
+    compiled from; it is saved with every annotation.
+    """
+
+    def __init__(self, intent_df: pd.DataFrame, version: str = ""):
+        self.intent_df = intent_df
+        self.version = version
+        pairs = intent_df[[INTENT_COL, SUBINTENT_COL]]
+        self.intents: List[str] = pairs[INTENT_COL].dropna().unique().tolist()
+        self.subintents: List[str] = pairs[SUBINTENT_COL].dropna().unique().tolist()
+        self._intent_ids = {name: i for i, name in enumerate(self.intents)}
+        self._subintent_ids = {name: i for i, name in enumerate(self.subintents)}
+
+        self._children = [0] * len(self.intents)
+        self._parents = [0] * len(self.subintents)
+        for intent, subintent in pairs.dropna().drop_duplicates().itertuples(
+            index=False
+        ):
+            intent_id = self._intent_ids[intent]
+            subintent_id = self._subintent_ids[subintent]
+            self._children[intent_id] |= 1 << subintent_id
+            self._parents[subintent_id] |= 1 << intent_id
+
+        # the same few selections come back on every rerun
+        self._subintent_names = lru_cache(maxsize=4096)(self._mask_names)
+
+    def _mask_names(self, mask: int) -> Tuple[str, ...]:
+        names = []
+        while mask:
+            low = mask & -mask
+            names.append(self.subintents[low.bit_length() - 1])
+            mask ^= low
+        return tuple(names)
+
+    def intent_mask(self, intents: Iterable[str]) -> int:
+        """Bitset of the known intents among `intents`."""
+        mask = 0
+        for name in intents:
+            intent_id = self._intent_ids.get(name)
+            if intent_id is not None:
+                mask |= 1 << intent_id
+        return mask
+
+    def subintent_mask(self, subintents: Iterable[str]) -> int:
+        """Bitset of the known sub intents among `subintents`."""
+        mask = 0
+        for name in subintents:
+            subintent_id = self._subintent_ids.get(name)
+            if subintent_id is not None:
+                mask |= 1 << subintent_id
+        return mask
+
+    def valid_subintent_mask(self, intents: Iterable[str]) -> int:
+        """Bitset of the sub intents of any of `intents`."""
+        mask = 0
+        for name in intents:
+            intent_id = self._intent_ids.get(name)
+            if intent_id is not None:
+                mask |= self._children[intent_id]
+        return mask
+
+    def valid_subintents(self, intents: Iterable[str]) -> List[str]:
+        """
+        Get the sub intents of the selected intents.
+
+        Args:
+            intents (Iterable[str]): The selected intents.
+
+        Returns:
+            List[str]: The valid sub intents, in the order of the taxonomy.
+        """
+        return list(self._subintent_names(self.valid_subintent_mask(intents)))
+
+    def subintent_options(
+        self, intents: Iterable[str], default_subintents: Iterable[str]
+    ) -> Tuple[List[str], List[str]]:
+        """
+        Get the sub intent options of a selection and the defaults among them.
+
+        Args:
+            intents (Iterable[str]): The selected intents.
+            default_subintents (Iterable[str]): The default sub intents.
+
+        Returns:
+            Tuple[List[str], List[str]]: The valid sub intents and the default
+                sub intents that are valid, in the order of the taxonomy.
+        """
+        valid = self.valid_subintent_mask(intents)
+        defaults = valid & self.subintent_mask(default_subintents)
+        return list(self._subintent_names(valid)), list(
+            self._subintent_names(defaults)
+        )
+
+    def invalid_labels(
+        self, intents: Iterable[str], subintents: Iterable[str]
+    ) -> List[str]:
+        """
+        Get the labels of a save that don't fit the taxonomy.
+
+        Args:
+            intents (Iterable[str]): The selected intents.
+            subintents (Iterable[str]): The selected sub intents.
+
+        Returns:
+            List[str]: The unknown intents and the sub intents that are unknown
+                or belong to none of the selected intents; empty when valid.
+        """
+        intents = list(intents)
+        invalid = [name for name in intents if name not in self._intent_ids]
+        selected = self.intent_mask(intents)
+        for name in subintents:
+            subintent_id = self._subintent_ids.get(name)
+            if subintent_id is None or not self._parents[subintent_id] & selected:
+                invalid.append(name)
+        return invalid
+
+
+class TaxonomyStore:
+    """
+    The taxonomy of an intents file, reloaded when the file changes.
+
+    The file's mtime and size are checked at most every `check_interval_s`.
+    When they changed, the file is read and hashed, and only new content is
+    compiled into a new Taxonomy. It replaces the current one in a single
+    assignment, so a reader sees either the old or the new taxonomy as a
+    whole. A file that can't be read (e.g. while it is being written) keeps
+    the current taxonomy until the next check.
+    """
+
+    def __init__(self, path: str, check_interval_s: float):
+        self.path = path
+        self.check_interval_s = check_interval_s
+        self._lock = threading.Lock()
+        self._stat: Optional[Tuple[int, int]] = None
+        self._checked_at = 0.0
+        self._current: Optional[Taxonomy] = None
+        self._reload()
+
+    def get(self) -> Taxonomy:
+        """
+        Get the current taxonomy, checking the file if it is due.
+
+        Returns:
+            Taxonomy: The taxonomy of the latest readable intents file.
+        """
+        if time.monotonic() - self._checked_at >= self.check_interval_s:
+            with self._lock:
+                if time.monotonic() - self._checked_at >= self.check_interval_s:
+                    self._reload()
+        return self._current
+
+    def _reload(self) -> None:
+        # callers hold the lock, except the constructor
+        try:
+            stat = os.stat(self.path)
+            key = (stat.st_mtime_ns, stat.st_size)
+            if key != self._stat:
+                with open(self.path, "rb") as f:
+                    content = f.read()
+                version = hashlib.sha256(content).hexdigest()[:12]
+                if self._current is None or version != self._current.version:
+                    intent_df = pd.read_parquet(io.BytesIO(content))
+                    self._current = Taxonomy(intent_df, version)
+                    logging.info(f"Loaded the intent taxonomy {version}.")
+                self._stat = key
+
+        except Exception as e:
+            if self._current is None:
+                raise
+            logging.error(f"Keeping the intent taxonomy {self._current.version}: {e}")
+            logging.error(traceback.format_exc())
+
+        finally:
+            self._checked_at = time.monotonic()
@@ -0,0 +1,314 @@
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import traceback
+import uuid
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from config import TRACE_ENABLED, TRACE_LOG_PATH, TRACE_MAX_BYTES
+
+_local = threading.local()
+
+# Results whose length is recorded as the span's row count
+_ROW_TYPES = (pd.DataFrame, pd.Series, list)
+
+
+class Span:
+    """
+    A timed call or block. `rows` and `cache` may be set while it runs.
+    """
+
+    __slots__ = ("name", "rows", "cache", "fields")
+
+    def __init__(self, name: str, fields: Dict):
+        self.name = name
+        self.rows: Optional[int] = None
+        self.cache: Optional[str] = None
+        self.fields = fields
+
+
+class TraceSink:
+    """
+    Appends finished spans to a JSON lines file, one object per line.
+
+    The file is opened on the first span and moved to `<path>.1` once it
+    grows past `max_bytes`, so it holds the latest spans only.
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._file = None
+        self._lock = threading.Lock()
+
+    def write(self, record: Dict) -> None:
+        line = json.dumps(record, default=str) + "\n"
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(line)
+            self._file.flush()
+            if self._file.tell() > self.max_bytes:
+                self._file.close()
+                os.replace(self.path, f"{self.path}.1")
+                self._file = open(self.path, "a", encoding="utf-8")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+_sink = TraceSink(TRACE_LOG_PATH, TRACE_MAX_BYTES)
+
+
+def _rerun_id() -> str:
+    # Streamlit runs each rerun, callbacks included, on a new script thread;
+    # a page span also ends the rerun in case the thread is reused
+    rerun = getattr(_local, "rerun", None)
+    if rerun is None:
+        rerun = _local.rerun = uuid.uuid4().hex[:12]
+    return rerun
+
+
+def _stack() -> List[Span]:
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+@contextmanager
+def trace_span(name: str, ends_rerun: bool = False, **fields) -> Iterator[Span]:
+    """
+    Time a block and write it to the trace log as a span.
+
+    Args:
+        name (str): The span name, e.g. the function name.
+        ends_rerun (bool): Whether the span is a whole page render, after
+            which the next span starts a new rerun.
+        **fields: Extra values written with the span.
+
+    Yields:
+        Span: The running span, whose `rows` and `cache` may be set.
+    """
+    span = Span(name, fields)
+    if not TRACE_ENABLED:
+        yield span
+        return
+
+    stack = _stack()
+    parent = stack[-1].name if stack else None
+    stack.append(span)
+    error = None
+    start_ts = time.time()
+    start = time.perf_counter()
+    try:
+        yield span
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        duration_ms = 1000 * (time.perf_counter() - start)
+        stack.pop()
+        try:
+            _sink.write(
+                {
+                    "ts": start_ts,
+                    "rerun": _rerun_id(),
+                    "thread": threading.current_thread().name,
+                    "name": name,
+                    "parent": parent,
+                    "duration_ms": round(duration_ms, 3),
+                    "rows": span.rows,
+                    "cache": span.cache,
+                    "error": error,
+                    **span.fields,
+                }
+            )
+        except Exception as e:
+            logging.error(f"An error occurred while writing a trace span: {e}")
+        if ends_rerun:
+            _local.rerun = None
+
+
+def count_rows(result) -> Optional[int]:
+    """
+    Count the rows of a result: its length if it is a DataFrame, Series or
+    list, or the total over those items of a tuple.
+
+    Args:
+        result: A function's return value.
+
+    Returns:
+        Optional[int]: The row count, or None if the result has no rows.
+    """
+    if isinstance(result, _ROW_TYPES):
+        return len(result)
+    if isinstance(result, tuple):
+        counts = [len(item) for item in result if isinstance(item, _ROW_TYPES)]
+        return sum(counts) if counts else None
+    return None
+
+
+def traced(func: Optional[Callable] = None, *, ends_rerun: bool = False):
+    """
+    Decorator recording every call of a function as a span with its
+    duration and row count.
+
+    On a function cached with `st.cache_data` or `st.cache_resource`, put it
+    above the cache decorator and `cache_miss` below it, so the span also
+    records whether the cache was hit:
+
+        @traced
+        @st.cache_resource
+        @cache_miss
+        def get_taxonomy_store(): ...
+
+    Args:
+        func (Callable): The function to trace.
+        ends_rerun (bool): Whether the function renders a whole page.
+
+    Returns:
+        Callable: The traced function.
+    """
+    if func is None:
+        return functools.partial(traced, ends_rerun=ends_rerun)
+
+    # cached functions have a `clear` method
+    is_cached = hasattr(func, "clear")
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with trace_span(func.__name__, ends_rerun=ends_rerun) as span:
+            if is_cached:
+                span.cache = "hit"
+            result = func(*args, **kwargs)
+            span.rows = count_rows(result)
+            return result
+
+    if is_cached:
+        # keep `traced_func.clear()` working
+        wrapper.clear = func.clear
+    return wrapper
+
+
+def cache_miss(func: Callable) -> Callable:
+    """
+    Decorator, below a Streamlit cache decorator, marking the enclosing
+    traced call as a cache miss when the function body actually runs.
+
+    Args:
+        func (Callable): The cached function's body.
+
+    Returns:
+        Callable: The wrapped function, with the same signature so cache
+            keys (and `_`-prefixed unhashed arguments) are unchanged.
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        stack = _stack()
+        if stack and stack[-1].name == func.__name__:
+            stack[-1].cache = "miss"
+        return func(*args, **kwargs)
+
+    return wrapper
+
+
+def read_spans(since: float, path: str = TRACE_LOG_PATH) -> pd.DataFrame:
+    """
+    Read the spans recorded since a point in time, from the trace log and
+    its rotated predecessor.
+
+    Args:
+        since (float): Epoch seconds of the earliest span to read.
+        path (str): Path to the trace log.
+
+    Returns:
+        pd.DataFrame: One row per span.
+    """
+    try:
+        records = []
+        for file_path in [f"{path}.1", path]:
+            if not os.path.exists(file_path) or os.path.getmtime(file_path) < since:
+                continue
+            with open(file_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # a line still being written
+                        continue
+                    if record["ts"] >= since:
+                        records.append(record)
+
+        columns = ["ts", "rerun", "thread", "name", "parent", "duration_ms"]
+        columns += ["rows", "cache", "error"]
+        return pd.DataFrame.from_records(records, columns=columns)
+
+    except Exception as e:
+        logging.error(f"An error occurred in 'read_spans': {e}")
+        logging.error(traceback.format_exc())
+        raise
+
+
+def summarize_spans(spans: pd.DataFrame) -> pd.DataFrame:
+    """
+    Summarize span durations per function.
+
+    Args:
+        spans (pd.DataFrame): Spans from `read_spans`.
+
+    Returns:
+        pd.DataFrame: Per function the number of calls, p50/p95/p99 and max
+            duration in ms, median row count, cache hit rate and errors,
+            slowest p95 first.
+    """
+    rows = []
+    for name, group in spans.groupby("name"):
+        durations = group["duration_ms"].to_numpy(dtype=float)
+        cached = group["cache"].dropna()
+        n_rows = pd.to_numeric(group["rows"], errors="coerce").dropna()
+        rows.append(
+            {
+                "function": name,
+                "calls": len(group),
+                "p50_ms": np.percentile(durations, 50),
+                "p95_ms": np.percentile(durations, 95),
+                "p99_ms": np.percentile(durations, 99),
+                "max_ms": durations.max(),
+                "rows": n_rows.median() if len(n_rows) else np.nan,
+                "cache_hit_rate": (cached == "hit").mean() if len(cached) else np.nan,
+                "errors": int(group["error"].notna().sum()),
+            }
+        )
+
+    columns = ["function", "calls", "p50_ms", "p95_ms", "p99_ms", "max_ms"]
+    columns += ["rows", "cache_hit_rate", "errors"]
+    summary = pd.DataFrame(rows, columns=columns)
+    return summary.sort_values("p95_ms", ascending=False).reset_index(drop=True)
+
+
+def rerun_durations(spans: pd.DataFrame) -> pd.Series:
+    """
+    Total server time of every rerun: the durations of its top-level spans
+    (button callbacks and the page render) on Streamlit's script threads
+    added up.
+
+    Args:
+        spans (pd.DataFrame): Spans from `read_spans`.
+
+    Returns:
+        pd.Series: Duration in ms per rerun id.
+    """
+    top_level = spans[spans["parent"].isna() & spans["thread"].str.startswith("Script")]
+    return top_level.groupby("rerun")["duration_ms"].sum()
@@ -0,0 +1,395 @@
+import logging
+import sqlite3
+import threading
+import time
+import traceback
+from typing import Optional, Tuple
+
+import pandas as pd
+
+from config import CHUNK_ID_COLNAME, CONN_ID_COLNAME, LEASE_DURATION_S
+
+ASSIGNMENT_TABLE = "call_assignment_table"
+LEASE_TABLE = "call_lease_table"
+PAIR_TABLE = "annotator_reviewer_pairs"
+
+_lease_lock = threading.Lock()
+
+ASSIGNMENT_TABLES = f"""
+CREATE TABLE IF NOT EXISTS {ASSIGNMENT_TABLE} (
+    call_id TEXT PRIMARY KEY,
+    connection_id TEXT NOT NULL,
+    chunk_id INTEGER NOT NULL,
+    annotator TEXT,
+    reviewer TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_assignment_annotator
+    ON {ASSIGNMENT_TABLE} (annotator, connection_id, chunk_id, call_id);
+CREATE INDEX IF NOT EXISTS idx_assignment_reviewer
+    ON {ASSIGNMENT_TABLE} (reviewer, connection_id, chunk_id, call_id);
+CREATE INDEX IF NOT EXISTS idx_assignment_connection
+    ON {ASSIGNMENT_TABLE} (connection_id, chunk_id, call_id);
+
+CREATE TABLE IF NOT EXISTS {LEASE_TABLE} (
+    connection_id TEXT PRIMARY KEY,
+    reviewer TEXT,
+    n_chunks INTEGER NOT NULL,
+    status TEXT NOT NULL CHECK (status IN ('open', 'leased', 'done')),
+    annotator TEXT,
+    expires_at INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_lease_open
+    ON {LEASE_TABLE} (status, reviewer, connection_id, n_chunks);
+CREATE INDEX IF NOT EXISTS idx_lease_expiry
+    ON {LEASE_TABLE} (status, expires_at);
+CREATE INDEX IF NOT EXISTS idx_lease_annotator
+    ON {LEASE_TABLE} (annotator, status);
+
+CREATE TABLE IF NOT EXISTS {PAIR_TABLE} (
+    annotator TEXT NOT NULL,
+    reviewer TEXT NOT NULL,
+    PRIMARY KEY (annotator, reviewer)
+) WITHOUT ROWID;
+"""
+
+
+def create_assignment_table(conn: sqlite3.Connection) -> None:
+    """
+    Create the chunk assignment and call lease tables and their indexes if they
+    don't exist.
+
+    The (annotator, connection_id, chunk_id, call_id) index covers the pending
+    chunk query, so an annotator's queue is read in order straight from the
+    index without touching the table rows. The (status, reviewer,
+    connection_id, n_chunks) index serves both the open workload per reviewer
+    and the next open call of a reviewer when a call is leased.
+
+    Args:
+        conn (sqlite3.Connection): Connection object to the database.
+
+    Returns:
+        None
+    """
+    try:
+        conn.executescript(ASSIGNMENT_TABLES)
+    except Exception as e:
+        logging.error(f"An error occurred in 'create_assignment_table': {e}")
+        logging.error(traceback.format_exc())
+        raise
+
+
+def sync_assignments(
+    conn: sqlite3.Connection,
+    call_data: pd.DataFrame,
+    user_call_mapping: pd.DataFrame,
+) -> int:
+    """
+    Load the chunk to annotator/reviewer assignments into the work queue.
+
+    Existing assignments are updated in place, so re-running this after the
+    mapping file changes only rewrites the rows that actually moved. The calls
+    are added to the lease table, and the annotator/reviewer pairs of the
+    mapping are recorded for `acquire_call`.
+
+    Args:
+        conn (sqlite3.Connection): Connection object to the database.
+        call_data (pd.DataFrame): DataFrame containing call data.
+        user_call_mapping (pd.DataFrame): DataFrame containing user-call mapping.
+
+    Returns:
+        int: Number of chunk assignments synced.
+    """
+    try:
+        create_assignment_table(conn)
+
+        assignments = pd.merge(
+            call_data[[CONN_ID_COLNAME, CHUNK_ID_COLNAME]],
+            user_call_mapping[[CONN_ID_COLNAME, "Annotator", "Reviewer"]],
+            on=CONN_ID_COLNAME,
+            how="left",
+        )
+        assignments["call_id"] = (
+            assignments[CONN_ID_COLNAME]
+            + "_chunk_"
+            + assignments[CHUNK_ID_COLNAME].astype(str)
+        )
+        assignments = assignments.astype(object).where(assignments.notna(), None)
+
+        rows = assignments[
+            ["call_id", CONN_ID_COLNAME, CHUNK_ID_COLNAME, "Annotator", "Reviewer"]
+        ].itertuples(index=False, name=None)
+
+        query = (
+            f"INSERT INTO {ASSIGNMENT_TABLE} (call_id, connection_id, chunk_id, annotator, reviewer) "
+            "VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (call_id) DO UPDATE SET "
+            "annotator = excluded.annotator, reviewer = excluded.reviewer "
+            "WHERE annotator IS NOT excluded.annotator OR reviewer IS NOT excluded.reviewer"
+        )
+        with conn:
+            conn.executemany(query, rows)
+            _sync_calls(conn)
+
+        logging.info(f"Synced {len(assignments)} chunk assignments to the work queue.")
+        return len(assignments)
+
+    except Exception as e:
+        logging.error(f"An error occurred in 'sync_assignments': {e}")
+        logging.error(traceback.format_exc())
+        raise
+
+
+def _sync_calls(conn: sqlite3.Connection) -> None:
+    # runs in the caller's transaction; a call gets more chunks when a batch
+    # adds to it, which reopens it if it was done
+    conn.execute(f"""
+        INSERT INTO {LEASE_TABLE} (connection_id, reviewer, n_chunks, status)
+        SELECT
+            a.connection_id,
+            MAX(a.reviewer),
+            COUNT(*),
+            CASE WHEN SUM(NOT EXISTS (
+                SELECT 1 FROM annotations AS c WHERE c.call_id = a.call_id
+            )) = 0 THEN 'done' ELSE 'open' END
+        FROM {ASSIGNMENT_TABLE} AS a
+        WHERE true
+        GROUP BY a.connection_id
+        ON CONFLICT (connection_id) DO UPDATE SET
+            reviewer = excluded.reviewer,
+            n_chunks = excluded.n_chunks,
+            status = CASE
+                WHEN status = 'done' AND excluded.n_chunks > n_chunks THEN 'open'
+                ELSE status
+            END
+        WHERE reviewer IS NOT excluded.reviewer OR n_chunks != excluded.n_chunks
+        """)
+    conn.execute(f"""
+        INSERT OR IGNORE INTO {PAIR_TABLE} (annotator, reviewer)
+        SELECT DISTINCT annotator, reviewer FROM {ASSIGNMENT_TABLE}
+        WHERE annotator IS NOT NULL AND reviewer IS NOT NULL
+        """)
+
+
+def lease_is_fresh(expires_at: int, now: int, lease_s: int = LEASE_DURATION_S) -> bool:
+    """Whether a lease has more than half of it left and needs no extending."""
+    return expires_at - now > lease_s / 2
+
+
+def get_held_lease(
+    conn: sqlite3.Connection, annotator: str, now: Optional[int] = None
+) -> Optional[Tuple[str, int]]:
+    """
+    Get the call an annotator holds an unexpired lease on.
+
+    A plain read, so it runs on a pooled read connection.
+
+    Args:
+        conn (sqlite3.Connection): Connection object to the database.
+        annotator (str): Name of the annotator.
+        now (int, optional): Current unix time; defaults to the clock.
+
+    Returns:
+        Optional[Tuple[str, int]]: ConnectionID of the call and the unix time
+            the lease expires at, or None if the annotator holds no lease.
+    """
+    try:
+        now = int(time.time()) if now is None else now
+        return conn.execute(
+            f"SELECT connection_id, expires_at FROM {LEASE_TABLE} "
+            "WHERE annotator = ? AND status = 'leased' AND expires_at > ?",
+            (annotator, now),
+        ).fetchone()
+
+    except Exception as e:
+        logging.error(f"An error occurred in 'get_held_lease': {e}")
+        logging.error(traceback.format_exc())
+        raise
+
+
+def acquire_call(
+    conn: sqlite3.Connection,
+    annotator: str,
+    lease_s: int = LEASE_DURATION_S,
+    now: Optional[int] = None,
+) -> Optional[str]:
+    """
+    Get the call an annotator works on, leasing a new one when they have none.
+
+    An annotator holds at most one call at a time, with all of its chunks.
+    A held lease is extended once less than half of it is left, so most calls
+    are plain reads. A new call is picked from the reviewers paired with the
+    annotator in the mapping first, and otherwise from the reviewer with the
+    most open chunks, so no reviewer's calls sit idle while others run dry.
+    Leases that expired are returned to the open calls first.
+
+    The lease is taken in a BEGIN IMMEDIATE transaction, so concurrent
+    annotators, in any process, never get the same call.
+
+    Args:
+        conn (sqlite3.Connection): A writable connection to the database.
+        annotator (str): Name of the annotator.
+        lease_s (int): Seconds a lease lasts without being extended.
+        now (int, optional): Current unix time; defaults to the clock.
+
+    Returns:
+        Optional[str]: ConnectionID of the leased call, or None when no call
+            is left to annotate.
+    """
+    try:
+        now = int(time.time()) if now is None else now
+        held = get_held_lease(conn, annotator, now)
+        if held is not None and lease_is_fresh(held[1], now, lease_s):
+            return held[0]
+
+        # read outside the write lock; a slightly stale order is fine
+        paired = {
+            reviewer
+            for (reviewer,) in conn.execute(
+                f"SELECT reviewer FROM {PAIR_TABLE} WHERE annotator = ?", (annotator,)
+            )
+        }
+        backlog = conn.execute(
+            f"SELECT reviewer, SUM(n_chunks) FROM {LEASE_TABLE} "
+            "WHERE status = 'open' GROUP BY reviewer"
+        ).fetchall()
+        reviewers = [
+            reviewer
+            for reviewer, _ in sorted(
+                backlog, key=lambda row: (row[0] not in paired, -row[1])
+            )
+        ]
+
+        # sessions of this process queue here instead of in SQLite's busy
+        # handler, which sleeps and retries and starves some waiters
+        with _lease_lock:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if held is not None:
+                    renewed = conn.execute(
+                        f"UPDATE {LEASE_TABLE} SET expires_at = ? "
+                        "WHERE connection_id = ? AND annotator = ? AND status = 'leased'",
+                        (now + lease_s, held[0], annotator),
+                    ).rowcount
+                    if renewed:
+                        conn.commit()
+                        return held[0]
+
+                conn.execute(
+                    f"UPDATE {LEASE_TABLE} SET status = 'open', annotator = NULL, "
+                    "expires_at = NULL WHERE status = 'leased' AND expires_at <= ?",
+                    (now,),
+                )
+
+                # the last candidate is any open call, which also covers the calls
+                # reopened just above
+                candidates = [("AND reviewer IS ? ", (r,)) for r in reviewers] + [
+                    ("", ())
+                ]
+                connection_id = None
+                for condition, params in candidates:
+                    row = conn.execute(
+                        f"SELECT connection_id FROM {LEASE_TABLE} "
+                        f"WHERE status = 'open' {condition}"
+                        "ORDER BY connection_id LIMIT 1",
+                        params,
+                    ).fetchone()
+                    if row is not None:
+                        connection_id = row[0]
+                        break
+
+                if connection_id is not None:
+                    conn.execute(
+                        f"UPDATE {LEASE_TABLE} SET status = 'leased', annotator = ?, "
+                        "expires_at = ? WHERE connection_id = ?",
+                        (annotator, now + lease_s, connection_id),
+                    )
+                conn.commit()
+
+            except Exception:
+                conn.rollback()
+                raise
+
+        if connection_id is not None:
+            logging.info(f"Leased call {connection_id} to {annotator}.")
+        return connection_id
+
+    except Exception as e:
+        logging.error(f"An error occurred in 'acquire_call': {e}")
+        logging.error(traceback.format_exc())
+        raise
+
+
+def complete_call(
+    conn: sqlite3.Connection, annotator: str, connection_id: Optional[str] = None
+) -> Optional[str]:
+    """
+    Mark the call leased to an annotator as done.
+
+    Called when the annotator saved every chunk of the call, which may still be
+    on its way through the annotation writer, so the annotations table isn't
+    checked here.
+
+    Args:
+        conn (sqlite3.Connection): A writable connection to the database.
+        annotator (str): Name of the annotator.
+        connection_id (str, optional): The call the annotator worked on; a
+            lease on another call is left alone. Any leased call when None.
+
+    Returns:
+        Optional[str]: ConnectionID of the completed call, or None if the
+            annotator held no lease (on `connection_id`).
+    """
+    try:
+        with conn:
+            row = conn.execute(
+                f"SELECT connection_id FROM {LEASE_TABLE} "
+                "WHERE annotator = ? AND status = 'leased' "
+                "AND connection_id = ifnull(?, connection_id)",
+                (annotator, connection_id),
+            ).fetchone()
+            if row is None:
+                return None
+
+            conn.execute(
+                f"UPDATE {LEASE_TABLE} SET status = 'done', expires_at = NULL "
+                "WHERE connection_id = ? AND annotator = ? AND status = 'leased'",
+                (row[0], annotator),
+            )
+        return row[0]
+
+    except Exception as e:
+        logging.error(f"An error occurred in 'complete_call': {e}")
+        logging.error(traceback.format_exc())
+        raise
+
+
+def get_leased_chunks(conn: sqlite3.Connection, annotator: str) -> pd.DataFrame:
+    """
+    Get the chunks of the annotator's leased call that are still pending.
+
+    Args:
+        conn (sqlite3.Connection): Connection object to the database.
+        annotator (str): Name of the annotator.
+
+    Returns:
+        pd.DataFrame: DataFrame with new_id, ConnectionID and chunk_id columns,
+            sorted by chunk_id.
+    """
+    try:
+        query = (
+            f"SELECT a.call_id AS new_id, a.connection_id AS {CONN_ID_COLNAME}, "
+            f"a.chunk_id AS {CHUNK_ID_COLNAME} "
+            f"FROM {LEASE_TABLE} AS l "
+            f"JOIN {ASSIGNMENT_TABLE} AS a ON a.connection_id = l.connection_id "
+            "WHERE l.annotator = ? AND l.status = 'leased' "
+            "AND NOT EXISTS ("
+            "SELECT 1 FROM annotations AS c WHERE c.call_id = a.call_id"
+            ") "
+            "ORDER BY a.connection_id, a.chunk_id"
+        )
+        return pd.read_sql_query(query, conn, params=(annotator,))
+
+    except Exception as e:
+        logging.error(f"An error occurred in 'get_leased_chunks': {e}")
+        logging.error(traceback.format_exc())
+        raise
@@ -0,0 +1,76 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+# the app modules import each other from src/, as when run from there
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, "src"))
+
+from db_pool import ConnectionPool  # noqa: E402
+from db_writer import AnnotationWriter  # noqa: E402
+from migrations import apply_migrations  # noqa: E402
+from work_queue import sync_assignments  # noqa: E402
+
+
+@pytest.fixture
+def pool(tmp_path):
+    """A connection pool on a fresh, migrated database."""
+    pool = ConnectionPool(str(tmp_path / "annotations.db"))
+    with pool.writer_connection() as conn:
+        apply_migrations(conn)
+    yield pool
+    pool.close()
+
+
+@pytest.fixture
+def assign(pool):
+    """
+    Sync assignments into the work queue: {ConnectionID: (annotator,
+    reviewer, n_chunks)}, with chunk_ids 0 to n_chunks - 1.
+    """
+
+    def assign(calls):
+        data = pd.DataFrame(
+            [
+                (conn_id, chunk_id)
+                for conn_id, (_, _, n_chunks) in calls.items()
+                for chunk_id in range(n_chunks)
+            ],
+            columns=["ConnectionID", "chunk_id"],
+        )
+        mapping = pd.DataFrame(
+            [(conn_id, a, r) for conn_id, (a, r, _) in calls.items()],
+            columns=["ConnectionID", "Annotator", "Reviewer"],
+        )
+        with pool.writer_connection() as conn:
+            return sync_assignments(conn, data, mapping)
+
+    return assign
+
+
+@pytest.fixture
+def save(pool):
+    """
+    Save annotations through the annotation writer, as the pages do; every
+    call commits its row before returning.
+    """
+    writer = AnnotationWriter(pool)
+
+    def save(
+        call_id,
+        username,
+        role,
+        intents="",
+        subintents="",
+        date="2024-01-02",
+        time_of_day="10:00:00",
+    ):
+        writer.submit(
+            (call_id, username, role, date, time_of_day, intents, subintents, 3, "")
+        )
+        writer.flush()
+
+    yield save
+    writer.close()
+    assert writer.n_failed == 0
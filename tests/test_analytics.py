@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics import compute_agreement
+
+INTENTS = pd.DataFrame({"Intent": ["X", "X", "Y"], "Sub Intent": ["x1", "x2", "y1"]})
+
+
+def agreement(pool):
+    with pool.reader() as conn:
+        return compute_agreement(conn, INTENTS, "intent")
+
+
+def test_cohen_kappa_of_chance_agreement(pool, save):
+    save("c1_chunk_0", "ann1", "annotator", "X")
+    save("c1_chunk_0", "rev1", "reviewer", "X", time_of_day="11:00:00")
+    save("c1_chunk_1", "ann1", "annotator", "X")
+    save("c1_chunk_1", "rev1", "reviewer", "Y", time_of_day="11:00:00")
+
+    kappa = agreement(pool)["cohen_kappa"]
+    assert kappa[["annotator", "reviewer", "n_chunks"]].values.tolist() == [
+        ["ann1", "rev1", 2]
+    ]
+    # 2 of 4 yes/no decisions agree, as expected from the label rates
+    assert kappa["observed_agreement"].tolist() == [0.5]
+    assert kappa["kappa"].tolist() == [0.0]
+
+
+def test_cohen_kappa_of_perfect_agreement(pool, save):
+    save("c1_chunk_0", "ann1", "annotator", "X")
+    save("c1_chunk_0", "rev1", "reviewer", "X", time_of_day="11:00:00")
+    save("c1_chunk_1", "ann1", "annotator", "Y")
+    save("c1_chunk_1", "rev1", "reviewer", "Y", time_of_day="11:00:00")
+
+    assert agreement(pool)["cohen_kappa"]["kappa"].tolist() == [1.0]
+
+
+def test_latest_review_counts(pool, save):
+    save("c1_chunk_0", "ann1", "annotator", "X")
+    save("c1_chunk_0", "rev1", "reviewer", "Y", time_of_day="11:00:00")
+    save("c1_chunk_0", "rev1", "reviewer", "X", time_of_day="12:00:00")
+
+    kappa = agreement(pool)["cohen_kappa"]
+    assert kappa["n_chunks"].tolist() == [1]
+    assert kappa["observed_agreement"].tolist() == [1.0]
+
+
+def test_fleiss_kappa(pool, save):
+    save("c1_chunk_0", "ann1", "annotator", "X")
+    save("c1_chunk_0", "rev1", "reviewer", "X", time_of_day="11:00:00")
+    save("c1_chunk_1", "ann1", "annotator", "X")
+    save("c1_chunk_1", "rev1", "reviewer", "Y", time_of_day="11:00:00")
+    # a single rating is skipped
+    save("c2_chunk_0", "ann2", "annotator", "Y")
+
+    fleiss = agreement(pool)["fleiss_kappa"]
+    assert fleiss["label"].tolist() == ["X", "Y"]
+    assert fleiss["n_chunks"].tolist() == [2, 2]
+    assert fleiss["kappa"].tolist() == pytest.approx([-1 / 3, -1 / 3])
+
+
+def test_label_scores_and_confusion_matrix(pool, save):
+    save("c1_chunk_0", "ann1", "annotator", "X")
+    save("c1_chunk_0", "rev1", "reviewer", "X", time_of_day="11:00:00")
+    save("c1_chunk_1", "ann1", "annotator", "X")
+    save("c1_chunk_1", "rev1", "reviewer", "Y", time_of_day="11:00:00")
+    save("c1_chunk_2", "ann1", "annotator", "")
+    save("c1_chunk_2", "rev1", "reviewer", "Y", time_of_day="11:00:00")
+
+    result = agreement(pool)
+    scores = result["label_scores"].set_index("label")
+    assert scores.loc["X", ["support", "predicted", "true_positives"]].tolist() == [
+        1,
+        2,
+        1,
+    ]
+    assert scores.loc["X", ["precision", "recall"]].tolist() == [0.5, 1.0]
+    assert np.isnan(scores.loc["Y", "precision"])
+    assert scores.loc["Y", "recall"] == 0.0
+    assert result["annotator_scores"]["annotator"].unique().tolist() == ["ann1"]
+
+    assert result["confusion_matrix"].values.tolist() == [
+        [1, 1, 0],
+        [0, 0, 0],
+        [0, 1, 0],
+    ]
+
+
+def test_no_reviews(pool, save):
+    save("c1_chunk_0", "ann1", "annotator", "X")
+
+    result = agreement(pool)
+    assert result["cohen_kappa"].empty
+    assert result["fleiss_kappa"]["n_chunks"].tolist() == [0, 0]
+    assert result["confusion_matrix"].values.sum() == 0
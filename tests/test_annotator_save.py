@@ -0,0 +1,107 @@
+import importlib
+import time
+
+import pytest
+
+from config import LEASE_DURATION_S
+from navigation import ChunkNavigator
+from work_queue import LEASE_TABLE, acquire_call, get_held_lease
+
+
+@pytest.fixture
+def helpers(tmp_path, monkeypatch):
+    """
+    helper_functions with a plain dict as the session state and the saves
+    recorded instead of queued on the writer.
+    """
+    # the app runs from src/ and logs to ../logs
+    (tmp_path / "logs").mkdir()
+    (tmp_path / "src").mkdir()
+    monkeypatch.chdir(tmp_path / "src")
+    helper_functions = importlib.import_module("helper_functions")
+
+    saved = []
+    monkeypatch.setattr(helper_functions.st, "session_state", {})
+    monkeypatch.setattr(
+        helper_functions,
+        "save_data_to_table",
+        lambda pool, new_id, *values: saved.append(new_id) or True,
+    )
+    helper_functions.saved = saved
+    return helper_functions
+
+
+@pytest.fixture
+def session(helpers, pool, assign):
+    """The session of ann1, on the first of the two chunks of their leased call."""
+    assign({"c1": ("ann1", "rev1", 2)})
+    state = helpers.st.session_state
+    state.update(name="ann1", role="annotator", current_idx=0)
+    state["leased_call"] = helpers.renew_call_lease(pool, "ann1")
+    state["navigator"] = ChunkNavigator(2)
+    state["annotator_queue"] = state["prefetcher"] = object()
+    return state
+
+
+def save(helpers, pool, new_id):
+    helpers.save_next_button_clicked(pool, new_id, ["Claim"], [], 3, "")
+
+
+def lease_status(pool, connection_id):
+    with pool.reader() as conn:
+        return conn.execute(
+            f"SELECT status, annotator FROM {LEASE_TABLE} WHERE connection_id = ?",
+            (connection_id,),
+        ).fetchone()
+
+
+def test_save_moves_to_the_next_chunk(helpers, pool, session):
+    assert session["leased_call"] == "c1"
+    save(helpers, pool, "c1_chunk_0")
+    assert helpers.saved == ["c1_chunk_0"]
+    assert session["current_idx"] == 1
+    assert "save_error" not in session
+    assert lease_status(pool, "c1") == ("leased", "ann1")
+
+
+def test_last_save_completes_the_call(helpers, pool, session):
+    save(helpers, pool, "c1_chunk_0")
+    save(helpers, pool, "c1_chunk_1")
+    assert helpers.saved == ["c1_chunk_0", "c1_chunk_1"]
+    assert lease_status(pool, "c1")[0] == "done"
+    for key in helpers._ANNOTATOR_QUEUE_KEYS:
+        assert key not in session
+
+
+def test_save_after_the_lease_was_lost(helpers, pool, session):
+    # the lease ran out while the session sat idle and ann2 got the call
+    later = int(time.time()) + LEASE_DURATION_S + 1
+    with pool.writer_connection() as conn:
+        assert acquire_call(conn, "ann2", now=later) == "c1"
+
+    save(helpers, pool, "c1_chunk_0")
+    assert helpers.saved == []
+    assert session["save_error"] == helpers.LEASE_LOST_MESSAGE
+    for key in helpers._ANNOTATOR_QUEUE_KEYS:
+        assert key not in session
+    assert lease_status(pool, "c1") == ("leased", "ann2")
+
+
+def test_fresh_lease_is_renewed_without_a_writer(helpers, pool, session, monkeypatch):
+    def no_writer():
+        raise AssertionError("a fresh lease needs no writer")
+
+    monkeypatch.setattr(pool, "writer_connection", no_writer)
+    assert helpers.renew_call_lease(pool, "ann1") == "c1"
+
+
+def test_stale_lease_is_extended(helpers, pool, session):
+    with pool.writer_connection() as conn, conn:
+        conn.execute(
+            f"UPDATE {LEASE_TABLE} SET expires_at = ? WHERE connection_id = 'c1'",
+            (int(time.time()) + 60,),
+        )
+    assert helpers.renew_call_lease(pool, "ann1") == "c1"
+    with pool.reader() as conn:
+        _, expires_at = get_held_lease(conn, "ann1")
+    assert expires_at > int(time.time()) + LEASE_DURATION_S // 2
@@ -0,0 +1,99 @@
+import sqlite3
+import threading
+
+import pytest
+
+from db_writer import AnnotationWriter
+
+
+def row(call_id, username="ann1", time_of_day="10:00:00"):
+    return (
+        call_id,
+        username,
+        "annotator",
+        "2024-01-02",
+        time_of_day,
+        "Claim",
+        "",
+        3,
+        "",
+    )
+
+
+def count_rows(pool):
+    with pool.reader() as conn:
+        return conn.execute("SELECT COUNT(*) FROM annotations").fetchone()[0]
+
+
+def test_readers_are_query_only(pool):
+    with pool.reader() as conn:
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute("DELETE FROM annotations")
+
+
+def test_reader_connections_are_reused(pool):
+    with pool.reader() as first:
+        pass
+    with pool.reader() as second:
+        assert second is first
+
+
+def test_writer_commits_every_submitted_row(pool):
+    writer = AnnotationWriter(pool, max_batch_size=16, max_latency_ms=5)
+    for i in range(100):
+        writer.submit(row(f"c1_chunk_{i}"))
+    writer.close()
+    assert writer.n_failed == 0
+    assert count_rows(pool) == 100
+
+
+def test_duplicate_row_fails_alone(pool):
+    writer = AnnotationWriter(pool, max_latency_ms=50)
+    for values in [row("c1_chunk_0"), row("c1_chunk_0"), row("c1_chunk_1")]:
+        writer.submit(values)
+    writer.close()
+    assert writer.n_failed == 1
+    assert count_rows(pool) == 2
+
+
+def test_concurrent_readers_and_writers(pool):
+    # the pool stress test of benchmarks/stress_db_pool.py, in small
+    writer = AnnotationWriter(pool, max_latency_ms=2)
+    errors = []
+
+    def read():
+        try:
+            for _ in range(50):
+                count_rows(pool)
+        except sqlite3.Error as e:
+            errors.append(e)
+
+    def queue_writes(writer_id):
+        for i in range(50):
+            writer.submit(row(f"c{writer_id}_chunk_{i}", f"ann{writer_id}"))
+
+    def write_directly():
+        try:
+            for i in range(50):
+                with pool.writer_connection() as conn, conn:
+                    conn.execute(
+                        "INSERT INTO annotations (call_id, username, role, "
+                        "created_at, confidence, comments) "
+                        "VALUES (?, 'admin', 'reviewer', ?, 3, '')",
+                        (f"direct_chunk_{i}", i),
+                    )
+        except sqlite3.Error as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=read) for _ in range(8)]
+    threads += [threading.Thread(target=queue_writes, args=(w,)) for w in range(4)]
+    threads.append(threading.Thread(target=write_directly))
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    writer.close()
+
+    assert errors == []
+    assert writer.n_failed == 0
+    assert count_rows(pool) == 4 * 50 + 50
@@ -0,0 +1,120 @@
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from config import (
+    CHUNK_ID_COLNAME,
+    CONN_ID_COLNAME,
+    FULL_TEXT_COLNAME,
+    INTENT_COLNAME,
+    SUB_INTENT_COLNAME,
+    TEXT_COLNAME,
+)
+from data_store import ChunkDataStore
+from export import EXPORT_SCHEMA, export_annotations
+
+
+@pytest.fixture
+def store(tmp_path):
+    data = pd.DataFrame(
+        {
+            CONN_ID_COLNAME: ["c1", "c1", "c2"],
+            CHUNK_ID_COLNAME: [0, 1, 0],
+            INTENT_COLNAME: ["", "", ""],
+            SUB_INTENT_COLNAME: ["", "", ""],
+            TEXT_COLNAME: ["first of c1", "second of c1", "first of c2"],
+            FULL_TEXT_COLNAME: ["c1", "c1", "c2"],
+        }
+    )
+    path = str(tmp_path / "data.parquet")
+    data.to_parquet(path, index=False, row_group_size=2)
+    return ChunkDataStore(path)
+
+
+@pytest.fixture
+def annotations(save):
+    save("c1_chunk_0", "ann1", "annotator", "Claim", date="2024-01-01")
+    save("c1_chunk_0", "ann1", "annotator", "Billing", date="2024-01-02")
+    save("c1_chunk_1", "ann1", "annotator", "Claim", date="2024-01-02")
+    save("c1_chunk_0", "rev1", "reviewer", "Claim", date="2024-01-03")
+    save("c2_chunk_0", "ann2", "annotator", "Claim", date="2024-01-03")
+    # no chunk of the call data has this call_id
+    save("c9_chunk_0", "ann2", "annotator", "Claim", date="2024-01-03")
+
+
+def export(pool, store, tmp_path, fmt="parquet", **filters):
+    path = str(tmp_path / f"export.{fmt}")
+    with pool.reader() as conn:
+        n_rows = export_annotations(
+            conn, path, fmt, store=store, batch_size=2, **filters
+        )
+    if fmt == "parquet":
+        df = pq.read_table(path).to_pandas()
+    elif fmt == "csv":
+        df = pd.read_csv(path, dtype=str, keep_default_na=False)
+    else:
+        df = pd.read_json(path, lines=True, dtype=False, convert_dates=False)
+    assert len(df) == n_rows
+    return df
+
+
+def rows(df):
+    return list(zip(df["call_id"], df["username"], df["date"]))
+
+
+def test_export_everything(pool, store, annotations, tmp_path):
+    df = export(pool, store, tmp_path)
+    assert df.columns.tolist() == EXPORT_SCHEMA.names
+    assert rows(df) == [
+        ("c1_chunk_0", "ann1", "2024-01-01"),
+        ("c1_chunk_0", "ann1", "2024-01-02"),
+        ("c1_chunk_0", "rev1", "2024-01-03"),
+        ("c1_chunk_1", "ann1", "2024-01-02"),
+        ("c2_chunk_0", "ann2", "2024-01-03"),
+        ("c9_chunk_0", "ann2", "2024-01-03"),
+    ]
+    assert df[TEXT_COLNAME].tolist() == [
+        "first of c1",
+        "first of c1",
+        "first of c1",
+        "second of c1",
+        "first of c2",
+        None,
+    ]
+
+
+def test_date_filters(pool, store, annotations, tmp_path):
+    df = export(pool, store, tmp_path, start_date="2024-01-02", end_date="2024-01-02")
+    assert rows(df) == [
+        ("c1_chunk_0", "ann1", "2024-01-02"),
+        ("c1_chunk_1", "ann1", "2024-01-02"),
+    ]
+
+
+def test_role_and_username_filters(pool, store, annotations, tmp_path):
+    assert rows(export(pool, store, tmp_path, role="reviewer")) == [
+        ("c1_chunk_0", "rev1", "2024-01-03")
+    ]
+    df = export(pool, store, tmp_path, role="annotator", username="ann2")
+    assert df["call_id"].tolist() == ["c2_chunk_0", "c9_chunk_0"]
+
+
+def test_latest_only(pool, store, annotations, tmp_path):
+    df = export(pool, store, tmp_path, latest_only=True, username="ann1")
+    assert rows(df) == [
+        ("c1_chunk_0", "ann1", "2024-01-02"),
+        ("c1_chunk_1", "ann1", "2024-01-02"),
+    ]
+    assert df["case_type"].tolist() == ["Billing", "Claim"]
+
+
+@pytest.mark.parametrize("fmt", ["csv", "jsonl"])
+def test_text_formats(pool, store, annotations, tmp_path, fmt):
+    df = export(pool, store, tmp_path, fmt, end_date="2024-01-01")
+    assert rows(df) == [("c1_chunk_0", "ann1", "2024-01-01")]
+    assert df[TEXT_COLNAME].tolist() == ["first of c1"]
+
+
+def test_unknown_format(pool, store, tmp_path):
+    with pytest.raises(ValueError):
+        export(pool, store, tmp_path, "xlsx")
@@ -0,0 +1,107 @@
+import multiprocessing
+import sqlite3
+
+import pytest
+
+from db_pool import ConnectionPool
+from migrations import MIGRATIONS, apply_migrations
+
+
+def _start_app(db_path, barrier, results):
+    # what init_pool and the shared cache loader do at startup
+    barrier.wait()
+    try:
+        pool = ConnectionPool(db_path)
+        with pool.writer_connection() as conn:
+            results.put(apply_migrations(conn))
+        pool.close()
+    except Exception as e:
+        results.put(repr(e))
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "annotations.db")
+
+
+def test_fresh_database_reaches_the_last_version(db_path):
+    conn = sqlite3.connect(db_path)
+    assert apply_migrations(conn) == len(MIGRATIONS)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == len(MIGRATIONS)
+    conn.close()
+
+
+def test_applying_twice_changes_nothing(db_path):
+    conn = sqlite3.connect(db_path)
+    apply_migrations(conn)
+    schema = conn.execute("SELECT type, name, sql FROM sqlite_master").fetchall()
+
+    assert apply_migrations(conn) == len(MIGRATIONS)
+    assert conn.execute("SELECT type, name, sql FROM sqlite_master").fetchall() == schema
+    conn.close()
+
+
+def test_old_version_is_migrated_with_its_rows(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA user_version = 0")
+    for migration in MIGRATIONS[:2]:
+        migration(conn)
+    conn.execute("PRAGMA user_version = 2")
+    conn.execute(
+        "INSERT INTO call_annotation_table VALUES "
+        "('c1_chunk_0', 'ann', 'annotator', '2024-01-02', '10:00:00', "
+        "'Claim', 'Claim Status', '3', '')"
+    )
+    conn.commit()
+
+    assert apply_migrations(conn) == len(MIGRATIONS)
+    row = conn.execute(
+        "SELECT call_id, username, case_type, subcase_type FROM call_annotation_table"
+    ).fetchone()
+    assert row == ("c1_chunk_0", "ann", "Claim", "Claim Status")
+    conn.close()
+
+
+def test_failed_migration_is_rolled_back(db_path, monkeypatch):
+    def broken(conn):
+        conn.execute("CREATE TABLE half_done (x INTEGER)")
+        raise RuntimeError("broken migration")
+
+    monkeypatch.setattr("migrations.MIGRATIONS", MIGRATIONS + [broken])
+    conn = sqlite3.connect(db_path)
+    with pytest.raises(RuntimeError):
+        apply_migrations(conn)
+
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == len(MIGRATIONS)
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master")}
+    assert "half_done" not in tables
+    conn.close()
+
+
+@pytest.mark.parametrize("trial", range(3))
+def test_processes_starting_together_migrate_once(db_path, trial):
+    ctx = multiprocessing.get_context("spawn")
+    n_processes = 4
+    barrier, results = ctx.Barrier(n_processes), ctx.Queue()
+    processes = [
+        ctx.Process(target=_start_app, args=(db_path, barrier, results))
+        for _ in range(n_processes)
+    ]
+    for p in processes:
+        p.start()
+    outcomes = [results.get(timeout=60) for _ in processes]
+    for p in processes:
+        p.join(timeout=60)
+
+    assert outcomes == [len(MIGRATIONS)] * n_processes
+
+
+def test_every_migration_can_run_again(db_path):
+    conn = sqlite3.connect(db_path)
+    apply_migrations(conn)
+    for migration in MIGRATIONS:
+        conn.execute("BEGIN IMMEDIATE")
+        migration(conn)
+        conn.commit()
+    assert apply_migrations(conn) == len(MIGRATIONS)
+    conn.close()
@@ -0,0 +1,79 @@
+import pytest
+
+from navigation import ChunkNavigator
+
+
+def pending(nav: ChunkNavigator, start: int):
+    # positions reached by following next() once around the list
+    order, idx = [start], nav.next(start)
+    while idx != start:
+        order.append(idx)
+        idx = nav.next(idx)
+    return order
+
+
+def test_next_wraps_around_to_the_start():
+    nav = ChunkNavigator(3)
+    assert [nav.next(i) for i in range(3)] == [1, 2, 0]
+
+
+def test_prev_stops_at_the_start():
+    nav = ChunkNavigator(3)
+    assert [nav.prev(i) for i in range(3)] == [None, 0, 1]
+
+
+def test_single_chunk_is_its_own_next():
+    nav = ChunkNavigator(1)
+    assert nav.next(0) == 0
+    assert nav.prev(0) is None
+
+
+def test_remove_current_links_its_neighbours():
+    nav = ChunkNavigator(5)
+    assert nav.remove(2) == 3
+    assert nav.next(1) == 3
+    assert nav.prev(3) == 1
+    assert 2 not in nav
+    assert (len(nav), nav.n_done) == (4, 1)
+    assert pending(nav, 0) == [0, 1, 3, 4]
+
+
+def test_remove_first():
+    nav = ChunkNavigator(4)
+    assert nav.remove(0) == 1
+    assert nav.prev(1) is None
+    assert nav.next(3) == 1
+    assert pending(nav, 1) == [1, 2, 3]
+
+
+def test_remove_last_wraps_around():
+    nav = ChunkNavigator(4)
+    assert nav.remove(3) == 0
+    assert nav.next(2) == 0
+    assert nav.prev(0) is None
+    assert pending(nav, 0) == [0, 1, 2]
+
+
+def test_remove_every_chunk_empties_the_queue():
+    nav = ChunkNavigator(3)
+    assert nav.remove(1) == 2
+    assert nav.remove(2) == 0
+    assert nav.next(0) == 0
+    assert nav.remove(0) is None
+    assert len(nav) == 0
+    assert nav.n_done == 3
+    assert not any(i in nav for i in range(3))
+
+
+def test_remove_twice_raises():
+    nav = ChunkNavigator(2)
+    nav.remove(0)
+    with pytest.raises(ValueError):
+        nav.remove(0)
+
+
+def test_empty_queue():
+    nav = ChunkNavigator(0)
+    assert len(nav) == 0
+    assert nav.n_done == 0
+    assert 0 not in nav
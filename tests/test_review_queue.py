@@ -0,0 +1,105 @@
+import pytest
+
+from progress import read_progress, rebuild_progress
+from review_queue import (
+    count_review_queue,
+    list_review_calls,
+    list_review_chunks,
+    read_review_window,
+)
+
+CALLS = {
+    "c1": ("ann1", "rev1", 3),
+    "c2": ("ann2", "rev2", 2),
+    "c3": ("ann1", "rev1", 2),
+}
+
+
+@pytest.fixture
+def queue(assign, save):
+    # every chunk annotated except c3_chunk_1
+    assign(CALLS)
+    for conn_id, (annotator, _, n_chunks) in CALLS.items():
+        for chunk_id in range(n_chunks):
+            if (conn_id, chunk_id) != ("c3", 1):
+                save(f"{conn_id}_chunk_{chunk_id}", annotator, "annotator", "Claim")
+
+
+def keys(window):
+    return list(zip(window["ConnectionID"], window["chunk_id"]))
+
+
+def test_window_at_the_start(pool, queue):
+    with pool.reader() as conn:
+        window, current = read_review_window(conn, "rev1", None, 2)
+    assert keys(window) == [("c1", 0), ("c1", 1), ("c1", 2)]
+    assert current == 0
+    assert window["annotator"].unique().tolist() == ["ann1"]
+
+
+def test_window_around_a_chunk(pool, queue):
+    with pool.reader() as conn:
+        window, current = read_review_window(conn, "rev1", ("c1", 2), 1)
+    assert keys(window) == [("c1", 1), ("c1", 2), ("c3", 0)]
+    assert keys(window)[current] == ("c1", 2)
+
+
+def test_window_of_a_call_starts_at_its_first_chunk(pool, queue):
+    with pool.reader() as conn:
+        window, current = read_review_window(conn, None, ("c2", None), 1)
+    assert keys(window)[current] == ("c2", 0)
+
+
+def test_window_past_the_end_wraps_around(pool, queue):
+    with pool.reader() as conn:
+        window, current = read_review_window(conn, "rev1", ("c9", None), 2)
+    assert keys(window)[current] == ("c1", 0)
+
+
+def test_empty_queue(pool, queue):
+    with pool.reader() as conn:
+        window, current = read_review_window(conn, "nobody", None, 2)
+        assert window.empty
+        assert count_review_queue(conn, "nobody") == 0
+
+
+def test_queue_listings_and_counts(pool, queue):
+    with pool.reader() as conn:
+        assert list_review_calls(conn, "rev1") == ["c1", "c3"]
+        assert list_review_calls(conn, None, prefix="c2") == ["c2"]
+        assert list_review_chunks(conn, "rev1", "c3") == [0]
+        assert count_review_queue(conn, "rev1") == 4
+        assert count_review_queue(conn, None) == 6
+
+
+def test_reassigned_call_moves_to_the_new_reviewer(pool, queue, assign):
+    assign(dict(CALLS, c3=("ann1", "rev2", 2)))
+    with pool.reader() as conn:
+        assert list_review_calls(conn, "rev2") == ["c2", "c3"]
+        assert count_review_queue(conn, "rev1") == 3
+        assert count_review_queue(conn, "rev2") == 3
+        assert count_review_queue(conn, None) == 6
+
+
+def test_progress_triggers_match_a_rebuild(pool, queue, save, assign):
+    save("c1_chunk_0", "rev1", "reviewer", "Claim", time_of_day="11:00:00")
+    save("c1_chunk_0", "rev1", "reviewer", "Claim", time_of_day="12:00:00")
+    save("c3_chunk_1", "ann1", "annotator", "Claim")
+    assign(dict(CALLS, c2=("ann2", "rev1", 2)))
+
+    with pool.reader() as conn:
+        maintained = read_progress(conn)
+    reviewers = maintained["reviewers"].set_index("reviewer")
+    assert reviewers.loc["rev1", ["n_annotated", "n_reviewed"]].tolist() == [7, 1]
+    assert maintained["daily"]["n_annotations"].sum() == 9
+
+    with pool.writer_connection() as conn:
+        with conn:
+            rebuild_progress(conn)
+        rebuilt = read_progress(conn)
+        assert count_review_queue(conn, None) == 7
+    # the triggers keep a reviewer whose calls all moved away, at zero
+    assert reviewers.loc["rev2"].tolist() == [0, 0, 0]
+    maintained["reviewers"] = maintained["reviewers"].query("n_annotated > 0")
+    for name, table in maintained.items():
+        assert table.reset_index(drop=True).equals(rebuilt[name]), name
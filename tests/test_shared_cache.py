@@ -0,0 +1,77 @@
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+
+from migrations import MIGRATIONS
+
+SRC_DIR = os.path.join(os.path.dirname(__file__), os.pardir, "src")
+
+
+def _start_replica(db_path, cache_dir, barrier, results):
+    # what an app replica does at startup with SHARED_CACHE_DIR set: migrate
+    # the database (init_pool) and map the loader's call data
+    from db_pool import ConnectionPool
+    from ingest import CallDataCatalog
+    from migrations import apply_migrations
+    from shared_cache import MANIFEST_FILE, SharedCallData
+
+    os.chdir(SRC_DIR)
+    barrier.wait()
+    try:
+        pool = ConnectionPool(db_path)
+        with pool.writer_connection() as conn:
+            version = apply_migrations(conn)
+
+        deadline = time.time() + 60
+        while not os.path.exists(os.path.join(cache_dir, MANIFEST_FILE)):
+            if time.time() > deadline:
+                raise TimeoutError("the loader published no call data")
+            time.sleep(0.05)
+        catalog = CallDataCatalog(pool, shared=SharedCallData(cache_dir))
+        data, mapping = catalog.snapshot()
+        results.put((version, len(data), len(mapping)))
+        pool.close()
+    except Exception as e:
+        results.put(repr(e))
+
+
+def test_loader_and_replicas_start_together(tmp_path):
+    db_path = str(tmp_path / "annotations.db")
+    cache_dir = str(tmp_path / "cache")
+    ctx = multiprocessing.get_context("spawn")
+    n_replicas = 3
+    barrier, results = ctx.Barrier(n_replicas + 1), ctx.Queue()
+    replicas = [
+        ctx.Process(target=_start_replica, args=(db_path, cache_dir, barrier, results))
+        for _ in range(n_replicas)
+    ]
+    for p in replicas:
+        p.start()
+
+    barrier.wait()
+    loader = subprocess.run(
+        [
+            sys.executable,
+            "shared_cache.py",
+            "--dir",
+            cache_dir,
+            "--db",
+            db_path,
+            "--poll",
+            "0",
+        ],
+        cwd=SRC_DIR,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    outcomes = [results.get(timeout=120) for _ in replicas]
+    for p in replicas:
+        p.join(timeout=60)
+
+    assert loader.returncode == 0, loader.stderr[-3000:]
+    assert all(isinstance(o, tuple) for o in outcomes), outcomes
+    assert {o[0] for o in outcomes} == {len(MIGRATIONS)}
+    assert len({o[1:] for o in outcomes}) == 1
@@ -0,0 +1,97 @@
+import os
+
+import pandas as pd
+import pytest
+
+from taxonomy import Taxonomy, TaxonomyStore
+
+INTENTS = pd.DataFrame(
+    {
+        "Intent": ["Claim", "Claim", "Billing", "Billing"],
+        "Sub Intent": ["New claim", "Claim status", "Refund", "Claim status"],
+    }
+)
+
+
+def write_intents(path, intent_df):
+    # replace the file in one step, as a deploy would
+    intent_df.to_parquet(f"{path}.tmp")
+    os.replace(f"{path}.tmp", path)
+
+
+@pytest.fixture
+def intents_path(tmp_path):
+    path = str(tmp_path / "intents.parquet")
+    write_intents(path, INTENTS)
+    return path
+
+
+def test_valid_subintents():
+    taxonomy = Taxonomy(INTENTS)
+    assert taxonomy.valid_subintents(["Billing"]) == ["Claim status", "Refund"]
+    assert taxonomy.valid_subintents(["Claim", "Billing"]) == [
+        "New claim",
+        "Claim status",
+        "Refund",
+    ]
+    assert taxonomy.subintent_options(["Claim"], ["Refund", "New claim"]) == (
+        ["New claim", "Claim status"],
+        ["New claim"],
+    )
+
+
+def test_invalid_labels():
+    taxonomy = Taxonomy(INTENTS)
+    assert taxonomy.invalid_labels(["Claim"], ["Claim status"]) == []
+    assert taxonomy.invalid_labels(["Claim"], ["Refund"]) == ["Refund"]
+    assert taxonomy.invalid_labels(["Fraud"], ["Unknown"]) == ["Fraud", "Unknown"]
+
+
+def test_store_reloads_a_changed_file(intents_path):
+    store = TaxonomyStore(intents_path, check_interval_s=0)
+    before = store.get()
+    assert store.get() is before
+
+    write_intents(
+        intents_path,
+        pd.concat(
+            [
+                INTENTS,
+                pd.DataFrame({"Intent": ["Fraud"], "Sub Intent": ["Stolen card"]}),
+            ]
+        ),
+    )
+    after = store.get()
+    assert after is not before
+    assert after.version != before.version
+    assert after.valid_subintents(["Fraud"]) == ["Stolen card"]
+
+
+def test_store_keeps_the_version_of_the_same_content(intents_path):
+    store = TaxonomyStore(intents_path, check_interval_s=0)
+    before = store.get()
+    write_intents(intents_path, INTENTS)
+    assert store.get() is before
+
+
+def test_store_checks_at_most_every_interval(intents_path):
+    store = TaxonomyStore(intents_path, check_interval_s=3600)
+    before = store.get()
+    write_intents(intents_path, INTENTS.iloc[:2])
+    assert store.get() is before
+
+
+def test_store_keeps_the_taxonomy_of_an_unreadable_file(intents_path):
+    store = TaxonomyStore(intents_path, check_interval_s=0)
+    before = store.get()
+    with open(intents_path, "wb") as f:
+        f.write(b"not parquet")
+    assert store.get() is before
+
+    write_intents(intents_path, INTENTS.iloc[:2])
+    assert store.get().valid_subintents(["Billing"]) == []
+
+
+def test_store_needs_a_readable_file_to_start(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        TaxonomyStore(str(tmp_path / "missing.parquet"), check_interval_s=0)
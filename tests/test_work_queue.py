@@ -0,0 +1,105 @@
+import pytest
+
+from config import LEASE_DURATION_S
+from work_queue import (
+    LEASE_TABLE,
+    acquire_call,
+    complete_call,
+    get_held_lease,
+    get_leased_chunks,
+)
+
+NOW = 1_700_000_000
+
+
+@pytest.fixture
+def calls(assign):
+    assign(
+        {
+            "c1": ("ann1", "rev1", 2),
+            "c2": ("ann2", "rev2", 5),
+            "c3": ("ann1", "rev1", 1),
+        }
+    )
+
+
+def lease_of(pool, connection_id):
+    with pool.reader() as conn:
+        return conn.execute(
+            f"SELECT status, annotator, expires_at FROM {LEASE_TABLE} "
+            "WHERE connection_id = ?",
+            (connection_id,),
+        ).fetchone()
+
+
+def test_annotator_keeps_their_call(pool, calls):
+    with pool.writer_connection() as conn:
+        first = acquire_call(conn, "ann1", now=NOW)
+        assert acquire_call(conn, "ann1", now=NOW + 60) == first
+    assert lease_of(pool, first) == ("leased", "ann1", NOW + LEASE_DURATION_S)
+
+
+def test_annotators_get_different_calls(pool, calls):
+    with pool.writer_connection() as conn:
+        leased = {acquire_call(conn, name, now=NOW) for name in ["a", "b", "c"]}
+        assert leased == {"c1", "c2", "c3"}
+        assert acquire_call(conn, "d", now=NOW) is None
+
+
+def test_call_of_a_paired_reviewer_comes_first(pool, calls):
+    with pool.writer_connection() as conn:
+        # rev2 has the most open chunks, but ann1 is paired with rev1
+        assert acquire_call(conn, "ann1", now=NOW) == "c1"
+        # without a pairing, the reviewer with the most open chunks
+        assert acquire_call(conn, "someone", now=NOW) == "c2"
+
+
+def test_lease_is_extended_once_half_of_it_is_left(pool, calls):
+    half = LEASE_DURATION_S // 2
+    with pool.writer_connection() as conn:
+        call = acquire_call(conn, "ann1", now=NOW)
+        acquire_call(conn, "ann1", now=NOW + half - 1)
+        assert lease_of(pool, call)[2] == NOW + LEASE_DURATION_S
+        acquire_call(conn, "ann1", now=NOW + half)
+        assert lease_of(pool, call)[2] == NOW + half + LEASE_DURATION_S
+
+
+def test_expired_lease_goes_to_the_next_annotator(pool, calls):
+    expired = NOW + LEASE_DURATION_S
+    with pool.writer_connection() as conn:
+        call = acquire_call(conn, "ann1", now=NOW)
+        for other in ["a", "b"]:
+            acquire_call(conn, other, now=NOW)
+
+        assert get_held_lease(conn, "ann1", now=expired) is None
+        assert acquire_call(conn, "late", now=expired) == call
+        assert lease_of(pool, call)[:2] == ("leased", "late")
+
+
+def test_complete_call_marks_it_done(pool, calls):
+    with pool.writer_connection() as conn:
+        call = acquire_call(conn, "ann1", now=NOW)
+        assert complete_call(conn, "ann1") == call
+        assert lease_of(pool, call)[:2] == ("done", "ann1")
+        assert get_held_lease(conn, "ann1", now=NOW) is None
+
+        following = acquire_call(conn, "ann1", now=NOW)
+        assert following not in (None, call)
+        assert complete_call(conn, "nobody") is None
+
+
+def test_complete_call_leaves_another_lease_alone(pool, calls):
+    with pool.writer_connection() as conn:
+        call = acquire_call(conn, "ann1", now=NOW)
+        assert complete_call(conn, "ann1", connection_id="elsewhere") is None
+        assert lease_of(pool, call)[0] == "leased"
+
+
+def test_leased_chunks_skip_the_annotated_ones(pool, calls, save):
+    with pool.writer_connection() as conn:
+        call = acquire_call(conn, "ann2", now=NOW)
+    save(f"{call}_chunk_1", "ann2", "annotator", "Claim")
+
+    with pool.reader() as conn:
+        pending = get_leased_chunks(conn, "ann2")
+    assert pending["new_id"].tolist() == [f"{call}_chunk_{i}" for i in [0, 2, 3, 4]]